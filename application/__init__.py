@@ -1,10 +1,24 @@
 # File: application/__init__.py
 
+import os
 from flask import Flask
 from flask_migrate import Migrate
 from flasgger import Swagger
 from config import Config
 from application.extensions import db, ma, limiter, cache
+from application.engine import configure_engine
+from application.routing import init_replica_routing
+from application.tenancy import init_tenancy, tenants_cli
+from application.apispec import spec_cli, find_prebuilt_spec, install_prebuilt_spec, route_fingerprint
+from application.compression import init_compression
+from application.idempotency import idempotency_cli
+from application.fulltext import search_cli
+from application.similarity import trigrams_cli
+from application.analytics import analytics_cli
+from application.assignment import assignment_cli
+from application.archive import archive_cli
+from application.webhooks import webhooks_cli
+from application.jobs import worker_command
 
 def create_app(config_class=Config):
     app = Flask(__name__, static_url_path='/static', static_folder='static')
@@ -19,7 +33,60 @@ def create_app(config_class=Config):
     cache.init_app(app)
     Migrate(app, db)
 
-    # Swagger setup
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(app, engine)
+        init_replica_routing(app, db.engines)
+    init_tenancy(app)
+    init_compression(app)
+
+    app.cli.add_command(spec_cli)
+    app.cli.add_command(idempotency_cli)
+    app.cli.add_command(search_cli)
+    app.cli.add_command(trigrams_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(assignment_cli)
+    app.cli.add_command(archive_cli)
+    app.cli.add_command(tenants_cli)
+    app.cli.add_command(webhooks_cli)
+    app.cli.add_command(worker_command)
+
+    # Register blueprints double check the names of the blueprints in the routes files if you get a build error. look at service-tickets
+    from application.blueprints.customers.routes import customers_bp
+    from application.blueprints.mechanics.routes import mechanics_bp
+    from application.blueprints.service_tickets.routes import service_tickets_bp
+    from application.blueprints.inventory.routes import inventory_bp
+    from application.blueprints.admin.routes import admin_bp
+    from application.blueprints.batch.routes import batch_bp
+    from application.blueprints.analytics.routes import analytics_bp
+    from application.blueprints.appointments.routes import appointments_bp
+    from application.blueprints.webhooks.routes import webhooks_bp
+    from application.blueprints.jobs.routes import jobs_bp
+
+    app.register_blueprint(customers_bp, url_prefix="/customers")
+    app.register_blueprint(mechanics_bp, url_prefix="/mechanics")
+    app.register_blueprint(service_tickets_bp, url_prefix="/service-tickets")
+    app.register_blueprint(inventory_bp, url_prefix="/inventory")
+    app.register_blueprint(admin_bp, url_prefix="/admin")
+    app.register_blueprint(batch_bp, url_prefix="/batch")
+    app.register_blueprint(analytics_bp, url_prefix="/analytics")
+    app.register_blueprint(appointments_bp, url_prefix="/appointments")
+    app.register_blueprint(webhooks_bp, url_prefix="/webhooks")
+    app.register_blueprint(jobs_bp, url_prefix="/jobs")
+
+    @app.route("/")
+    def index():
+        return {"message": "Welcome to the Mechanic API!"}
+
+    #this is just for testing purposes but we all know its really a sanity check and its probably here to stay.
+    @app.route("/config-check")
+    def config_check():
+        return {
+            "Prod Config Test": ["Only show this when you visit localhost:5000/config-check"],
+            "Does this work?": ["Yes Dummy you are a good programmer..."]
+        }
+
+    # Swagger setup, after every route is registered (the prebuilt spec is keyed on them)
     swagger_template = {
         "swagger": "2.0",
         "info": {
@@ -47,29 +114,20 @@ def create_app(config_class=Config):
         "specs_route": "/apidocs"
     }
 
-    Swagger(app, template=swagger_template, config=swagger_config)
-
-    # Register blueprints double check the names of the blueprints in the routes files if you get a build error. look at service-tickets
-    from application.blueprints.customers.routes import customers_bp
-    from application.blueprints.mechanics.routes import mechanics_bp
-    from application.blueprints.service_tickets.routes import service_tickets_bp
-    from application.blueprints.inventory.routes import inventory_bp
-
-    app.register_blueprint(customers_bp, url_prefix="/customers")
-    app.register_blueprint(mechanics_bp, url_prefix="/mechanics")
-    app.register_blueprint(service_tickets_bp, url_prefix="/service-tickets")
-    app.register_blueprint(inventory_bp, url_prefix="/inventory")
-
-    @app.route("/")
-    def index():
-        return {"message": "Welcome to the Mechanic API!"}
-
-    #this is just for testing purposes but we all know its really a sanity check and its probably here to stay.
-    @app.route("/config-check")
-    def config_check():
-        return {
-            "Prod Config Test": ["Only show this when you visit localhost:5000/config-check"],
-            "Does this work?": ["Yes Dummy you are a good programmer..."]
-        }
+    # "dynamic" parses the route docstrings on demand, "static" serves the file from `flask spec build`,
+    # the one built from this exact route table
+    swagger_mode = app.config.get("SWAGGER_MODE", "dynamic")
+    app.extensions["apispec_fingerprint"] = route_fingerprint(app, swagger_template)
+    prebuilt_spec = None
+    if swagger_mode == "static":
+        prebuilt_spec = find_prebuilt_spec(app, swagger_template["info"]["version"], app.extensions["apispec_fingerprint"])
+        if prebuilt_spec:
+            swagger_config["specs"][0]["route"] = "/" + os.path.basename(prebuilt_spec)
+        else:
+            print("⚠️ SWAGGER_MODE=static but no spec built for these routes, run `flask spec build`. Falling back to dynamic.")
 
+    if swagger_mode != "off":
+        Swagger(app, template=swagger_template, config=swagger_config)
+        if prebuilt_spec:
+            install_prebuilt_spec(app, prebuilt_spec)
     return app
@@ -0,0 +1,178 @@
+# File: application/analytics.py
+# Rollup tables for the /analytics dashboards: daily ticket volume and completion time,
+# parts revenue per SKU and lifetime value per customer.
+# They're bumped in the same transaction as the write that changes them (ticket insert,
+# completion, parts booked through application/stock.py) with an upsert per row, so a
+# dashboard reads a few hundred rows and never GROUP BYs the live tables.
+# `flask analytics rebuild` recomputes everything from scratch, for backfills or after
+# writes that went around the ORM. It prices parts at today's prices.
+
+import click
+from sqlalchemy import delete, event, func, inspect, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from flask.cli import AppGroup, with_appcontext
+from application.extensions import db
+from application.models import (
+    ArchivedTicket, Customer, CustomerValue, DailyTicketStats, Inventory, PartRevenue, ServiceTicket,
+    ticket_parts, ticket_parts_archive,
+)
+
+analytics_cli = AppGroup("analytics", help="Maintain the analytics rollup tables.")
+
+daily = DailyTicketStats.__table__
+part_revenue = PartRevenue.__table__
+customer_value = CustomerValue.__table__
+
+UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+def bump(connection, table, keys, **increments):
+    """Adds increments to the row for keys, creating it if needed."""
+    upsert = UPSERTS.get(connection.dialect.name)
+    if upsert is None:
+        # no ON CONFLICT, update first and insert if nothing was there
+        updated = connection.execute(
+            update(table)
+            .where(*[table.c[k] == v for k, v in keys.items()])
+            .values({col: table.c[col] + amount for col, amount in increments.items()})
+        )
+        if updated.rowcount == 0:
+            connection.execute(table.insert().values(**keys, **increments))
+        return
+
+    stmt = upsert(table).values(**keys, **increments)
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={col: table.c[col] + stmt.excluded[col] for col in increments},
+    ))
+
+
+def record_parts_booked(connection, ticket_id, part_id, quantity):
+    # called by stock.reserve() right after the stock came off the shelf
+    # two scalar subqueries, one round trip and no cartesian FROM
+    price, customer_id = connection.execute(select(
+        select(Inventory.price).where(Inventory.id == part_id).scalar_subquery(),
+        select(ServiceTicket.customer_id).where(ServiceTicket.id == ticket_id).scalar_subquery(),
+    )).one()
+    revenue = price * quantity
+    bump(connection, part_revenue, {"inventory_id": part_id}, units=quantity, revenue=revenue)
+    bump(connection, customer_value, {"customer_id": customer_id}, parts_revenue=revenue)
+
+
+def record_completion(connection, created_at, completed_at, sign=1):
+    seconds = (completed_at - created_at).total_seconds() if created_at else 0
+    bump(connection, daily, {"day": completed_at.date()}, tickets_completed=sign, completion_seconds=sign * seconds)
+
+
+@event.listens_for(ServiceTicket, "after_insert")
+def _ticket_created(mapper, connection, target):
+    bump(connection, daily, {"day": target.created_at.date()}, tickets_created=1)
+    bump(connection, customer_value, {"customer_id": target.customer_id}, ticket_count=1)
+    if target.completed_at is not None:
+        record_completion(connection, target.created_at, target.completed_at)
+
+
+@event.listens_for(ServiceTicket, "after_update")
+def _ticket_updated(mapper, connection, target):
+    history = inspect(target).attrs.completed_at.history
+    if not history.has_changes():
+        return
+    # reopened (or re-stamped) tickets take their old completion back out
+    for old in history.deleted:
+        if old is not None:
+            record_completion(connection, target.created_at, old, sign=-1)
+    for new in history.added:
+        if new is not None:
+            record_completion(connection, target.created_at, new)
+
+
+def daily_stats(session, start, end):
+    rows = session.scalars(
+        select(DailyTicketStats).where(DailyTicketStats.day >= start, DailyTicketStats.day <= end).order_by(DailyTicketStats.day)
+    )
+    return [
+        {
+            "day": row.day.isoformat(),
+            "tickets_created": row.tickets_created,
+            "tickets_completed": row.tickets_completed,
+            "avg_completion_hours": (
+                round(row.completion_seconds / row.tickets_completed / 3600, 2) if row.tickets_completed else None
+            ),
+        }
+        for row in rows
+    ]
+
+
+def top_parts(session, limit):
+    rows = session.execute(
+        select(PartRevenue, Inventory.name)
+        .outerjoin(Inventory, Inventory.id == PartRevenue.inventory_id)
+        .order_by(PartRevenue.revenue.desc())
+        .limit(limit)
+    )
+    return [
+        {"inventory_id": r.inventory_id, "name": name, "units": r.units, "revenue": round(r.revenue, 2)}
+        for r, name in rows
+    ]
+
+
+def top_customers(session, limit):
+    rows = session.execute(
+        select(CustomerValue, Customer.name)
+        .outerjoin(Customer, Customer.id == CustomerValue.customer_id)
+        .order_by(CustomerValue.parts_revenue.desc(), CustomerValue.ticket_count.desc())
+        .limit(limit)
+    )
+    return [
+        {"customer_id": r.customer_id, "name": name, "ticket_count": r.ticket_count,
+         "lifetime_value": round(r.parts_revenue, 2)}
+        for r, name in rows
+    ]
+
+
+def rebuild_rollups(session):
+    days, customers, parts = {}, {}, {}
+    # archived tickets (application/archive.py) still count
+    for model, parts_table in ((ServiceTicket, ticket_parts), (ArchivedTicket, ticket_parts_archive)):
+        for _, customer_id, created_at, completed_at in session.execute(
+            select(model.id, model.customer_id, model.created_at, model.completed_at)
+            .execution_options(yield_per=5000)
+        ):
+            if created_at is not None:
+                _add(days, created_at.date(), tickets_created=1)
+            _add(customers, customer_id, ticket_count=1)
+            if completed_at is not None:
+                seconds = (completed_at - created_at).total_seconds() if created_at else 0
+                _add(days, completed_at.date(), tickets_completed=1, completion_seconds=seconds)
+
+        revenue = Inventory.price * parts_table.c.quantity
+        for part_id, customer_id, units, total in session.execute(
+            select(parts_table.c.inventory_id, model.customer_id, func.sum(parts_table.c.quantity), func.sum(revenue))
+            .join(Inventory, Inventory.id == parts_table.c.inventory_id)
+            .join(model, model.id == parts_table.c.service_ticket_id)
+            .group_by(parts_table.c.inventory_id, model.customer_id)
+        ):
+            _add(parts, part_id, units=units, revenue=total)
+            _add(customers, customer_id, parts_revenue=total)
+
+    for table, key, rows in ((daily, "day", days), (part_revenue, "inventory_id", parts), (customer_value, "customer_id", customers)):
+        session.execute(delete(table))
+        if rows:
+            # executemany takes its column list from the first row, so every row needs every counter
+            counters = [c.name for c in table.c if c.name != key]
+            session.execute(table.insert(), [{key: k, **{c: v.get(c, 0) for c in counters}} for k, v in rows.items()])
+    session.commit()
+
+
+def _add(rows, key, **amounts):
+    row = rows.setdefault(key, {})
+    for col, amount in amounts.items():
+        row[col] = row.get(col, 0) + amount
+
+
+@analytics_cli.command("rebuild")
+@with_appcontext
+def rebuild_command():
+    """Recompute the analytics rollups from the ticket and parts tables."""
+    rebuild_rollups(db.session)
+    click.echo("📊 Analytics rollups rebuilt")
@@ -0,0 +1,94 @@
+# File: application/apispec.py
+# Prebuilt OpenAPI spec. `flask spec build` renders what flasgger would build from the
+# route docstrings and writes it to a versioned file (apispec-<version>.<fingerprint>.json).
+# With SWAGGER_MODE = "static" the app serves that file with immutable cache headers
+# instead of parsing every docstring's YAML at runtime.
+# The fingerprint hashes the route table (rules, methods, docstrings) and the template, not
+# the rendered spec, so the app can work it out at boot without rendering anything. A file
+# built from other routes never matches: touch a route or its docs and the app falls back
+# to the dynamic spec until the next build, it never serves a stale file. Deploys run the
+# build (render.yaml), older files can stay around for cached clients.
+
+import hashlib
+import json
+import os
+import click
+from flask import current_app, redirect, send_file
+from flask.cli import AppGroup, with_appcontext
+
+SPEC_ENDPOINT = "apispec_1"
+
+spec_cli = AppGroup("spec", help="Build the static OpenAPI spec.")
+
+
+def spec_dir(app):
+    return app.config.get("SWAGGER_SPEC_DIR") or os.path.join(app.static_folder, "apispec")
+
+
+def route_fingerprint(app, template):
+    """Hash of everything the spec is rendered from. Call it before flasgger adds its own
+    routes, build and lookup have to see the same table."""
+    routes = sorted(
+        (rule.rule, sorted(rule.methods), rule.endpoint, app.view_functions[rule.endpoint].__doc__ or "")
+        for rule in app.url_map.iter_rules()
+        if rule.endpoint != "static"
+    )
+    body = json.dumps({"template": template, "routes": routes}, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()[:12]
+
+
+def spec_path(app, version, fingerprint):
+    return os.path.join(spec_dir(app), f"apispec-{version}.{fingerprint}.json")
+
+
+def find_prebuilt_spec(app, version, fingerprint):
+    # only a build of exactly these routes, whatever else is lying around
+    path = spec_path(app, version, fingerprint)
+    return path if os.path.exists(path) else None
+
+
+def install_prebuilt_spec(app, path):
+    filename = os.path.basename(path)
+
+    def serve_spec():
+        # the filename changes whenever the spec does, so clients can keep it forever
+        response = send_file(path, mimetype="application/json", max_age=31536000)
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        return response
+
+    app.view_functions[f"flasgger.{SPEC_ENDPOINT}"] = serve_spec
+
+    # old clients and bookmarks still ask for the unversioned name
+    app.add_url_rule(
+        f"/{SPEC_ENDPOINT}.json", "legacy_apispec",
+        lambda: redirect(f"/{filename}", code=302),
+    )
+
+
+def render_spec(app):
+    with app.test_request_context():
+        spec = app.swag.get_apispecs(SPEC_ENDPOINT)
+    return json.dumps(spec, sort_keys=True, indent=2, default=str).encode("utf-8")
+
+
+def build_spec_file(app, version, fingerprint):
+    body = render_spec(app)
+    os.makedirs(spec_dir(app), exist_ok=True)
+    path = spec_path(app, version, fingerprint)
+    # written aside and renamed, a worker booting mid-build never sees half a file
+    with open(path + ".tmp", "wb") as f:
+        f.write(body)
+    os.replace(path + ".tmp", path)
+    return path
+
+
+@spec_cli.command("build")
+@with_appcontext
+def build_command():
+    """Render the OpenAPI spec from the route docstrings into a static file."""
+    app = current_app._get_current_object()
+    if not hasattr(app, "swag"):
+        raise click.ClickException("Swagger is disabled (SWAGGER_MODE = 'off'), nothing to build.")
+    path = build_spec_file(app, app.swag.template["info"]["version"], app.extensions["apispec_fingerprint"])
+    click.echo(f"📄 Spec written to {path}")
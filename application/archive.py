@@ -0,0 +1,127 @@
+# File: application/archive.py
+# Cold storage for old tickets. Day-to-day work only looks at open and recently finished
+# tickets, but service_ticket (and every index on it) keeps years of completed history.
+# `flask archive run` moves tickets completed more than ARCHIVE_AFTER_DAYS ago, together
+# with their service_mechanic and ticket_parts rows, into the *_archive tables. It works
+# in batches of ARCHIVE_BATCH_SIZE tickets, one transaction each, so the write lock is
+# never held for long and an interrupted run just carries on next time.
+# A batch is INSERT ... SELECT into the archive, then DELETE from the hot tables. Past
+# appointments for those tickets are dropped, the calendar only cares about what's coming.
+#
+# Read endpoints only look at the hot tables unless they get include_archived=true, then
+# they add the archive and every dumped ticket says whether it's "archived".
+# The analytics rollups aren't touched. The reorder forecast and `flask analytics rebuild`
+# read both sets.
+
+import click
+from datetime import datetime, timedelta
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import delete, func, insert, literal, select
+from application.costs import with_totals
+from application.extensions import db
+from application.models import (
+    Appointment, ArchivedTicket, ServiceTicket, service_mechanic, service_mechanic_archive,
+    ticket_parts, ticket_parts_archive,
+)
+from application.tenancy import tenant_state
+from application.workflow import COMPLETED
+import application.scheduling as scheduling
+
+archive_cli = AppGroup("archive", help="Move old completed tickets into the archive tables.")
+
+hot = ServiceTicket.__table__
+cold = ArchivedTicket.__table__
+TICKET_COLUMNS = [c.name for c in hot.c]
+
+
+def archive_completed(app, session, older_than_days=None, batch_size=None):
+    """Moves tickets completed more than older_than_days ago into the archive, committing
+    after every batch. Returns how many tickets were moved."""
+    older_than_days = app.config.get("ARCHIVE_AFTER_DAYS", 365) if older_than_days is None else older_than_days
+    batch_size = batch_size or app.config.get("ARCHIVE_BATCH_SIZE", 500)
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+
+    moved = 0
+    while True:
+        # SQLite hands out max(id) + 1 without AUTOINCREMENT, moving the newest ticket
+        # would let the next one reuse an id that's already in the archive
+        newest = session.scalar(select(func.max(hot.c.id)))
+        if newest is None:
+            break
+        ids = session.scalars(
+            select(hot.c.id)
+            .where(hot.c.status == COMPLETED, hot.c.completed_at < cutoff, hot.c.id < newest)
+            .where(~select(Appointment.id).where(
+                Appointment.service_ticket_id == hot.c.id, Appointment.ends_at >= cutoff
+            ).exists())
+            .order_by(hot.c.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+        _move(session, ids)
+        session.commit()
+        moved += len(ids)
+        if len(ids) < batch_size:
+            break
+
+    schedule = tenant_state(app).get(scheduling.EXTENSION_KEY)
+    if moved and schedule is not None:
+        schedule.loaded_at = float("-inf")
+    return moved
+
+
+def _move(session, ids):
+    archived_at = datetime.utcnow()
+    session.execute(insert(cold).from_select(
+        TICKET_COLUMNS + ["archived_at"],
+        select(*[hot.c[name] for name in TICKET_COLUMNS], literal(archived_at, cold.c.archived_at.type))
+        .where(hot.c.id.in_(ids)),
+    ))
+    for source, target in ((service_mechanic, service_mechanic_archive), (ticket_parts, ticket_parts_archive)):
+        columns = [c.name for c in source.c]
+        session.execute(insert(target).from_select(
+            columns, select(*source.c).where(source.c.service_ticket_id.in_(ids))
+        ))
+        session.execute(delete(source).where(source.c.service_ticket_id.in_(ids)))
+    session.execute(delete(Appointment.__table__).where(Appointment.service_ticket_id.in_(ids)))
+    session.execute(delete(hot).where(hot.c.id.in_(ids)))
+
+
+def include_archived(args):
+    return args.get("include_archived", "false").lower() in ("1", "true", "yes")
+
+
+def dump_tickets(session, schema, archived=False, **filters):
+    """Dumped tickets (with totals) matching filters, plus the archived ones when asked,
+    ordered by id."""
+    dumped = with_totals(session, schema.dump(session.scalars(
+        select(ServiceTicket).filter_by(**filters).order_by(ServiceTicket.id)
+    ).all()))
+    if archived:
+        for ticket in dumped:
+            ticket["archived"] = False
+        dumped += dump_archived(session, schema, session.scalars(
+            select(ArchivedTicket).filter_by(**filters).order_by(ArchivedTicket.id)
+        ).all())
+        dumped.sort(key=lambda t: t["id"])
+    return dumped
+
+
+def dump_archived(session, schema, tickets):
+    # the ticket schema dumps archived tickets as they are, only the totals need the other table
+    dumped = with_totals(session, schema.dump(tickets), ticket_parts_archive)
+    for ticket in dumped:
+        ticket["archived"] = True
+    return dumped
+
+
+@archive_cli.command("run")
+@click.option("--days", type=int, default=None, help="Archive tickets completed more than this many days ago.")
+@click.option("--batch-size", type=int, default=None, help="Tickets moved per transaction.")
+@with_appcontext
+def run_command(days, batch_size):
+    """Move tickets completed more than ARCHIVE_AFTER_DAYS ago into the archive."""
+    moved = archive_completed(current_app, db.session, days, batch_size)
+    click.echo(f"🗄️ Archived {moved} tickets")
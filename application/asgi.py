@@ -0,0 +1,184 @@
+# File: application/asgi.py
+# Optional ASGI mode. The read-heavy list endpoints are served natively on an asyncio
+# SQLAlchemy engine, so a slow query parks a coroutine instead of a whole worker.
+# Everything else (auth, writes, swagger...) is handed to the normal Flask app through
+# asgiref's WSGI adapter, which runs it on a thread pool.
+#
+# Native requests still go through Flask's request pipeline, in a request context built
+# from the ASGI scope: the before_request hooks (rate limits...) run first and can answer
+# instead, the body is rendered by negotiation.render (JSON, msgpack or CBOR) and the
+# after_request hooks (compression...) run on it. View decorators are the one thing that
+# can't carry over, so /inventory/ (behind @cache.cached) stays on Flask, its cache hits
+# don't touch the database anyway.
+# Requests the async engine can't answer the way Flask would go to Flask: shop requests
+# (application/tenancy.py) and, with read replicas configured, every read, since replica
+# choice and pinning live in application/routing.py.
+#
+# Needs the async drivers: aiosqlite for SQLite, asyncpg for Postgres. Without the driver
+# every route goes through the Flask app.
+# Run with:  uvicorn asgi:app --workers 1
+
+import math
+from urllib.parse import parse_qs
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from config import Config
+from application import create_app
+from application.archive import dump_tickets, include_archived
+from application.engine import configure_engine
+from application.extensions import db
+from application.negotiation import render
+from application.tenancy import tenant_names
+from application.models import Customer, Mechanic, ServiceTicket
+from application.blueprints.customers.schemas import customers_schema
+from application.blueprints.mechanics.schemas import mechanics_schema
+from application.blueprints.service_tickets.schemas import tickets_schema
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def async_database_url(url):
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for '{backend}' databases.")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def async_engine_options(options):
+    options = dict(options)
+    connect_args = dict(options.pop("connect_args", {}))
+    # asyncpg takes server settings instead of a libpq "-c" options string
+    pg_options = connect_args.pop("options", None)
+    if pg_options and pg_options.startswith("-c statement_timeout="):
+        connect_args["server_settings"] = {"statement_timeout": pg_options.split("=", 1)[1]}
+    connect_args.pop("check_same_thread", None)
+    if connect_args:
+        options["connect_args"] = connect_args
+    return options
+
+
+# these run inside AsyncSession.run_sync, so they're written like normal sync code and
+# lazy loads during schema dumps still work, the I/O underneath is async
+
+
+def list_all_tickets(session, args):
+    archived = include_archived({name: values[0] for name, values in args.items()})
+    return dump_tickets(session, tickets_schema, archived), 200
+
+
+def get_all_customers(session, args):
+    page = max(_int_arg(args, "page", 1), 1)
+    per_page = max(_int_arg(args, "per_page", 10), 1)
+    total = session.scalar(select(func.count(Customer.id)))
+    customers = session.scalars(
+        select(Customer).order_by(Customer.id).limit(per_page).offset((page - 1) * per_page)
+    ).all()
+    return {
+        "customers": customers_schema.dump(customers),
+        "total": total,
+        "pages": math.ceil(total / per_page),
+        "current_page": page,
+    }, 200
+
+
+def list_all_mechanics(session, args):
+    return mechanics_schema.dump(session.scalars(select(Mechanic)).all()), 200
+
+
+def get_mechanics_by_tickets(session, args):
+    results = session.execute(
+        select(Mechanic.id, Mechanic.name, func.count(ServiceTicket.id).label("ticket_count"))
+        .join(Mechanic.tickets)
+        .group_by(Mechanic.id)
+        .order_by(func.count(ServiceTicket.id).desc())
+    ).all()
+    return [{"id": r[0], "name": r[1], "ticket_count": r[2]} for r in results], 200
+
+
+ASYNC_ROUTES = {
+    "/service-tickets/": list_all_tickets,
+    "/customers/": get_all_customers,
+    "/mechanics/": list_all_mechanics,
+    "/mechanics/by-tickets": get_mechanics_by_tickets,
+}
+
+
+def create_asgi_app(config_class=Config):
+    flask_app = create_app(config_class)
+
+    with flask_app.app_context():
+        url = async_database_url(db.engine.url)
+    try:
+        engine = create_async_engine(url, **async_engine_options(flask_app.config.get("SQLALCHEMY_ENGINE_OPTIONS", {})))
+    except ImportError as e:
+        print(f"⚠️ No async driver for {url.drivername} ({e}), serving every route through Flask.")
+        engine = None
+    else:
+        configure_engine(flask_app, engine.sync_engine)
+    Session = async_sessionmaker(engine, expire_on_commit=False)
+    wsgi_app = WsgiToAsgi(flask_app)
+    # the async engine is the primary's, shop requests need the Flask app's shard routing
+    # and reads with replicas its replica routing
+    native = engine is not None and not tenant_names(flask_app) and "replica_router" not in flask_app.extensions
+
+    async def app(scope, receive, send):
+        if scope["type"] == "lifespan":
+            await _lifespan(engine, receive, send)
+            return
+
+        handler = None
+        if native and scope["type"] == "http" and scope["method"] in ("GET", "HEAD"):
+            handler = ASYNC_ROUTES.get(scope["path"])
+        if handler is None:
+            await wsgi_app(scope, receive, send)
+            return
+
+        args = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        adapter = WsgiToAsgiInstance(flask_app)
+        adapter.scope = scope
+        environ = adapter.build_environ(scope, b"")
+        with flask_app.request_context(environ):
+            # what full_dispatch_request does around a view, the view being the async query
+            try:
+                rv = flask_app.preprocess_request()
+                if rv is None:
+                    async with Session() as session:
+                        payload, status = await session.run_sync(handler, args)
+                    rv = render(payload, status)
+            except Exception as e:
+                rv = flask_app.handle_user_exception(e)
+            response = flask_app.finalize_request(rv)
+            body = response.get_data()
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                        for name, value in response.headers.items()],
+        })
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    app.flask_app = flask_app
+    app.engine = engine
+    return app
+
+
+async def _lifespan(engine, receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if engine is not None:
+                await engine.dispose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+def _int_arg(args, name, default):
+    try:
+        return int(args.get(name, [default])[0])
+    except (TypeError, ValueError):
+        return default
@@ -0,0 +1,223 @@
+# File: application/assignment.py
+# Automatic mechanic assignment. Each worker keeps a min-heap of (open tickets, mechanic id),
+# where "open" means linked through service_mechanic and not Completed or Cancelled. A new ticket goes
+# to whoever is on top, so picking is O(1) and the bump after it is one O(log M) push.
+# Counts change through ORM commits in this process (new tickets, status changes,
+# mechanics added or removed by hand). Updates push a fresh entry and leave the old one
+# to be skipped when it surfaces (lazy deletion), so nothing is ever searched for in the heap.
+# Writes from other workers (and bulk Core updates) catch up when the heap is older
+# than ASSIGNMENT_HEAP_MAX_AGE and gets rebuilt from one GROUP BY.
+#
+# `flask assignment rebalance` (or POST /service-tickets/rebalance) hands every open
+# ticket that has no mechanic to the least loaded ones, oldest ticket first.
+
+import heapq
+import threading
+import time
+import click
+from flask import current_app, has_app_context
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import event, func, inspect, insert, select
+from application.extensions import db
+from application.models import Mechanic, ServiceTicket, service_mechanic
+from application.routing import RoutingSession
+from application.tenancy import tenant_state
+from application.workflow import CLOSED
+
+assignment_cli = AppGroup("assignment", help="Mechanic auto-assignment.")
+
+EXTENSION_KEY = "mechanic_workload"
+
+
+class WorkloadHeap:
+    def __init__(self):
+        self.loaded_at = float("-inf")
+        self._lock = threading.Lock()
+        self._heap = []  # (open tickets, mechanic id), may hold stale entries
+        self._load = {}  # mechanic id -> current open tickets, the source of truth
+
+    def load(self, session):
+        load = open_workloads(session)
+        heap = [(count, mechanic_id) for mechanic_id, count in load.items()]
+        heapq.heapify(heap)
+        with self._lock:
+            self._heap, self._load = heap, load
+            self.loaded_at = time.monotonic()
+
+    def least_loaded(self):
+        """Mechanic id with the fewest open tickets (lowest id on ties), None if there are none."""
+        with self._lock:
+            heap = self._heap
+            while heap and self._load.get(heap[0][1]) != heap[0][0]:
+                heapq.heappop(heap)
+            return heap[0][1] if heap else None
+
+    def workload(self, mechanic_id):
+        return self._load.get(mechanic_id)
+
+    def adjust(self, mechanic_id, delta):
+        with self._lock:
+            count = max(self._load.get(mechanic_id, 0) + delta, 0)
+            self._load[mechanic_id] = count
+            heapq.heappush(self._heap, (count, mechanic_id))
+            # stale entries pile up under steady churn, start over once they dominate
+            if len(self._heap) > 4 * len(self._load) + 64:
+                self._heap = [(c, m) for m, c in self._load.items()]
+                heapq.heapify(self._heap)
+
+    def remove(self, mechanic_id):
+        with self._lock:
+            self._load.pop(mechanic_id, None)
+
+
+def open_workloads(session):
+    """{mechanic id: open ticket count} for every mechanic, idle ones included."""
+    open_ticket = (ServiceTicket.id == service_mechanic.c.service_ticket_id) & (
+        ServiceTicket.status.is_(None) | ServiceTicket.status.notin_(CLOSED)
+    )
+    rows = session.execute(
+        select(Mechanic.id, func.count(ServiceTicket.id))
+        .select_from(Mechanic)
+        .outerjoin(service_mechanic, service_mechanic.c.mechanic_id == Mechanic.id)
+        .outerjoin(ServiceTicket, open_ticket)
+        .group_by(Mechanic.id)
+    )
+    return {mechanic_id: count for mechanic_id, count in rows}
+
+
+def workload_heap(app, session):
+    """The app's heap, rebuilt if it's missing or older than ASSIGNMENT_HEAP_MAX_AGE."""
+    heap = tenant_state(app).get(EXTENSION_KEY)
+    if heap is None:
+        heap = tenant_state(app)[EXTENSION_KEY] = WorkloadHeap()
+    if time.monotonic() - heap.loaded_at > app.config.get("ASSIGNMENT_HEAP_MAX_AGE", 300):
+        heap.load(session)
+    return heap
+
+
+def invalidate(app):
+    # for writes that bypass the ORM (bulk status changes) or that it counted but were rolled
+    # back after all (an atomic /batch), rebuild on next use
+    heap = tenant_state(app).get(EXTENSION_KEY)
+    if heap is not None:
+        heap.loaded_at = float("-inf")
+
+
+def auto_assign(app, session, ticket):
+    """Puts the least loaded mechanic on ticket, returns their id (None without mechanics).
+    The heap itself is bumped when the caller commits."""
+    mechanic_id = workload_heap(app, session).least_loaded()
+    if mechanic_id is None:
+        return None
+    mechanic = session.get(Mechanic, mechanic_id)
+    if mechanic is None:  # deleted by another worker since the last rebuild
+        tenant_state(app)[EXTENSION_KEY].remove(mechanic_id)
+        return auto_assign(app, session, ticket)
+    ticket.mechanics.append(mechanic)
+    return mechanic_id
+
+
+def rebalance(app, session):
+    """Assigns every open ticket without a mechanic, oldest first, always to whoever has the
+    fewest open tickets at that point. Returns {ticket id: mechanic id}."""
+    load = open_workloads(session)
+    if not load:
+        return {}
+    heap = [(count, mechanic_id) for mechanic_id, count in load.items()]
+    heapq.heapify(heap)
+
+    unassigned = session.scalars(
+        select(ServiceTicket.id)
+        .where(ServiceTicket.status.is_(None) | ServiceTicket.status.notin_(CLOSED))
+        .where(~select(service_mechanic.c.service_ticket_id)
+               .where(service_mechanic.c.service_ticket_id == ServiceTicket.id).exists())
+        .order_by(ServiceTicket.created_at, ServiceTicket.id)
+    ).all()
+
+    assigned = {}
+    for ticket_id in unassigned:
+        count, mechanic_id = heap[0]
+        heapq.heapreplace(heap, (count + 1, mechanic_id))
+        assigned[ticket_id] = mechanic_id
+
+    if assigned:
+        session.execute(insert(service_mechanic), [
+            {"service_ticket_id": ticket_id, "mechanic_id": mechanic_id}
+            for ticket_id, mechanic_id in assigned.items()
+        ])
+    session.commit()
+    # the bulk insert bypassed the flush events
+    workload_heap(app, session).load(session)
+    return assigned
+
+
+@assignment_cli.command("rebalance")
+@with_appcontext
+def rebalance_command():
+    """Assign every open ticket that has no mechanic yet."""
+    assigned = rebalance(current_app, db.session)
+    click.echo(f"🔧 Assigned {len(assigned)} tickets")
+
+
+# keep the heap in step with committed ORM writes
+
+def _current_heap():
+    return tenant_state(current_app).get(EXTENSION_KEY) if has_app_context() else None
+
+
+def _ticket_workload_deltas(ticket, deltas, is_new, is_deleted):
+    state = inspect(ticket)
+    status = state.attrs.status.history
+    old = (status.deleted or status.unchanged or [ticket.status])[0]
+    new = (status.added or status.unchanged or [ticket.status])[0]
+    was_open = not is_new and old not in CLOSED
+    is_open = not is_deleted and new not in CLOSED
+
+    mechanics = state.attrs.mechanics.history
+    if not mechanics and was_open != is_open:
+        # collection not loaded, only need it because the ticket opened or closed
+        mechanics = state.attrs.mechanics.load_history()
+    kept = {m.id for m in (mechanics.unchanged or ())}
+    mechanics_before = set() if is_new else kept | {m.id for m in (mechanics.deleted or ())}
+    mechanics_after = set() if is_deleted else kept | {m.id for m in (mechanics.added or ())}
+
+    for mechanic_id in mechanics_before if was_open else ():
+        deltas[mechanic_id] = deltas.get(mechanic_id, 0) - 1
+    for mechanic_id in mechanics_after if is_open else ():
+        deltas[mechanic_id] = deltas.get(mechanic_id, 0) + 1
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_workload_changes(session, flush_context):
+    # history is still there in after_flush, it's reset before after_commit
+    if _current_heap() is None:
+        return
+    deltas = session.info.setdefault("workload_deltas", {})
+    removed = session.info.setdefault("workload_removed", set())
+    for obj in session.new | session.dirty | session.deleted:
+        if isinstance(obj, ServiceTicket):
+            _ticket_workload_deltas(obj, deltas, obj in session.new, obj in session.deleted)
+        elif isinstance(obj, Mechanic):
+            if obj in session.deleted:
+                removed.add(obj.id)
+            else:
+                deltas.setdefault(obj.id, 0)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _apply_workload_changes(session):
+    deltas = session.info.pop("workload_deltas", None)
+    removed = session.info.pop("workload_removed", None)
+    heap = _current_heap()
+    if heap is None:
+        return
+    for mechanic_id, delta in (deltas or {}).items():
+        heap.adjust(mechanic_id, delta)
+    for mechanic_id in removed or ():
+        heap.remove(mechanic_id)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _drop_workload_changes(session):
+    session.info.pop("workload_deltas", None)
+    session.info.pop("workload_removed", None)
@@ -0,0 +1,3 @@
+# File: application/blueprints/admin/__init__.py
+
+from .routes import admin_bp as bp
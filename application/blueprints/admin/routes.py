@@ -0,0 +1,63 @@
+# File: application/blueprints/admin/routes.py
+
+from flask import Blueprint, request, jsonify, current_app
+from application.utils import mechanic_token_required
+from application.slow_queries import top_offenders, clear_slow_queries, slow_query_log_path
+
+admin_bp = Blueprint("admin", __name__)
+
+
+@admin_bp.route("/slow-queries", methods=["GET"])
+@mechanic_token_required
+def list_slow_queries(mechanic_id):
+    """
+    List the slowest SQL statements
+    ---
+    tags:
+      - Admin
+    summary: Top slow query offenders
+    description: Returns logged slow statements grouped by SQL text and ordered by total time spent. Only populated when SLOW_QUERY_LOG_ENABLED is on.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 20
+    responses:
+      200:
+        description: Slow statements with call counts, timings, endpoints and the latest EXPLAIN plan
+      404:
+        description: Slow query log is disabled
+    """
+    if not current_app.config.get("SLOW_QUERY_LOG_ENABLED"):
+        return jsonify({"message": "Slow query log is disabled."}), 404
+
+    limit = request.args.get("limit", 20, type=int)
+    return jsonify(top_offenders(slow_query_log_path(current_app), limit=limit)), 200
+
+
+@admin_bp.route("/slow-queries", methods=["DELETE"])
+@mechanic_token_required
+def reset_slow_queries(mechanic_id):
+    """
+    Clear the slow query log
+    ---
+    tags:
+      - Admin
+    summary: Clear slow queries
+    description: Deletes every entry in the slow query log.
+    security:
+      - ApiKeyAuth: []
+    responses:
+      200:
+        description: Log cleared
+      404:
+        description: Slow query log is disabled
+    """
+    if not current_app.config.get("SLOW_QUERY_LOG_ENABLED"):
+        return jsonify({"message": "Slow query log is disabled."}), 404
+
+    clear_slow_queries(slow_query_log_path(current_app))
+    return jsonify({"message": "Slow query log cleared."}), 200
@@ -0,0 +1,3 @@
+# File: application/blueprints/analytics/__init__.py
+
+from .routes import analytics_bp as bp
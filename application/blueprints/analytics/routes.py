@@ -0,0 +1,104 @@
+# File: application/blueprints/analytics/routes.py
+
+from datetime import date, datetime, timedelta
+from flask import Blueprint, request, jsonify
+from application.extensions import db
+from application.utils import mechanic_token_required
+from application.negotiation import render
+from application.analytics import daily_stats, top_parts, top_customers
+
+analytics_bp = Blueprint("analytics", __name__)
+
+
+@analytics_bp.route("/daily", methods=["GET"])
+@mechanic_token_required
+def get_daily_stats(mechanic_id):
+    """
+    Daily ticket volume and completion time
+    ---
+    tags:
+      - Analytics
+    summary: Tickets per day
+    description: Tickets created and completed per day, with the average hours from creation to completion for tickets completed that day. Read from the daily rollup table. Defaults to the last 30 days.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: start
+        in: query
+        type: string
+        format: date
+        required: false
+        example: "2025-01-01"
+      - name: end
+        in: query
+        type: string
+        format: date
+        required: false
+        example: "2025-01-31"
+    responses:
+      200:
+        description: One row per day that had activity
+      400:
+        description: Bad date or start after end
+    """
+    try:
+        end = date.fromisoformat(request.args["end"]) if "end" in request.args else datetime.utcnow().date()
+        start = date.fromisoformat(request.args["start"]) if "start" in request.args else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({"message": "Dates must look like YYYY-MM-DD."}), 400
+    if start > end:
+        return jsonify({"message": "start must not be after end."}), 400
+
+    return render(daily_stats(db.session, start, end))
+
+
+@analytics_bp.route("/parts", methods=["GET"])
+@mechanic_token_required
+def get_parts_revenue(mechanic_id):
+    """
+    Parts revenue by SKU
+    ---
+    tags:
+      - Analytics
+    summary: Top parts by revenue
+    description: Units booked on tickets and the revenue they brought in (at the price when booked), best sellers first.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 50
+    responses:
+      200:
+        description: Parts with units and revenue
+    """
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 500)
+    return render(top_parts(db.session, limit))
+
+
+@analytics_bp.route("/customers", methods=["GET"])
+@mechanic_token_required
+def get_customer_value(mechanic_id):
+    """
+    Customer lifetime value
+    ---
+    tags:
+      - Analytics
+    summary: Top customers
+    description: Tickets opened and parts revenue per customer, most valuable first.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 50
+    responses:
+      200:
+        description: Customers with ticket_count and lifetime_value
+    """
+    limit = min(max(request.args.get("limit", 50, type=int), 1), 500)
+    return render(top_customers(db.session, limit))
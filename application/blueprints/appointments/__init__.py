@@ -0,0 +1,3 @@
+# File: application/blueprints/appointments/__init__.py
+
+from .routes import appointments_bp as bp
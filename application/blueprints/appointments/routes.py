@@ -0,0 +1,251 @@
+# File: application/blueprints/appointments/routes.py
+
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, request, jsonify, current_app
+from application.extensions import db
+from application.models import Appointment, Mechanic, ServiceTicket
+from application.utils import mechanic_token_required
+from application.negotiation import render
+from application.scheduling import SlotTaken, book, opening_hours, schedule_for
+from .schemas import appointment_schema
+
+appointments_bp = Blueprint("appointments", __name__)
+
+
+def _parse_time(value):
+    # naive UTC like the rest of the models, offsets are converted
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _time_range(source, start_key, end_key):
+    """(start, end) from source, end may also be given as duration_minutes. Raises ValueError."""
+    start = _parse_time(str(source[start_key]))
+    if source.get(end_key):
+        end = _parse_time(str(source[end_key]))
+    else:
+        end = start + timedelta(minutes=int(source["duration_minutes"]))
+    if end <= start:
+        raise ValueError("The range must end after it starts.")
+    return start, end
+
+
+@appointments_bp.route("/", methods=["POST"])
+@mechanic_token_required
+def create_appointment(mechanic_id):
+    """
+    Book an appointment (auth: mechanic)
+    ---
+    tags:
+      - Appointments
+    summary: Book a mechanic (and optionally a bay) for a ticket
+    description: Books a time slot on a service ticket. Without mechanic_id the slot goes to the first mechanic who's free then. Overlapping bookings for the same mechanic or bay are refused with a 409 that lists them.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - service_ticket_id
+            - starts_at
+          properties:
+            service_ticket_id:
+              type: integer
+              example: 1
+            mechanic_id:
+              type: integer
+              example: 2
+            starts_at:
+              type: string
+              format: date-time
+              example: "2025-03-10T09:00:00"
+            ends_at:
+              type: string
+              format: date-time
+              example: "2025-03-10T11:00:00"
+            duration_minutes:
+              type: integer
+              example: 120
+            bay:
+              type: string
+              example: "Bay 2"
+    responses:
+      201:
+        description: Appointment booked
+      400:
+        description: Missing or invalid times
+      404:
+        description: Ticket or mechanic not found
+      409:
+        description: Slot already taken
+    """
+    data = request.get_json() or {}
+    try:
+        starts_at, ends_at = _time_range(data, "starts_at", "ends_at")
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"message": "starts_at and ends_at (or duration_minutes) are required, ends_at after starts_at."}), 400
+    if starts_at < datetime.utcnow():
+        return jsonify({"message": "Appointments can't start in the past."}), 400
+
+    if not db.session.get(ServiceTicket, data.get("service_ticket_id")):
+        return jsonify({"message": "Ticket not found"}), 404
+    booked_mechanic = data.get("mechanic_id")
+    if booked_mechanic is not None and not db.session.get(Mechanic, booked_mechanic):
+        return jsonify({"message": "Mechanic not found"}), 404
+
+    try:
+        appointment = book(current_app, db.session, data["service_ticket_id"], starts_at, ends_at,
+                           mechanic_id=booked_mechanic, bay=data.get("bay"))
+    except SlotTaken as e:
+        db.session.rollback()
+        return jsonify({"message": str(e), "conflicts": e.conflicts}), 409
+
+    db.session.commit()
+    return render(appointment_schema.dump(appointment), 201)
+
+
+@appointments_bp.route("/availability", methods=["GET"])
+@mechanic_token_required
+def get_availability(mechanic_id):
+    """
+    Is a mechanic (or bay) free (auth: mechanic)
+    ---
+    tags:
+      - Appointments
+    summary: Check a time range
+    description: With mechanic_id and/or bay, says whether they're free between start and end and which appointments are in the way. Without either, lists the mechanics who are free. Answered from the in-memory calendar.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: start
+        in: query
+        type: string
+        format: date-time
+        required: true
+      - name: end
+        in: query
+        type: string
+        format: date-time
+        required: true
+      - name: mechanic_id
+        in: query
+        type: integer
+        required: false
+      - name: bay
+        in: query
+        type: string
+        required: false
+    responses:
+      200:
+        description: free + conflicts, or free_mechanics
+      400:
+        description: Missing or invalid times
+    """
+    try:
+        start, end = _time_range(request.args, "start", "end")
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"message": "start and end are required, end after start."}), 400
+
+    schedule = schedule_for(current_app, db.session)
+    checked_mechanic = request.args.get("mechanic_id", type=int)
+    bay = request.args.get("bay")
+    if checked_mechanic is None and bay is None:
+        return jsonify({"free_mechanics": schedule.free_mechanics(start, end)}), 200
+
+    conflicts = schedule.conflicts(start, end, checked_mechanic, bay)
+    return jsonify({"free": not conflicts, "conflicts": conflicts}), 200
+
+
+@appointments_bp.route("/next-free", methods=["GET"])
+@mechanic_token_required
+def get_next_free_slot(mechanic_id):
+    """
+    Next free slot (auth: mechanic)
+    ---
+    tags:
+      - Appointments
+    summary: Earliest free slot
+    description: The earliest slot of the given length inside opening hours (APPOINTMENT_OPEN_HOUR to APPOINTMENT_CLOSE_HOUR), for one mechanic or for whoever is free first. Looks APPOINTMENT_SEARCH_DAYS ahead.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: duration_minutes
+        in: query
+        type: integer
+        required: false
+        default: 60
+      - name: after
+        in: query
+        type: string
+        format: date-time
+        required: false
+        description: Defaults to now
+      - name: mechanic_id
+        in: query
+        type: integer
+        required: false
+    responses:
+      200:
+        description: mechanic_id, starts_at and ends_at of the slot
+      400:
+        description: Bad duration or time
+      404:
+        description: Nothing free in the search window
+    """
+    try:
+        duration = timedelta(minutes=request.args.get("duration_minutes", 60, type=int))
+        after = _parse_time(request.args["after"]) if "after" in request.args else datetime.utcnow()
+    except ValueError:
+        return jsonify({"message": "after must be an ISO date-time."}), 400
+    if duration <= timedelta(0):
+        return jsonify({"message": "duration_minutes must be positive."}), 400
+    after = max(after, datetime.utcnow())
+
+    until = after + timedelta(days=current_app.config.get("APPOINTMENT_SEARCH_DAYS", 30))
+    schedule = schedule_for(current_app, db.session)
+    found = schedule.next_free(after, duration, opening_hours(current_app), until,
+                               mechanic_id=request.args.get("mechanic_id", type=int))
+    if found is None:
+        return jsonify({"message": "No free slot in the search window."}), 404
+
+    free_mechanic, starts_at = found
+    return jsonify({
+        "mechanic_id": free_mechanic,
+        "starts_at": starts_at.isoformat(),
+        "ends_at": (starts_at + duration).isoformat(),
+    }), 200
+
+
+@appointments_bp.route("/<int:appointment_id>", methods=["DELETE"])
+@mechanic_token_required
+def cancel_appointment(mechanic_id, appointment_id):
+    """
+    Cancel an appointment (auth: mechanic)
+    ---
+    tags:
+      - Appointments
+    summary: Cancel
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: appointment_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Appointment cancelled
+      404:
+        description: Appointment not found
+    """
+    appointment = db.session.get(Appointment, appointment_id)
+    if not appointment:
+        return jsonify({"message": "Appointment not found"}), 404
+    db.session.delete(appointment)
+    db.session.commit()
+    return jsonify({"message": "Appointment cancelled."}), 200
@@ -0,0 +1,12 @@
+# File: application/blueprints/appointments/schemas.py
+
+from application.extensions import ma
+from application.models import Appointment
+
+class AppointmentSchema(ma.SQLAlchemyAutoSchema):
+    class Meta:
+        model = Appointment
+        load_instance = True
+        include_fk = True
+
+appointment_schema = AppointmentSchema()
@@ -0,0 +1,3 @@
+# File: application/blueprints/batch/__init__.py
+
+from .routes import batch_bp as bp
@@ -0,0 +1,177 @@
+# File: application/blueprints/batch/routes.py
+
+from flask import Blueprint, request, jsonify, current_app
+from werkzeug.test import EnvironBuilder
+from application import assignment, scheduling, typeahead
+from application.extensions import db
+from application.tenancy import tenant_engine
+
+batch_bp = Blueprint("batch", __name__)
+
+ALLOWED_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE"}
+
+
+@batch_bp.route("", methods=["POST"])
+def run_batch():
+    """
+    Run several API calls in one round trip
+    ---
+    tags:
+      - Batch
+    summary: Batch sub-requests
+    description: Dispatches an ordered list of sub-requests through the normal routes. They share the caller's Authorization header (decoded once) and one database connection. With atomic=true they run in a single transaction that is rolled back if any sub-request fails, and the remaining sub-requests are skipped.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - requests
+          properties:
+            atomic:
+              type: boolean
+              example: false
+            requests:
+              type: array
+              items:
+                type: object
+                required:
+                  - method
+                  - path
+                properties:
+                  method:
+                    type: string
+                    example: PUT
+                  path:
+                    type: string
+                    example: /service-tickets/1/update-status
+                  body:
+                    type: object
+                    example: {"status": "In Progress"}
+    responses:
+      200:
+        description: One result (status and body) per sub-request, in order
+      400:
+        description: Malformed batch or a limit was exceeded
+    """
+    data = request.get_json(silent=True) or {}
+    subrequests = data.get("requests")
+    atomic = bool(data.get("atomic", False))
+
+    error = _validate(subrequests)
+    if error:
+        return jsonify({"message": error}), 400
+
+    forwarded = {"Content-Type": "application/json"}
+    if "Authorization" in request.headers:
+        forwarded["Authorization"] = request.headers["Authorization"]
+
+    # every sub-request runs in this app context, so binding the scoped session to one
+    # connection here is what they all use. In atomic mode their commits only release
+    # savepoints and the real commit/rollback happens below.
+    connection = tenant_engine().connect()
+    outer = _begin_outer(connection) if atomic else None
+    db.session.remove()
+    db.session.registry.set(db.session.session_factory(
+        bind=connection,
+        join_transaction_mode="create_savepoint" if atomic else "conditional_savepoint",
+    ))
+
+    results = []
+    failed = False
+    try:
+        for sub in subrequests:
+            if failed and atomic:
+                results.append({"status": 424, "body": {"message": "Skipped, an earlier sub-request failed."}})
+                continue
+            result = _dispatch(sub, forwarded)
+            failed = failed or result["status"] >= 400
+            results.append(result)
+
+        committed = None
+        if atomic:
+            if failed:
+                outer.rollback()
+                _forget_rolled_back_writes()
+            else:
+                outer.commit()
+            committed = not failed
+    finally:
+        db.session.remove()
+        connection.close()
+
+    body = {"responses": results}
+    if atomic:
+        body["committed"] = committed
+    return jsonify(body), 200
+
+
+def _forget_rolled_back_writes():
+    # each sub-request's commit only released a savepoint, but the in-memory indexes took
+    # its writes on after_commit all the same. Rolling back the batch has to undo them,
+    # they're rebuilt from the database on next use.
+    assignment.invalidate(current_app)
+    scheduling.invalidate(current_app)
+    typeahead.invalidate(current_app)
+
+
+def _begin_outer(connection):
+    transaction = connection.begin()
+    if connection.dialect.name == "sqlite" and not connection.connection.dbapi_connection.in_transaction:
+        # pysqlite only opens its transaction lazily before DML, so the first SAVEPOINT would
+        # become the outermost transaction and releasing it would commit. Open it up front.
+        connection.exec_driver_sql("BEGIN")
+    return transaction
+
+
+def _validate(subrequests):
+    if not isinstance(subrequests, list) or not subrequests:
+        return "requests must be a non-empty list."
+
+    max_requests = current_app.config.get("BATCH_MAX_REQUESTS", 20)
+    if len(subrequests) > max_requests:
+        return f"A batch can hold at most {max_requests} requests."
+
+    max_body = current_app.config.get("BATCH_MAX_BODY_BYTES", 64 * 1024)
+    for i, sub in enumerate(subrequests):
+        if not isinstance(sub, dict) or not isinstance(sub.get("path"), str):
+            return f"requests[{i}] needs a method and a path."
+        if str(sub.get("method", "")).upper() not in ALLOWED_METHODS:
+            return f"requests[{i}] has an unsupported method."
+        if not sub["path"].startswith("/") or sub["path"].split("?")[0].rstrip("/") == request.path.rstrip("/"):
+            return f"requests[{i}] has an invalid path."
+        if len(current_app.json.dumps(sub.get("body"))) > max_body:
+            return f"requests[{i}] body is larger than {max_body} bytes."
+    return None
+
+
+def _dispatch(sub, headers):
+    app = current_app._get_current_object()
+    builder = EnvironBuilder(
+        path=sub["path"],
+        method=sub["method"].upper(),
+        headers=headers,
+        json=sub.get("body"),
+        base_url=request.host_url,
+        environ_base={"REMOTE_ADDR": request.remote_addr},
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    with app.request_context(environ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception:
+            app.logger.exception("Batch sub-request %s %s failed", sub["method"], sub["path"])
+            db.session.rollback()
+            return {"status": 500, "body": {"message": "Internal server error."}}
+
+    body = response.get_json(silent=True)
+    if body is None:
+        body = response.get_data(as_text=True) or None
+    return {"status": response.status_code, "body": body}
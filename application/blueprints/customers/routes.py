@@ -1,15 +1,20 @@
 # File: application/blueprints/customers/routes.py
 
-from flask import Blueprint, request, jsonify
-from application.models import db, Customer, ServiceTicket
-from application.utils import encode_token, token_required, hash_password, verify_password
+from flask import Blueprint, request, jsonify, current_app
+from application.models import db, ArchivedTicket, Customer, ServiceTicket
+from application.utils import encode_token, token_required, mechanic_token_required, hash_password, verify_password
+from application.idempotency import idempotent
 from application.extensions import limiter
+from application.negotiation import render
+from application.similarity import find_similar
+from application.archive import include_archived
 from sqlalchemy.exc import IntegrityError
 from .schemas import customer_schema, customers_schema, login_schema
 
 customers_bp = Blueprint("customers", __name__)
 
 @customers_bp.route("/register", methods=["POST"])
+@idempotent
 def register_customer():
     """
     Register a new customer
@@ -19,6 +24,11 @@ def register_customer():
     summary: Register customer
     description: Creates a new customer and returns their info.
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Optional retry key, repeating a request with the same key replays the first response instead of running it again
       - in: body
         name: body
         required: true
@@ -40,7 +50,7 @@ def register_customer():
               example: securepassword123
     responses:
       201:
-        description: Customer created successfully
+        description: Customer created successfully. If it looks like an existing customer, their ids are in the X-Possible-Duplicates header.
         schema:
           type: object
           properties:
@@ -64,7 +74,16 @@ def register_customer():
         )
         db.session.add(new_customer)
         db.session.commit()
-        return customer_schema.jsonify(new_customer), 201
+        response = render(customer_schema.dump(new_customer), 201)
+        if current_app.config.get("CUSTOMER_DUPLICATE_WARNING", False):
+            similar = find_similar(
+                db.session, name=new_customer.name, email=new_customer.email,
+                threshold=current_app.config.get("CUSTOMER_SIMILARITY_THRESHOLD", 0.5),
+                limit=5, exclude_id=new_customer.id,
+            )
+            if similar:
+                response.headers["X-Possible-Duplicates"] = ",".join(str(c.id) for c, _ in similar)
+        return response
     except IntegrityError:
         db.session.rollback()
         return jsonify({"message": "Email already registered."}), 409
@@ -72,6 +91,53 @@ def register_customer():
         return jsonify({"error": f"Missing field: {e}"}), 400
 
 
+@customers_bp.route("/similar", methods=["GET"])
+@mechanic_token_required
+def get_similar_customers(mechanic_id):
+    """
+    Find likely duplicate customers (auth: mechanic)
+    ---
+    tags:
+      - Customers
+    summary: Similar customers
+    description: Looks up customers whose name or email (the part before the @) is close to the given ones, like "Jon Smith" vs "John Smith". Uses a trigram index, so it doesn't scan every customer.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: name
+        in: query
+        type: string
+        required: false
+        example: Jon Smith
+      - name: email
+        in: query
+        type: string
+        required: false
+        example: jon.smith@example.com
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 10
+    responses:
+      200:
+        description: Similar customers with a 0-1 score, best first
+      400:
+        description: Neither name nor email given
+    """
+    name = request.args.get("name", "").strip()
+    email = request.args.get("email", "").strip()
+    if not name and not email:
+        return jsonify({"message": "Provide a name or an email."}), 400
+
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+    similar = find_similar(
+        db.session, name=name, email=email,
+        threshold=current_app.config.get("CUSTOMER_SIMILARITY_THRESHOLD", 0.5), limit=limit,
+    )
+    return render([{**customer_schema.dump(customer), "score": score} for customer, score in similar])
+
+
 @customers_bp.route("/login", methods=["POST"])
 @limiter.limit("5 per minute")
 def login_customer():
@@ -142,6 +208,12 @@ def get_customer_tickets(customer_id, username):
         type: string
         required: true
         description: The username of the customer
+      - name: include_archived
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Also include tickets moved to the archive
     responses:
       200:
         description: List of tickets
@@ -153,6 +225,9 @@ def get_customer_tickets(customer_id, username):
         return jsonify({"message": "Unauthorized or customer not found."}), 403
 
     tickets = ServiceTicket.query.filter_by(customer_id=customer.id).all()
+    if include_archived(request.args):
+        tickets += ArchivedTicket.query.filter_by(customer_id=customer.id).all()
+        tickets.sort(key=lambda t: t.id)
     return jsonify([
         {
             "id": t.id,
@@ -189,7 +264,7 @@ def get_all_customers():
     page = request.args.get("page", 1, type=int)
     per_page = request.args.get("per_page", 10, type=int)
     customers = Customer.query.paginate(page=page, per_page=per_page, error_out=False)
-    return jsonify({
+    return render({
         "customers": customers_schema.dump(customers.items),
         "total": customers.total,
         "pages": customers.pages,
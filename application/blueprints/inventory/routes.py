@@ -1,9 +1,15 @@
 # File: application/blueprints/inventory/routes.py
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from application.extensions import db, limiter, cache
 from application.models import Inventory, ServiceTicket
 from application.utils import mechanic_token_required
+from application.idempotency import idempotent
+from application.negotiation import render, negotiated_cache_key
+from application.typeahead import prefix_index, database_prefix_search, with_current_stock
+from application.stock import reserve, OutOfStock
+from application.forecasting import reorder_suggestions
+from application.concurrency import commit_ticket, touch
 from .schemas import InventorySchema
 
 inventory_bp = Blueprint("inventory", __name__)
@@ -14,7 +20,7 @@ inventory_list_schema = InventorySchema(many=True)
 
 
 @inventory_bp.route("/", methods=["GET"])
-@cache.cached(timeout=60)
+@cache.cached(timeout=60, key_prefix=negotiated_cache_key)
 def get_all_parts():
     """
     Get all inventory parts
@@ -32,11 +38,79 @@ def get_all_parts():
             $ref: '#/definitions/Inventory'
     """
     parts = Inventory.query.all()
-    return jsonify(inventory_list_schema.dump(parts)), 200
+    return render(inventory_list_schema.dump(parts))
+
+@inventory_bp.route("/search", methods=["GET"])
+def search_parts():
+    """
+    Typeahead search for inventory parts
+    ---
+    tags:
+      - Inventory
+    summary: Search parts by name prefix
+    description: Returns the best matching parts for a name prefix, matching the start of any word in the name. Names that start with the prefix rank first, then shorter names. Served from an in-memory index, stock levels are read live.
+    parameters:
+      - name: prefix
+        in: query
+        type: string
+        required: true
+        example: brake p
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 10
+    responses:
+      200:
+        description: Matching parts, best first
+        schema:
+          type: array
+          items:
+            $ref: '#/definitions/Inventory'
+      400:
+        description: Missing prefix
+    """
+    prefix = request.args.get("prefix", "")
+    if not prefix.strip():
+        return jsonify({"message": "prefix is required."}), 400
+    limit = min(max(request.args.get("limit", 10, type=int), 1), 50)
+
+    if not current_app.config.get("INVENTORY_SEARCH_INDEX", True):
+        return render(inventory_list_schema.dump(database_prefix_search(db.session, prefix, limit)))
+
+    index = prefix_index(current_app, db.session, inventory_schema.dump)
+    return render(with_current_stock(db.session, index.search(prefix, limit)))
+
+@inventory_bp.route("/reorder-suggestions", methods=["GET"])
+@mechanic_token_required
+def get_reorder_suggestions(mechanic_id):
+    """
+    Reorder suggestions
+    ---
+    tags:
+      - Inventory
+    summary: Parts that need reordering
+    description: Forecasts daily demand per part from ticket_parts history (moving average with a yearly seasonal factor), adds safety stock for the lead time and lists the stock-tracked parts at or below their reorder point, with how many to order. The forecast is recomputed once a day, stock on hand is live.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: all
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Include every part, not just the ones that need ordering
+    responses:
+      200:
+        description: Suggestions, biggest orders first
+    """
+    include_all = request.args.get("all", "false").lower() in ("1", "true", "yes")
+    return render(reorder_suggestions(current_app, db.session, include_all))
 
 @inventory_bp.route("/", methods=["POST"])
 @mechanic_token_required
 @limiter.limit("5 per minute")
+@idempotent
 def add_part(mechanic_id):
     """
     Add a new inventory part
@@ -48,6 +122,11 @@ def add_part(mechanic_id):
     security:
       - ApiKeyAuth: []
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Optional retry key, repeating a request with the same key replays the first response instead of running it again
       - in: body
         name: body
         required: true
@@ -64,13 +143,17 @@ def add_part(mechanic_id):
               type: number
               format: float
               example: 15.99
+            quantity_on_hand:
+              type: integer
+              example: 40
+              description: Leave out for parts that aren't stock-tracked
     responses:
       201:
         description: Part added successfully
         schema:
           $ref: '#/definitions/Inventory'
       400:
-        description: Missing name or price
+        description: Missing name or price, or a bad quantity_on_hand
     """
     data = request.get_json()
     name = data.get("name")
@@ -78,12 +161,18 @@ def add_part(mechanic_id):
 
     if not name or price is None:
         return jsonify({"message": "Name and price required."}), 400
+    if not _valid_stock(data.get("quantity_on_hand")):
+        return jsonify({"message": "quantity_on_hand must be a non-negative integer or null."}), 400
 
-    new_part = Inventory(name=name, price=price)
+    new_part = Inventory(name=name, price=price, quantity_on_hand=data.get("quantity_on_hand"))
     db.session.add(new_part)
     db.session.commit()
 
-    return inventory_schema.jsonify(new_part), 201
+    return render(inventory_schema.dump(new_part), 201)
+
+def _valid_stock(quantity):
+    # NULL means not stock-tracked, anything else has to get past ck_inventory_stock_not_negative
+    return quantity is None or (isinstance(quantity, int) and not isinstance(quantity, bool) and quantity >= 0)
 
 @inventory_bp.route("/<int:item_id>", methods=["PUT"])
 @mechanic_token_required
@@ -94,7 +183,7 @@ def update_part(mechanic_id, item_id):
     tags:
       - Inventory
     summary: Update an existing part
-    description: Mechanic-only route to update the name or price of a part.
+    description: Mechanic-only route to update the name, price or stock count of a part.
     security:
       - ApiKeyAuth: []
     parameters:
@@ -115,20 +204,28 @@ def update_part(mechanic_id, item_id):
               type: number
               format: float
               example: 49.99
+            quantity_on_hand:
+              type: integer
+              example: 12
     responses:
       200:
         description: Part updated
         schema:
           $ref: '#/definitions/Inventory'
+      400:
+        description: quantity_on_hand isn't a non-negative integer
     """
     part = Inventory.query.get_or_404(item_id)
     data = request.get_json()
+    if not _valid_stock(data.get("quantity_on_hand")):
+        return jsonify({"message": "quantity_on_hand must be a non-negative integer or null."}), 400
 
     part.name = data.get("name", part.name)
     part.price = data.get("price", part.price)
+    part.quantity_on_hand = data.get("quantity_on_hand", part.quantity_on_hand)
 
     db.session.commit()
-    return inventory_schema.jsonify(part), 200
+    return render(inventory_schema.dump(part))
 
 @inventory_bp.route("/<int:item_id>", methods=["DELETE"])
 @mechanic_token_required
@@ -159,6 +256,7 @@ def delete_part(mechanic_id, item_id):
 
 @inventory_bp.route("/add-part/<int:ticket_id>", methods=["POST"])
 @mechanic_token_required
+@idempotent
 def add_part_to_ticket(mechanic_id, ticket_id):
     """
     Add a part to a service ticket
@@ -166,10 +264,15 @@ def add_part_to_ticket(mechanic_id, ticket_id):
     tags:
       - Inventory
     summary: Attach a part to a service ticket
-    description: Mechanic-only route to associate a part with a ticket.
+    description: Mechanic-only route to associate a part with a ticket. The quantity comes off the part's stock atomically, a part that's already on the ticket gets its quantity increased.
     security:
       - ApiKeyAuth: []
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Optional retry key, repeating a request with the same key replays the first response instead of running it again
       - name: ticket_id
         in: path
         type: integer
@@ -186,22 +289,35 @@ def add_part_to_ticket(mechanic_id, ticket_id):
             part_id:
               type: integer
               example: 3
+            quantity:
+              type: integer
+              example: 1
     responses:
       200:
         description: Part added to ticket
+      400:
+        description: Invalid quantity
       404:
         description: Invalid ticket or part ID
+      409:
+        description: Not enough stock, or the ticket was changed at the same time
     """
     ticket = ServiceTicket.query.get_or_404(ticket_id)
     data = request.get_json()
     part_id = data.get("part_id")
+    quantity = data.get("quantity", 1)
+    if not isinstance(quantity, int) or quantity < 1:
+        return jsonify({"message": "Quantity must be a positive integer."}), 400
 
-    part = Inventory.query.get(part_id)
-    if not part:
-        return jsonify({"message": "Invalid part ID."}), 404
-
-    if part not in ticket.parts:
-        ticket.parts.append(part)
-        db.session.commit()
+    try:
+        if not reserve(db.session, ticket.id, part_id, quantity):
+            return jsonify({"message": "Invalid part ID."}), 404
+    except OutOfStock as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 409
 
+    touch(ticket)
+    conflict = commit_ticket(db.session, ticket)
+    if conflict:
+        return conflict
     return jsonify({"message": "Part added to ticket."}), 200
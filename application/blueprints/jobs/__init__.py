@@ -0,0 +1,3 @@
+# File: application/blueprints/jobs/__init__.py
+
+from .routes import jobs_bp as bp
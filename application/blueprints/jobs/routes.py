@@ -0,0 +1,170 @@
+# File: application/blueprints/jobs/routes.py
+
+from flask import Blueprint, Response, request, jsonify, url_for
+from sqlalchemy import select
+from application.extensions import db
+from application.jobs import JOB_TYPES, SUCCEEDED, InvalidJob, enqueue
+from application.models import Job
+from application.utils import mechanic_token_required
+from application.negotiation import render
+from .schemas import job_schema, jobs_schema
+
+jobs_bp = Blueprint("jobs", __name__)
+
+
+@jobs_bp.route("/", methods=["POST"])
+@mechanic_token_required
+def create_job(mechanic_id):
+    """
+    Queue a background job (auth: mechanic)
+    ---
+    tags:
+      - Jobs
+    summary: Run heavy work in the background
+    description: "Queues the job for `flask worker` and answers right away. Poll the Location URL for its status. Types: tickets.export (format json|csv, status, include_archived), inventory.import (items [{name, price, quantity_on_hand}]), reports.reorder (include_all), analytics.rebuild, archive.run (days, batch_size)."
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - type
+          properties:
+            type:
+              type: string
+              example: tickets.export
+            params:
+              type: object
+              example: {"format": "csv", "include_archived": true}
+            priority:
+              type: integer
+              description: Higher runs first, defaults to the job type's priority
+    responses:
+      202:
+        description: Queued, the body is the job
+      400:
+        description: Unknown job type or bad parameters
+    """
+    data = request.get_json() or {}
+    priority = data.get("priority")
+    if priority is not None and not isinstance(priority, int):
+        return jsonify({"message": "priority must be an integer."}), 400
+    if not isinstance(data.get("params", {}), dict):
+        return jsonify({"message": "params must be an object."}), 400
+    try:
+        job = enqueue(db.session, data.get("type"), data.get("params"), priority, created_by=int(mechanic_id))
+    except InvalidJob as e:
+        return jsonify({"message": str(e), "types": sorted(JOB_TYPES)}), 400
+    db.session.commit()
+
+    response = render(job_schema.dump(job), 202)
+    response.headers["Location"] = url_for("jobs.get_job", job_id=job.id)
+    return response
+
+
+@jobs_bp.route("/", methods=["GET"])
+@mechanic_token_required
+def list_jobs(mechanic_id):
+    """
+    List recent jobs (auth: mechanic)
+    ---
+    tags:
+      - Jobs
+    summary: Recent background jobs, newest first
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: status
+        in: query
+        type: string
+        enum: [queued, running, succeeded, failed]
+        required: false
+      - name: type
+        in: query
+        type: string
+        required: false
+      - name: limit
+        in: query
+        type: integer
+        required: false
+        default: 50
+    responses:
+      200:
+        description: Jobs, without their params and results
+    """
+    query = select(Job).order_by(Job.id.desc()).limit(min(request.args.get("limit", 50, type=int), 500))
+    if request.args.get("status"):
+        query = query.where(Job.status == request.args["status"])
+    if request.args.get("type"):
+        query = query.where(Job.job_type == request.args["type"])
+    return render(jobs_schema.dump(db.session.scalars(query).all()))
+
+
+@jobs_bp.route("/<int:job_id>", methods=["GET"])
+@mechanic_token_required
+def get_job(mechanic_id, job_id):
+    """
+    Poll a job (auth: mechanic)
+    ---
+    tags:
+      - Jobs
+    summary: Status of a background job
+    description: status goes queued -> running -> succeeded or failed. A succeeded job carries its result, a failed one its error.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: job_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: The job
+      404:
+        description: No such job
+    """
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({"message": "Job not found"}), 404
+    return render(job_schema.dump(job))
+
+
+@jobs_bp.route("/<int:job_id>/result", methods=["GET"])
+@mechanic_token_required
+def get_job_result(mechanic_id, job_id):
+    """
+    Download a job's result (auth: mechanic)
+    ---
+    tags:
+      - Jobs
+    summary: Just the result of a finished job
+    description: CSV exports come back as a text/csv file, everything else as the result object.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: job_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: The result
+      404:
+        description: No such job
+      409:
+        description: The job hasn't succeeded (yet)
+    """
+    job = db.session.get(Job, job_id)
+    if not job:
+        return jsonify({"message": "Job not found"}), 404
+    if job.status != SUCCEEDED:
+        return jsonify({"message": f"Job is {job.status}.", "status": job.status}), 409
+    result = job_schema.dump(job)["result"]
+    if isinstance(result, dict) and "csv" in result:
+        return Response(result["csv"], mimetype="text/csv", headers={
+            "Content-Disposition": f"attachment; filename={job.job_type.replace('.', '-')}-{job.id}.csv",
+        })
+    return render(result)
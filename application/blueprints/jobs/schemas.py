@@ -0,0 +1,26 @@
+# File: application/blueprints/jobs/schemas.py
+
+import json
+from marshmallow import fields
+from application.extensions import ma
+from application.models import Job
+
+class JobSchema(ma.SQLAlchemyAutoSchema):
+    # stored as JSON text, handed back as JSON
+    params = fields.Method("load_params")
+    result = fields.Method("load_result")
+
+    class Meta:
+        model = Job
+        fields = ("id", "job_type", "params", "priority", "status", "created_by", "created_at",
+                  "attempts", "started_at", "finished_at", "result", "error")
+
+    def load_params(self, job):
+        return json.loads(job.params)
+
+    def load_result(self, job):
+        return json.loads(job.result) if job.result is not None else None
+
+job_schema = JobSchema()
+# lists leave the results out, they can be whole exports
+jobs_schema = JobSchema(many=True, exclude=("params", "result"))
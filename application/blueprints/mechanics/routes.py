@@ -4,12 +4,15 @@ from flask import Blueprint, request, jsonify
 from application.extensions import db
 from application.models import Mechanic, ServiceTicket
 from application.utils import hash_password, verify_password, encode_token, mechanic_token_required
+from application.idempotency import idempotent
+from application.negotiation import render
 from .schemas import mechanics_schema
 from sqlalchemy import func
 
 mechanics_bp = Blueprint("mechanics", __name__)
 
 @mechanics_bp.route("/register", methods=["POST"])
+@idempotent
 def register_mechanic():
     """
     Register a new mechanic
@@ -19,6 +22,11 @@ def register_mechanic():
     summary: Register mechanic
     description: Register a new mechanic and return confirmation.
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Optional retry key, repeating a request with the same key replays the first response instead of running it again
       - in: body
         name: body
         schema:
@@ -184,7 +192,7 @@ def list_all_mechanics():
             $ref: '#/definitions/Mechanic'
     """
     mechanics = Mechanic.query.all()
-    return mechanics_schema.jsonify(mechanics), 200
+    return render(mechanics_schema.dump(mechanics))
 
 @mechanics_bp.route("/<int:mechanic_id>", methods=["DELETE"])
 @mechanic_token_required
@@ -1,9 +1,20 @@
 # File: "application/blueprints/service_tickets/routes.py"
 
-from flask import Blueprint, request, jsonify
+import math
+from datetime import date, datetime, timedelta
+from flask import Blueprint, request, jsonify, current_app
 from application.extensions import db, limiter
-from application.models import ServiceTicket, Mechanic, Inventory
+from application.models import ArchivedTicket, ServiceTicket, Mechanic
 from application.utils import token_required, mechanic_token_required
+from application.idempotency import idempotent
+from application.negotiation import render
+from application.fulltext import search_tickets
+from application.stock import reserve, OutOfStock
+from application.costs import with_totals, range_totals
+from application.assignment import auto_assign, invalidate, rebalance
+from application.concurrency import commit_ticket, precondition_failed, touch, with_etag
+from application.archive import dump_archived, dump_tickets, include_archived
+from application.workflow import STATUSES, InvalidTransition, bulk_transition, check_transition
 from .schemas import ticket_schema, tickets_schema
 
 service_tickets_bp = Blueprint("service_tickets", __name__)
@@ -16,7 +27,14 @@ def list_all_tickets():
     tags:
       - Service Tickets
     summary: Retrieve all tickets
-    description: Returns a full list of all service tickets (admin/demo use).
+    description: Returns a full list of all service tickets (admin/demo use), each with its total_parts_cost and part_count.
+    parameters:
+      - name: include_archived
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Also include tickets moved to the archive, each ticket then says whether it's archived
     responses:
       200:
         description: A list of service tickets
@@ -25,11 +43,127 @@ def list_all_tickets():
           items:
             $ref: '#/definitions/ServiceTicket'
     """
-    tickets = ServiceTicket.query.all()
-    return tickets_schema.jsonify(tickets), 200
+    return render(dump_tickets(db.session, tickets_schema, include_archived(request.args)))
+
+@service_tickets_bp.route("/search", methods=["GET"])
+def search_service_tickets():
+    """
+    Search service tickets
+    ---
+    tags:
+      - Service Tickets
+    summary: Full-text ticket search
+    description: Finds tickets whose description contains every word of q (the last word can be partial), best matches first. Uses SQLite FTS5 or a Postgres GIN index. Queries matching more than SEARCH_RANK_LIMIT tickets come back newest first with ranked=false.
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        example: grinding brake
+      - name: page
+        in: query
+        type: integer
+        required: false
+        default: 1
+      - name: per_page
+        in: query
+        type: integer
+        required: false
+        default: 10
+      - name: include_archived
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Also include tickets moved to the archive, they come after every match that isn't
+    responses:
+      200:
+        description: Paginated, ranked search results
+      400:
+        description: Missing search query
+    """
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"message": "Search query q is required."}), 400
+
+    page = max(request.args.get("page", 1, type=int), 1)
+    per_page = min(max(request.args.get("per_page", 10, type=int), 1), 100)
+    archived = include_archived(request.args)
+    tickets, total, ranked = search_tickets(
+        db.session, q, page=page, per_page=per_page,
+        rank_limit=current_app.config.get("SEARCH_RANK_LIMIT", 5000),
+        include_archived=archived,
+    )
+    hot = [t for t in tickets if isinstance(t, ServiceTicket)]
+    dumped = with_totals(db.session, tickets_schema.dump(hot))
+    if archived:
+        for ticket in dumped:
+            ticket["archived"] = False
+        dumped += dump_archived(db.session, tickets_schema, tickets[len(hot):])
+    return render({
+        "tickets": dumped,
+        "total": total,
+        "ranked": ranked,
+        "pages": math.ceil(total / per_page),
+        "current_page": page,
+    })
+
+@service_tickets_bp.route("/totals", methods=["GET"])
+@mechanic_token_required
+def get_ticket_totals(mechanic_id):
+    """
+    Parts totals for a date range (auth: mechanic)
+    ---
+    tags:
+      - Service Tickets
+    summary: Ticket totals
+    description: Number of tickets created between start and end (inclusive), with the parts booked on them and what those parts cost. Defaults to the last 30 days.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: start
+        in: query
+        type: string
+        format: date
+        required: false
+        example: "2025-01-01"
+      - name: end
+        in: query
+        type: string
+        format: date
+        required: false
+        example: "2025-01-31"
+      - name: include_archived
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Also include tickets moved to the archive
+    responses:
+      200:
+        description: ticket_count, part_count and total_parts_cost for the range
+      400:
+        description: Bad date or start after end
+    """
+    try:
+        end = date.fromisoformat(request.args["end"]) if "end" in request.args else datetime.utcnow().date()
+        start = date.fromisoformat(request.args["start"]) if "start" in request.args else end - timedelta(days=29)
+    except ValueError:
+        return jsonify({"message": "Dates must look like YYYY-MM-DD."}), 400
+    if start > end:
+        return jsonify({"message": "start must not be after end."}), 400
+
+    totals = range_totals(
+        db.session,
+        datetime.combine(start, datetime.min.time()),
+        datetime.combine(end + timedelta(days=1), datetime.min.time()),
+        include_archived=include_archived(request.args),
+    )
+    return render({"start": start.isoformat(), "end": end.isoformat(), **totals})
 
 @service_tickets_bp.route("/", methods=["POST"])
 @token_required
+@idempotent
 def create_ticket(customer_id):
     """
     Create a new service ticket (auth: customer)
@@ -37,10 +171,15 @@ def create_ticket(customer_id):
     tags:
       - Service Tickets
     summary: Create ticket
-    description: Create a service ticket for the authenticated customer.
+    description: Create a service ticket for the authenticated customer. Unless AUTO_ASSIGN_MECHANICS is off, the mechanic with the fewest open tickets is put on it.
     security:
       - ApiKeyAuth: []
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Optional retry key, repeating a request with the same key replays the first response instead of running it again
       - in: body
         name: body
         schema:
@@ -53,7 +192,7 @@ def create_ticket(customer_id):
               example: Car making grinding noise when braking
     responses:
       201:
-        description: Ticket created successfully
+        description: Ticket created successfully, with assigned_mechanic_id (null when nobody could be assigned)
       400:
         description: Description is required
     """
@@ -65,9 +204,34 @@ def create_ticket(customer_id):
 
     ticket = ServiceTicket(description=description, customer_id=customer_id)
     db.session.add(ticket)
+    mechanic_id = None
+    if current_app.config.get("AUTO_ASSIGN_MECHANICS", True):
+        mechanic_id = auto_assign(current_app, db.session, ticket)
     db.session.commit()
 
-    return jsonify({"message": "Ticket created", "ticket_id": ticket.id}), 201
+    return jsonify({"message": "Ticket created", "ticket_id": ticket.id, "assigned_mechanic_id": mechanic_id}), 201
+
+@service_tickets_bp.route("/rebalance", methods=["POST"])
+@mechanic_token_required
+def rebalance_tickets(mechanic_id):
+    """
+    Assign the unassigned backlog (auth: mechanic)
+    ---
+    tags:
+      - Service Tickets
+    summary: Rebalance
+    description: Gives every open ticket that has no mechanic to the mechanic with the fewest open tickets at that point, oldest ticket first. Meant for the morning backlog or after auto-assignment was switched off.
+    security:
+      - ApiKeyAuth: []
+    responses:
+      200:
+        description: How many tickets went to whom
+    """
+    assigned = rebalance(current_app, db.session)
+    return jsonify({
+        "assigned": len(assigned),
+        "assignments": [{"ticket_id": t, "mechanic_id": m} for t, m in assigned.items()],
+    }), 200
 
 @service_tickets_bp.route("/my-tickets", methods=["GET"])
 @token_required
@@ -79,15 +243,59 @@ def get_my_tickets(customer_id):
     tags:
       - Service Tickets
     summary: View my tickets
-    description: Returns all tickets for the current authenticated customer.
+    description: Returns all tickets for the current authenticated customer, each with its total_parts_cost and part_count.
     security:
       - ApiKeyAuth: []
+    parameters:
+      - name: include_archived
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Also include tickets moved to the archive, each ticket then says whether it's archived
     responses:
       200:
         description: List of tickets for customer
     """
-    tickets = ServiceTicket.query.filter_by(customer_id=customer_id).all()
-    return tickets_schema.jsonify(tickets), 200
+    return render(dump_tickets(db.session, tickets_schema, include_archived(request.args), customer_id=customer_id))
+
+@service_tickets_bp.route("/<int:ticket_id>", methods=["GET"])
+def get_ticket(ticket_id):
+    """
+    Get one service ticket
+    ---
+    tags:
+      - Service Tickets
+    summary: View a ticket
+    description: Returns the ticket with its total_parts_cost and part_count. The ETag header is the ticket's version, send it back as If-Match on updates. If-None-Match gets a 304 while it's unchanged.
+    parameters:
+      - name: ticket_id
+        in: path
+        type: integer
+        required: true
+      - name: include_archived
+        in: query
+        type: boolean
+        required: false
+        default: false
+        description: Also include tickets moved to the archive (read-only, no ETag)
+    responses:
+      200:
+        description: The ticket
+      304:
+        description: Not modified since the ETag sent in If-None-Match
+      404:
+        description: Ticket not found
+    """
+    ticket = db.session.get(ServiceTicket, ticket_id)
+    if not ticket and include_archived(request.args):
+        archived = db.session.get(ArchivedTicket, ticket_id)
+        if archived:
+            return render(dump_archived(db.session, tickets_schema, [archived])[0])
+    if not ticket:
+        return jsonify({"message": "Ticket not found"}), 404
+    response = with_etag(render(with_totals(db.session, [ticket_schema.dump(ticket)])[0]), ticket)
+    return response.make_conditional(request)
 
 @service_tickets_bp.route("/<int:ticket_id>/edit", methods=["PUT"])
 @token_required
@@ -106,6 +314,11 @@ def edit_mechanics_on_ticket(customer_id, ticket_id):
         in: path
         type: integer
         required: true
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: The ticket's ETag (its version) as you last saw it, the update is refused with a 412 if it has changed since
       - in: body
         name: body
         schema:
@@ -123,13 +336,20 @@ def edit_mechanics_on_ticket(customer_id, ticket_id):
               example: [3]
     responses:
       200:
-        description: Mechanics updated
+        description: Mechanics updated, with the new ETag
       404:
         description: Ticket not found or unauthorized
+      409:
+        description: Someone else changed the ticket at the same time, nothing was saved
+      412:
+        description: If-Match doesn't match the current version
     """
     ticket = ServiceTicket.query.filter_by(id=ticket_id, customer_id=customer_id).first()
     if not ticket:
         return jsonify({"message": "Ticket not found or unauthorized"}), 404
+    failed = precondition_failed(ticket)
+    if failed:
+        return failed
 
     data = request.get_json()
     add_ids = data.get("add_ids", [])
@@ -148,11 +368,14 @@ def edit_mechanics_on_ticket(customer_id, ticket_id):
             ticket.mechanics.remove(mech)
             removed.append(mid)
 
-    db.session.commit()
-    return jsonify({"message": "Mechanics updated", "added": added, "removed": removed}), 200
+    conflict = commit_ticket(db.session, ticket)
+    if conflict:
+        return conflict
+    return with_etag(jsonify({"message": "Mechanics updated", "added": added, "removed": removed}), ticket), 200
 
 @service_tickets_bp.route("/<int:ticket_id>/add-part", methods=["PUT"])
 @token_required
+@idempotent
 def add_parts_to_ticket(customer_id, ticket_id):
     """
     Add parts to a ticket (auth: customer)
@@ -160,14 +383,24 @@ def add_parts_to_ticket(customer_id, ticket_id):
     tags:
       - Service Tickets
     summary: Add parts
-    description: Add inventory parts to a customer’s ticket.
+    description: Add inventory parts to a customer’s ticket. Each entry is a part id (quantity 1) or {"part_id", "quantity"}. Stock is reserved atomically for all of them, if any part is short nothing is added.
     security:
       - ApiKeyAuth: []
     parameters:
+      - in: header
+        name: Idempotency-Key
+        type: string
+        required: false
+        description: Optional retry key, repeating a request with the same key replays the first response instead of running it again
       - name: ticket_id
         in: path
         type: integer
         required: true
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: The ticket's ETag (its version) as you last saw it, the update is refused with a 412 if it has changed since
       - in: body
         name: body
         schema:
@@ -177,26 +410,45 @@ def add_parts_to_ticket(customer_id, ticket_id):
               type: array
               items:
                 type: integer
-              example: [1, 4]
+              example: [1, 4, {"part_id": 7, "quantity": 2}]
     responses:
       200:
-        description: Parts added to ticket
+        description: Parts added to ticket, with the new ETag
+      400:
+        description: Invalid part entry
       404:
         description: Ticket not found or unauthorized
+      409:
+        description: Not enough stock, or someone else changed the ticket at the same time
+      412:
+        description: If-Match doesn't match the current version
     """
     ticket = ServiceTicket.query.filter_by(id=ticket_id, customer_id=customer_id).first()
     if not ticket:
         return jsonify({"message": "Ticket not found or unauthorized"}), 404
+    failed = precondition_failed(ticket)
+    if failed:
+        return failed
 
     part_ids = request.get_json().get("part_ids", [])
 
-    for pid in part_ids:
-        part = Inventory.query.get(pid)
-        if part and part not in ticket.parts:
-            ticket.parts.append(part)
+    try:
+        for entry in part_ids:
+            pid, quantity = (entry.get("part_id"), entry.get("quantity", 1)) if isinstance(entry, dict) else (entry, 1)
+            if not isinstance(quantity, int) or quantity < 1:
+                db.session.rollback()
+                return jsonify({"message": f"Invalid quantity for part {pid}."}), 400
+            # unknown part ids are skipped like before
+            reserve(db.session, ticket.id, pid, quantity)
+    except OutOfStock as e:
+        db.session.rollback()
+        return jsonify({"message": str(e)}), 409
 
-    db.session.commit()
-    return jsonify({"message": "Parts added to ticket"}), 200
+    touch(ticket)
+    conflict = commit_ticket(db.session, ticket)
+    if conflict:
+        return conflict
+    return with_etag(jsonify({"message": "Parts added to ticket"}), ticket), 200
 
 @service_tickets_bp.route("/<int:ticket_id>/update-status", methods=["PUT"])
 @mechanic_token_required
@@ -207,7 +459,7 @@ def update_ticket_status(mechanic_id, ticket_id):
     tags:
       - Service Tickets
     summary: Update status
-    description: Allows a mechanic to update the status of a service ticket.
+    description: Allows a mechanic to update the status of a service ticket. Statuses follow the workflow in application/workflow.py, e.g. a Completed ticket can only be reopened to In Progress.
     security:
       - ApiKeyAuth: []
     parameters:
@@ -215,6 +467,11 @@ def update_ticket_status(mechanic_id, ticket_id):
         in: path
         type: integer
         required: true
+      - in: header
+        name: If-Match
+        type: string
+        required: false
+        description: The ticket's ETag (its version) as you last saw it, the update is refused with a 412 if it has changed since
       - in: body
         name: body
         schema:
@@ -224,24 +481,113 @@ def update_ticket_status(mechanic_id, ticket_id):
           properties:
             status:
               type: string
+              enum: [Pending, In Progress, On Hold, Completed, Cancelled]
               example: Completed
     responses:
       200:
-        description: Status updated
+        description: Status updated, with the new ETag
       400:
-        description: Status missing
+        description: Status missing or unknown
       404:
         description: Ticket not found
+      409:
+        description: The transition isn't allowed from the current status, or someone else changed the ticket at the same time
+      412:
+        description: If-Match doesn't match the current version
     """
     ticket = ServiceTicket.query.get(ticket_id)
     if not ticket:
         return jsonify({"message": "Ticket not found"}), 404
+    failed = precondition_failed(ticket)
+    if failed:
+        return failed
 
     status = request.get_json().get("status")
     if not status:
         return jsonify({"message": "Status is required"}), 400
+    if status not in STATUSES:
+        return jsonify({"message": f"Unknown status '{status}'.", "statuses": STATUSES}), 400
+    try:
+        check_transition(ticket.status, status)
+    except InvalidTransition as e:
+        return jsonify({"message": str(e), "allowed": e.allowed}), 409
 
     ticket.status = status
-    db.session.commit()
-    return jsonify({"message": f"Status updated to '{status}'"}), 200
+    conflict = commit_ticket(db.session, ticket)
+    if conflict:
+        return conflict
+    return with_etag(jsonify({"message": f"Status updated to '{status}'"}), ticket), 200
 
+@service_tickets_bp.route("/status", methods=["PUT"])
+@mechanic_token_required
+def bulk_update_status(mechanic_id):
+    """
+    Change the status of many tickets at once (auth: mechanic)
+    ---
+    tags:
+      - Service Tickets
+    summary: Bulk status update
+    description: Moves up to BULK_STATUS_MAX_TICKETS tickets in one go (one SELECT, one UPDATE per target status). Either give ticket_ids plus a status, or a list of updates that can each carry their own status and the version (ETag) they expect. Every ticket gets its own result, updated / unchanged / invalid_transition / conflict / not_found, and the ones that can move are moved even if others can't.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          properties:
+            ticket_ids:
+              type: array
+              items:
+                type: integer
+              example: [12, 13, 17]
+            status:
+              type: string
+              enum: [Pending, In Progress, On Hold, Completed, Cancelled]
+              example: Completed
+            updates:
+              type: array
+              items:
+                type: object
+                properties:
+                  ticket_id:
+                    type: integer
+                  status:
+                    type: string
+                  version:
+                    type: integer
+              example: [{"ticket_id": 20, "status": "On Hold", "version": 3}]
+    responses:
+      200:
+        description: Per-ticket results and how many were updated
+      400:
+        description: Malformed body, unknown status or too many tickets
+    """
+    data = request.get_json() or {}
+    changes = {}
+    try:
+        for ticket_id in data.get("ticket_ids", []):
+            changes[int(ticket_id)] = (data["status"], None)
+        for entry in data.get("updates", []):
+            version = entry.get("version")
+            changes[int(entry["ticket_id"])] = (entry["status"], int(version) if version is not None else None)
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return jsonify({"message": "Give ticket_ids with a status, or updates of {ticket_id, status, version}."}), 400
+
+    if not changes:
+        return jsonify({"message": "No tickets given."}), 400
+    limit = current_app.config.get("BULK_STATUS_MAX_TICKETS", 200)
+    if len(changes) > limit:
+        return jsonify({"message": f"At most {limit} tickets per request."}), 400
+    unknown = sorted({status for status, _ in changes.values() if status not in STATUSES})
+    if unknown:
+        return jsonify({"message": f"Unknown status {', '.join(map(repr, unknown))}.", "statuses": STATUSES}), 400
+
+    results = bulk_transition(db.session, changes)
+    db.session.commit()
+    invalidate(current_app)
+    return jsonify({
+        "updated": sum(1 for r in results if r["result"] == "updated"),
+        "results": results,
+    }), 200
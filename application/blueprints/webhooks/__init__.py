@@ -0,0 +1,3 @@
+# File: application/blueprints/webhooks/__init__.py
+
+from .routes import webhooks_bp as bp
@@ -0,0 +1,134 @@
+# File: application/blueprints/webhooks/routes.py
+
+import secrets
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy import delete, func, select
+from application.extensions import db
+from application.models import OutboxEvent, WebhookEndpoint
+from application.utils import token_required
+from application.webhooks import UnsafeURL, resolve_target
+from application.negotiation import render
+from .schemas import webhook_schema, webhooks_schema
+
+webhooks_bp = Blueprint("webhooks", __name__)
+
+
+def _invalid_url(url):
+    """Why url can't be a webhook target, None if it can."""
+    if len(url or "") > 500:
+        return "url must be at most 500 characters."
+    try:
+        # the dispatcher checks again before every delivery
+        resolve_target(url, current_app.config.get("WEBHOOK_ALLOW_PRIVATE_URLS", False))
+    except UnsafeURL as e:
+        return str(e)
+    return None
+
+
+@webhooks_bp.route("/", methods=["POST"])
+@token_required
+def create_webhook(customer_id):
+    """
+    Register a webhook (auth: customer)
+    ---
+    tags:
+      - Webhooks
+    summary: Get ticket events POSTed to a URL
+    description: Every status change on the customer's tickets is delivered to url in batches by the webhook dispatcher, signed with the returned secret (X-Webhook-Signature t=<unix time>,v1=<HMAC-SHA256 of "t.body">). The secret is only shown here.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - in: body
+        name: body
+        required: true
+        schema:
+          type: object
+          required:
+            - url
+          properties:
+            url:
+              type: string
+              example: https://example.com/hooks/mechanic
+    responses:
+      201:
+        description: The endpoint, with its signing secret
+      400:
+        description: Missing or unusable url
+      409:
+        description: Too many webhooks for this customer
+    """
+    url = (request.get_json() or {}).get("url")
+    error = _invalid_url(url)
+    if error:
+        return jsonify({"message": error}), 400
+    count = db.session.scalar(select(func.count(WebhookEndpoint.id)).where(WebhookEndpoint.customer_id == customer_id))
+    if count >= current_app.config.get("WEBHOOK_MAX_PER_CUSTOMER", 5):
+        return jsonify({"message": "Too many webhooks, delete one first."}), 409
+
+    endpoint = WebhookEndpoint(customer_id=customer_id, url=url, secret=secrets.token_hex(32))
+    db.session.add(endpoint)
+    db.session.commit()
+    return render({**webhook_schema.dump(endpoint), "secret": endpoint.secret}, 201)
+
+
+@webhooks_bp.route("/", methods=["GET"])
+@token_required
+def list_webhooks(customer_id):
+    """
+    List my webhooks (auth: customer)
+    ---
+    tags:
+      - Webhooks
+    summary: Registered webhooks
+    description: The customer's webhook endpoints with their delivery state (consecutive failures, when the next retry is due) and how many events are still waiting.
+    security:
+      - ApiKeyAuth: []
+    responses:
+      200:
+        description: List of endpoints
+    """
+    endpoints = db.session.scalars(
+        select(WebhookEndpoint).where(WebhookEndpoint.customer_id == customer_id).order_by(WebhookEndpoint.id)
+    ).all()
+    waiting = dict(db.session.execute(
+        select(OutboxEvent.endpoint_id, func.count(OutboxEvent.id))
+        .where(OutboxEvent.endpoint_id.in_([e.id for e in endpoints]),
+               OutboxEvent.delivered_at.is_(None), OutboxEvent.failed_at.is_(None))
+        .group_by(OutboxEvent.endpoint_id)
+    ).all())
+    dumped = webhooks_schema.dump(endpoints)
+    for endpoint in dumped:
+        endpoint["pending_events"] = waiting.get(endpoint["id"], 0)
+    return render(dumped)
+
+
+@webhooks_bp.route("/<int:webhook_id>", methods=["DELETE"])
+@token_required
+def delete_webhook(customer_id, webhook_id):
+    """
+    Delete a webhook (auth: customer)
+    ---
+    tags:
+      - Webhooks
+    summary: Stop deliveries to an endpoint
+    description: Removes the endpoint together with its undelivered events.
+    security:
+      - ApiKeyAuth: []
+    parameters:
+      - name: webhook_id
+        in: path
+        type: integer
+        required: true
+    responses:
+      200:
+        description: Deleted
+      404:
+        description: No such webhook for this customer
+    """
+    endpoint = db.session.get(WebhookEndpoint, webhook_id)
+    if not endpoint or str(endpoint.customer_id) != str(customer_id):
+        return jsonify({"message": "Webhook not found"}), 404
+    db.session.execute(delete(OutboxEvent).where(OutboxEvent.endpoint_id == webhook_id))
+    db.session.delete(endpoint)
+    db.session.commit()
+    return jsonify({"message": "Webhook deleted"}), 200
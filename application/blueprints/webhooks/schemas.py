@@ -0,0 +1,13 @@
+# File: application/blueprints/webhooks/schemas.py
+
+from application.extensions import ma
+from application.models import WebhookEndpoint
+
+class WebhookEndpointSchema(ma.SQLAlchemyAutoSchema):
+    class Meta:
+        model = WebhookEndpoint
+        # the secret is only shown once, when the endpoint is created
+        fields = ("id", "url", "created_at", "failures", "retry_at")
+
+webhook_schema = WebhookEndpointSchema()
+webhooks_schema = WebhookEndpointSchema(many=True)
@@ -0,0 +1,105 @@
+# File: application/compression.py
+# gzip / brotli response compression, negotiated off Accept-Encoding.
+# Small bodies go out as-is (COMPRESS_MIN_SIZE), streamed responses are compressed chunk
+# by chunk, and endpoints listed in COMPRESS_CACHE_ENDPOINTS keep their compressed bytes
+# in the cache keyed by a hash of the body, so a hot cached page isn't recompressed per hit.
+
+import gzip
+import hashlib
+import zlib
+from flask import request
+from application.extensions import cache
+
+try:
+    import brotli
+except ImportError:  # brotli is optional, gzip always works
+    brotli = None
+
+
+def available_encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def init_compression(app):
+    if not app.config.get("COMPRESS_ENABLED", True):
+        return
+
+    @app.after_request
+    def compress_response(response):
+        return compress(app, response)
+
+
+def compress(app, response):
+    if (
+        response.status_code < 200
+        or response.status_code in (204, 304)
+        or response.direct_passthrough
+        or "Content-Encoding" in response.headers
+        or response.mimetype not in app.config.get("COMPRESS_MIMETYPES", [])
+    ):
+        return response
+
+    response.vary.add("Accept-Encoding")
+    encoding = request.accept_encodings.best_match(available_encodings())
+    if encoding is None:
+        return response
+
+    if response.is_streamed:
+        response.response = _compress_stream(app, response.response, encoding)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < app.config.get("COMPRESS_MIN_SIZE", 500):
+            return response
+        response.set_data(_compressed_body(app, data, encoding))
+
+    response.headers["Content-Encoding"] = encoding
+    # the compressed bytes aren't byte-for-byte what a strong ETag promised
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _compressed_body(app, data, encoding):
+    if request.endpoint not in app.config.get("COMPRESS_CACHE_ENDPOINTS", []):
+        return _compress(app, data, encoding)
+
+    key = f"compressed:{encoding}:{hashlib.sha1(data).hexdigest()}"
+    body = cache.get(key)
+    if body is None:
+        body = _compress(app, data, encoding)
+        cache.set(key, body, timeout=app.config.get("COMPRESS_CACHE_TIMEOUT", 60))
+    return body
+
+
+def _compress(app, data, encoding):
+    if encoding == "br":
+        return brotli.compress(data, quality=app.config.get("COMPRESS_BR_LEVEL", 4))
+    return gzip.compress(data, compresslevel=app.config.get("COMPRESS_LEVEL", 6))
+
+
+def _compress_stream(app, chunks, encoding):
+    # flush after every chunk so a streamed response still trickles out instead of
+    # sitting in the compressor until the end
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=app.config.get("COMPRESS_BR_LEVEL", 4))
+        compress_chunk = lambda chunk: compressor.process(chunk) + compressor.flush()
+        finish = compressor.finish
+    else:
+        # wbits=31 writes the gzip header/trailer
+        compressor = zlib.compressobj(app.config.get("COMPRESS_LEVEL", 6), zlib.DEFLATED, 31)
+        compress_chunk = lambda chunk: compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode("utf-8")
+            out = compress_chunk(chunk)
+            if out:
+                yield out
+        yield finish()
+    finally:
+        if hasattr(chunks, "close"):
+            chunks.close()
@@ -0,0 +1,64 @@
+# File: application/concurrency.py
+# Optimistic concurrency for service tickets. ServiceTicket.version is SQLAlchemy's
+# version_id_col: every UPDATE of a ticket bumps it and carries "AND version = <what we
+# read>" in its WHERE clause. A write based on a stale read matches no row and raises
+# StaleDataError instead of silently overwriting someone else's change, and nothing is
+# locked while a request works.
+# The version doubles as the ticket's ETag. The PUT endpoints take If-Match and answer
+# 412 when the client's copy is already out of date (nothing was done), or 409 when
+# another request committed between our read and our write (everything rolled back).
+
+from flask import jsonify, request
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import flag_modified
+from sqlalchemy.orm.exc import StaleDataError
+from application.models import ServiceTicket
+from application.routing import RoutingSession
+
+
+def ticket_etag(ticket):
+    return str(ticket.version)
+
+
+def precondition_failed(ticket):
+    """A 412 response if the request's If-Match doesn't match the ticket, None otherwise."""
+    if_match = request.if_match
+    if not if_match or if_match.contains_weak(ticket_etag(ticket)):
+        return None
+    response = jsonify({
+        "message": "Ticket was changed since you loaded it, reload and try again.",
+        "version": ticket.version,
+    })
+    response.set_etag(ticket_etag(ticket))
+    return response, 412
+
+
+def touch(ticket):
+    # for changes that don't write the ticket row itself (parts reserved through Core),
+    # so its version still gets checked and bumped
+    flag_modified(ticket, "status")
+
+
+def commit_ticket(session, ticket):
+    """Commits, returns a 409 response (after rolling back) if the ticket changed underneath us."""
+    try:
+        session.commit()
+    except StaleDataError:
+        session.rollback()
+        return jsonify({"message": "Ticket was changed by someone else at the same time, reload and try again."}), 409
+    return None
+
+
+def with_etag(response, ticket):
+    response.set_etag(ticket_etag(ticket))
+    return response
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _version_collection_changes(session, flush_context, instances):
+    # adding or removing mechanics/parts only touches the association tables, count it as
+    # a change to the ticket too
+    for obj in session.dirty:
+        if isinstance(obj, ServiceTicket) and not session.is_modified(obj, include_collections=False) \
+                and session.is_modified(obj):
+            touch(obj)
@@ -0,0 +1,66 @@
+# File: application/costs.py
+# Parts cost per ticket (total_parts_cost, part_count). It's worked out with one
+# GROUP BY over ticket_parts for a whole page of tickets, so clients don't have to add
+# up the nested parts themselves and we don't run a query per ticket.
+# Prices are the part's current price. Archived tickets (application/archive.py) have
+# their own copy of ticket_parts, pass it as `parts`.
+# Ids go in IN lists of at most ID_CHUNK, a full export can hold more tickets than SQLite
+# takes bound parameters in one statement (32766).
+
+from sqlalchemy import func, select
+from application.models import ArchivedTicket, Inventory, ServiceTicket, ticket_parts, ticket_parts_archive
+
+ID_CHUNK = 500
+
+
+def ticket_totals(session, ticket_ids, parts=ticket_parts):
+    """{ticket id: (total_parts_cost, part_count)}, tickets without parts are left out."""
+    query = (
+        select(
+            parts.c.service_ticket_id,
+            func.sum(Inventory.price * parts.c.quantity),
+            func.sum(parts.c.quantity),
+        )
+        .join(Inventory, Inventory.id == parts.c.inventory_id)
+        .group_by(parts.c.service_ticket_id)
+    )
+    totals = {}
+    for start in range(0, len(ticket_ids), ID_CHUNK):
+        chunk = ticket_ids[start:start + ID_CHUNK]
+        rows = session.execute(query.where(parts.c.service_ticket_id.in_(chunk)))
+        totals.update((ticket_id, (cost, count)) for ticket_id, cost, count in rows)
+    return totals
+
+
+def with_totals(session, dumped_tickets, parts=ticket_parts):
+    totals = ticket_totals(session, [t["id"] for t in dumped_tickets], parts)
+    for ticket in dumped_tickets:
+        cost, count = totals.get(ticket["id"], (0, 0))
+        ticket["total_parts_cost"] = round(cost or 0, 2)
+        ticket["part_count"] = count or 0
+    return dumped_tickets
+
+
+def range_totals(session, start, end, include_archived=False):
+    """Ticket count and parts totals for tickets created in [start, end)."""
+    sources = [(ServiceTicket, ticket_parts)]
+    if include_archived:
+        sources.append((ArchivedTicket, ticket_parts_archive))
+    ticket_count, cost, count = 0, 0, 0
+    for model, parts in sources:
+        in_range = (model.created_at >= start) & (model.created_at < end)
+        ticket_count += session.scalar(select(func.count(model.id)).where(in_range))
+        source_cost, source_count = session.execute(
+            select(func.sum(Inventory.price * parts.c.quantity), func.sum(parts.c.quantity))
+            .select_from(parts)
+            .join(Inventory, Inventory.id == parts.c.inventory_id)
+            .join(model, model.id == parts.c.service_ticket_id)
+            .where(in_range)
+        ).one()
+        cost += source_cost or 0
+        count += source_count or 0
+    return {
+        "ticket_count": ticket_count,
+        "part_count": count,
+        "total_parts_cost": round(cost, 2),
+    }
@@ -0,0 +1,27 @@
+# File: application/engine.py
+# Per-engine setup that has to happen before the first connection is handed out.
+# SQLAlchemy options (pool sizes, pre-ping, timeouts) live in config.py, this is the
+# stuff that needs a connect event.
+
+from sqlalchemy import event
+from application.slow_queries import init_slow_query_log
+
+
+def configure_engine(app, engine):
+    if engine.dialect.name == "sqlite":
+        init_sqlite_pragmas(engine, app.config.get("SQLITE_PRAGMAS", {}))
+    init_slow_query_log(app, engine)
+
+
+def init_sqlite_pragmas(engine, pragmas):
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
@@ -0,0 +1,136 @@
+# File: application/forecasting.py
+# Reorder suggestions for purchasing. Daily usage for every part comes out of one
+# GROUP BY (part, day) over ticket_parts and lands in a parts x days NumPy matrix, so
+# the moving average, seasonality and safety stock are a handful of array ops over
+# the whole catalogue instead of a Python loop per part per day.
+#
+#   daily demand  = average usage over the last REORDER_WINDOW_DAYS x seasonal factor
+#   seasonal      = usage around the same weeks last year / last year's average
+#   safety stock  = z x std dev of daily usage x sqrt(lead time)
+#   reorder point = daily demand x lead time + safety stock
+#
+# Only finished days count, so the forecast can't change until tomorrow: it's cached
+# per day. Stock on hand is read fresh on every request.
+
+import math
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import func, select
+from application.extensions import cache
+from application.models import ArchivedTicket, Inventory, ServiceTicket, ticket_parts, ticket_parts_archive
+from application.tenancy import current_tenant
+
+SEASON_WINDOW_DAYS = 28  # smallest slice of last year used for the seasonal factor
+SEASON_CLIP = (0.5, 2.0)  # keep one freak month last year from doubling an order again
+
+
+def usage_matrix(session, start, end):
+    """(part ids, parts x days usage matrix) for days in [start, end)."""
+    part_ids = np.array(session.scalars(select(Inventory.id).order_by(Inventory.id)).all(), dtype=np.int64)
+    days = (end - start).days
+    # float32 is plenty for daily part counts and halves the matrix (parts x 730 days)
+    matrix = np.zeros((len(part_ids), days), dtype=np.float32)
+    if not len(part_ids) or days <= 0:
+        return part_ids, matrix
+
+    # Core execute, the ORM's per-row result processing costs more than the GROUP BY.
+    # Archived tickets are history too, a part can show up in both sets for the same day
+    # and np.add.at adds those up. The Inventory join drops rows of deleted parts (SQLite
+    # doesn't enforce the foreign key), searchsorted below needs every id in part_ids
+    rows = []
+    for model, parts in ((ServiceTicket, ticket_parts), (ArchivedTicket, ticket_parts_archive)):
+        day = func.date(model.created_at)
+        rows += session.connection().execute(
+            select(parts.c.inventory_id, day, func.sum(parts.c.quantity))
+            .join(model, model.id == parts.c.service_ticket_id)
+            .join(Inventory, Inventory.id == parts.c.inventory_id)
+            .where(model.created_at >= start, model.created_at < end)
+            .group_by(parts.c.inventory_id, day)
+        ).all()
+    if not rows:
+        return part_ids, matrix
+
+    ids, dates, quantities = zip(*rows)
+    # sqlite hands back 'YYYY-MM-DD' strings, postgres date objects, both parse the same
+    columns = (np.array([str(d) for d in dates], dtype="datetime64[D]") - np.datetime64(start, "D")).astype(np.int64)
+    positions = np.searchsorted(part_ids, np.array(ids, dtype=np.int64))
+    np.add.at(matrix, (positions, columns), np.array(quantities, dtype=np.float32))
+    return part_ids, matrix
+
+
+def forecast(usage, window, lead_time, z):
+    """Per-part (daily demand, seasonal factor, safety stock, reorder point) arrays from a
+    parts x days usage matrix whose last column is yesterday."""
+    recent = usage[:, -window:]
+    average = recent.mean(axis=1)
+    spread = recent.std(axis=1)
+
+    seasonal = np.ones(len(usage))
+    if usage.shape[1] >= 365 + max(lead_time, SEASON_WINDOW_DAYS):
+        last_year = usage[:, -365:]
+        # same stretch of the calendar a year ago, widened so a single busy week doesn't decide it
+        span = max(lead_time, SEASON_WINDOW_DAYS)
+        ahead = usage[:, -365:-365 + span].mean(axis=1)
+        yearly = last_year.mean(axis=1)
+        # parts nobody used before a year ago don't have a last year to compare with
+        known = usage[:, :-365].any(axis=1) & (yearly > 0)
+        seasonal = np.divide(ahead, yearly, out=np.ones_like(ahead), where=known)
+        seasonal = np.where(known, np.clip(seasonal, *SEASON_CLIP), 1.0)
+
+    demand = average * seasonal
+    safety = z * spread * math.sqrt(lead_time)
+    return demand, seasonal, safety, demand * lead_time + safety
+
+
+def forecast_for_today(app, session):
+    """{part id: (daily demand, seasonal factor, safety stock, reorder point)}, cached until midnight."""
+    now = datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    key = f"reorder-forecast:{current_tenant() or ''}:{today.date().isoformat()}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    config = app.config
+    start = today - timedelta(days=config.get("REORDER_HISTORY_DAYS", 730))
+    part_ids, usage = usage_matrix(session, start, today)
+    demand, seasonal, safety, reorder_point = forecast(
+        usage,
+        window=config.get("REORDER_WINDOW_DAYS", 56),
+        lead_time=config.get("REORDER_LEAD_TIME_DAYS", 7),
+        z=config.get("REORDER_SERVICE_Z", 1.65),
+    )
+    result = {
+        int(part_id): (float(d), float(s), float(ss), float(rop))
+        for part_id, d, s, ss, rop in zip(part_ids, demand, seasonal, safety, reorder_point)
+    }
+    cache.set(key, result, timeout=max(int((today + timedelta(days=1) - now).total_seconds()), 1))
+    return result
+
+
+def reorder_suggestions(app, session, include_all=False):
+    forecasts = forecast_for_today(app, session)
+    cover_days = app.config.get("REORDER_COVER_DAYS", 30)
+    suggestions = []
+    for part_id, name, on_hand in session.execute(
+        select(Inventory.id, Inventory.name, Inventory.quantity_on_hand).order_by(Inventory.id)
+    ):
+        demand, seasonal, safety, reorder_point = forecasts.get(part_id, (0.0, 1.0, 0.0, 0.0))
+        # parts without stock tracking get the numbers but never an order
+        needs_reorder = on_hand is not None and demand > 0 and on_hand <= reorder_point
+        if not (needs_reorder or include_all):
+            continue
+        order_up_to = reorder_point + demand * cover_days
+        suggestions.append({
+            "id": part_id,
+            "name": name,
+            "quantity_on_hand": on_hand,
+            "daily_demand": round(demand, 3),
+            "seasonal_factor": round(seasonal, 3),
+            "safety_stock": math.ceil(safety),
+            "reorder_point": math.ceil(reorder_point),
+            "needs_reorder": needs_reorder,
+            "suggested_order": math.ceil(order_up_to - on_hand) if needs_reorder else 0,
+        })
+    suggestions.sort(key=lambda s: (not s["needs_reorder"], -s["suggested_order"], s["id"]))
+    return suggestions
@@ -0,0 +1,160 @@
+# File: application/fulltext.py
+# Full-text search over ServiceTicket.description.
+# SQLite: an FTS5 external-content table (service_ticket_fts) that indexes the ticket
+#   table without copying it, kept in sync by triggers and ranked with bm25().
+# Postgres: a GIN index on to_tsvector('english', description), ranked with ts_rank.
+# Both treat the last search term as a prefix.
+# Anything else falls back to LIKE, which is a full scan but still answers.
+# Archived tickets get the same treatment in their own index, see include_archived.
+# Both indexes are created alongside service_ticket by create_all. For a database that
+# already has tickets, run `flask search rebuild` once.
+
+import re
+import click
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import DDL, event, func, literal_column, select, table, column, text
+from application.extensions import db
+from application.models import ArchivedTicket, ServiceTicket
+from application.tenancy import tenant_engine
+
+FTS_TABLE = "service_ticket_fts"
+ARCHIVE_FTS_TABLE = "service_ticket_archive_fts"  # archived tickets (application/archive.py)
+PG_CONFIG = "english"
+
+search_cli = AppGroup("search", help="Maintain the service ticket search index.")
+
+ticket_table = ServiceTicket.__table__
+archive_table = ArchivedTicket.__table__
+
+
+def sqlite_ddl(fts_table, content_table):
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table} USING fts5("
+        f"description, content='{content_table}', content_rowid='id', tokenize='porter unicode61')",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_ai AFTER INSERT ON {content_table} BEGIN
+            INSERT INTO {fts_table}(rowid, description) VALUES (new.id, new.description);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_ad AFTER DELETE ON {content_table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, description) VALUES ('delete', old.id, old.description);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {fts_table}_au AFTER UPDATE OF description ON {content_table} BEGIN
+            INSERT INTO {fts_table}({fts_table}, rowid, description) VALUES ('delete', old.id, old.description);
+            INSERT INTO {fts_table}(rowid, description) VALUES (new.id, new.description);
+        END""",
+    ]
+
+
+def postgres_ddl(content_table):
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_{content_table}_description_fts ON {content_table} "
+        f"USING GIN (to_tsvector('{PG_CONFIG}', description))",
+    ]
+
+
+INDEXED = [(ServiceTicket, FTS_TABLE), (ArchivedTicket, ARCHIVE_FTS_TABLE)]
+
+for model, fts_table in INDEXED:
+    content = model.__table__
+    for statement in sqlite_ddl(fts_table, content.name):
+        event.listen(content, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+    for statement in postgres_ddl(content.name):
+        event.listen(content, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+    # the triggers go with the ticket table, the fts table doesn't
+    event.listen(content, "before_drop", DDL(f"DROP TABLE IF EXISTS {fts_table}").execute_if(dialect="sqlite"))
+
+
+def search_terms(q):
+    return re.findall(r"\w+", q.lower())
+
+
+def fts5_query(terms):
+    # quote every term so user input can't use FTS5 syntax (NEAR, column filters, ...),
+    # the last one is a prefix so results show up while people are still typing
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def pg_tsquery(terms):
+    # same idea for to_tsquery: every term a quoted lexeme (quotes and backslashes doubled)
+    # so operators in the input stay plain words, all of them required, the last a prefix
+    quoted = ["'" + term.replace("\\", "\\\\").replace("'", "''") + "'" for term in terms]
+    quoted[-1] += ":*"
+    return " & ".join(quoted)
+
+
+def search_tickets(session, q, page=1, per_page=10, rank_limit=5000, include_archived=False):
+    """Returns (tickets, total, ranked) for the given page.
+
+    Scoring touches every matching row, so when a query matches more than rank_limit
+    tickets ("brake") the page is newest-first instead of best-first. With
+    include_archived, archived matches come after all the hot ones.
+    """
+    terms = search_terms(q)
+    if not terms:
+        return [], 0, False
+
+    offset = (page - 1) * per_page
+    tickets, total, ranked = _search(session, ServiceTicket, FTS_TABLE, terms, per_page, offset, rank_limit)
+    if include_archived:
+        archived, archived_total, archived_ranked = _search(
+            session, ArchivedTicket, ARCHIVE_FTS_TABLE, terms,
+            per_page - len(tickets), max(offset - total, 0), rank_limit,
+        )
+        tickets, total, ranked = tickets + archived, total + archived_total, ranked and archived_ranked
+    return tickets, total, ranked
+
+
+def _search(session, model, fts_table, terms, limit, offset, rank_limit):
+    dialect = session.get_bind().dialect.name
+
+    if dialect == "sqlite":
+        fts = table(fts_table, column("rowid"))
+        match = literal_column(fts_table).op("MATCH")(fts5_query(terms))
+        total = session.scalar(select(func.count()).select_from(fts).where(match))
+        ranked = total <= rank_limit
+        if limit <= 0:
+            return [], total, ranked
+        order = func.bm25(literal_column(fts_table)) if ranked else fts.c.rowid.desc()
+        # page through the index first, only the rows on the page touch the ticket table
+        ids = session.scalars(select(fts.c.rowid).where(match).order_by(order).limit(limit).offset(offset)).all()
+        by_id = {t.id: t for t in session.scalars(select(model).where(model.id.in_(ids)))}
+        return [by_id[i] for i in ids if i in by_id], total, ranked
+
+    if dialect == "postgresql":
+        vector = func.to_tsvector(PG_CONFIG, model.description)
+        query = func.to_tsquery(PG_CONFIG, pg_tsquery(terms))
+        conditions = [vector.op("@@")(query)]
+        total = session.scalar(select(func.count()).select_from(model).where(*conditions))
+        ranked = total <= rank_limit
+        order = [func.ts_rank(vector, query).desc(), model.id] if ranked else [model.id.desc()]
+    else:
+        conditions = [model.description.ilike(f"%{term}%") for term in terms]
+        total = session.scalar(select(func.count()).select_from(model).where(*conditions))
+        ranked = False
+        order = [model.id.desc()]
+
+    if limit <= 0:
+        return [], total, ranked
+    stmt = select(model).where(*conditions).order_by(*order).limit(limit).offset(offset)
+    return session.scalars(stmt).all(), total, ranked
+
+
+def rebuild_index(engine):
+    with engine.begin() as conn:
+        for model, fts_table in INDEXED:
+            if engine.dialect.name == "sqlite":
+                for statement in sqlite_ddl(fts_table, model.__tablename__):
+                    conn.execute(text(statement))
+                conn.execute(text(f"INSERT INTO {fts_table}({fts_table}) VALUES ('rebuild')"))
+            elif engine.dialect.name == "postgresql":
+                for statement in postgres_ddl(model.__tablename__):
+                    conn.execute(text(statement))
+
+
+@search_cli.command("rebuild")
+@with_appcontext
+def rebuild_command():
+    """Create the search index if it's missing and re-index every ticket."""
+    rebuild_index(tenant_engine())  # the shop's shard under `flask tenants run`
+    click.echo("🔎 Search index rebuilt")
@@ -0,0 +1,151 @@
+# File: application/idempotency.py
+# Idempotency-Key support for the create-style endpoints. The first request with a key
+# claims it by inserting a pending row, runs, and stores its status + body. Retries with
+# the same key get that stored response back (headers included) without re-running the view. A retry that
+# shows up while the first one is still running waits for it (up to
+# IDEMPOTENCY_LOCK_TIMEOUT) instead of running twice. A claim that is still pending after
+# IDEMPOTENCY_PENDING_SECONDS belongs to a worker that died mid-request, the next retry
+# takes it over instead of getting 409s until the row expires. Stores and releases only
+# touch the claim they made, so a taken-over worker that wakes up can't clobber the new one.
+# Rows live on their own connection, outside the request's session, so a view that
+# rolls back doesn't take its claim with it.
+
+import datetime
+import hashlib
+import json
+import time
+from functools import wraps
+import click
+from flask import Response, current_app, jsonify, make_response, request
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import delete, insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from werkzeug.http import is_hop_by_hop_header
+from application.models import IdempotencyKey
+from application.tenancy import tenant_engine
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# rebuilt from the stored body and mimetype on replay, or only meant for the first answer
+NOT_REPLAYED = {"content-length", "content-type", "idempotent-replayed"}
+
+idempotency_cli = AppGroup("idempotency", help="Manage stored Idempotency-Key responses.")
+keys = IdempotencyKey.__table__
+
+
+def idempotent(f):
+    # put it under token_required so the key is scoped to whoever is calling
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key or not current_app.config.get("IDEMPOTENCY_ENABLED", True):
+            return f(*args, **kwargs)
+        if len(key) > MAX_KEY_LENGTH:
+            return jsonify({"message": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."}), 400
+
+        record_key = _record_key(key, args)
+        fingerprint = _fingerprint()
+        record, claimed_at = claim(record_key, fingerprint)
+        if record is not None:
+            return _answer_from(record, fingerprint)
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            release(record_key, claimed_at)
+            raise
+
+        # server errors and streams aren't worth replaying, let the retry run for real
+        if response.status_code >= 500 or response.is_streamed:
+            release(record_key, claimed_at)
+        else:
+            store(record_key, response, claimed_at)
+        return response
+    return decorated
+
+
+def claim(record_key, fingerprint):
+    """(None, claim time) if this request owns the key now, otherwise (existing row, None)."""
+    app = current_app
+    deadline = time.monotonic() + app.config.get("IDEMPOTENCY_LOCK_TIMEOUT", 10)
+    while True:
+        now = datetime.datetime.utcnow()
+        expired = now - datetime.timedelta(seconds=app.config.get("IDEMPOTENCY_TTL_SECONDS", 86400))
+        abandoned = now - datetime.timedelta(seconds=app.config.get("IDEMPOTENCY_PENDING_SECONDS", 60))
+        try:
+            with tenant_engine().begin() as conn:
+                conn.execute(delete(keys).where(keys.c.key == record_key, or_(
+                    keys.c.created_at < expired,
+                    keys.c.status_code.is_(None) & (keys.c.created_at < abandoned),
+                )))
+                conn.execute(insert(keys).values(key=record_key, fingerprint=fingerprint, created_at=now))
+            return None, now
+        except IntegrityError:
+            pass
+
+        with tenant_engine().connect() as conn:
+            record = conn.execute(select(keys).where(keys.c.key == record_key)).first()
+        if record is not None and (record.status_code is not None or record.fingerprint != fingerprint):
+            return record, None
+        if time.monotonic() >= deadline:
+            return record, None
+        # still pending, or the first attempt failed and released it (then we retry the insert)
+        time.sleep(app.config.get("IDEMPOTENCY_POLL_INTERVAL", 0.05))
+
+
+def store(record_key, response, claimed_at):
+    with tenant_engine().begin() as conn:
+        conn.execute(
+            update(keys).where(keys.c.key == record_key, keys.c.created_at == claimed_at)
+            .values(status_code=response.status_code, body=response.get_data(), mimetype=response.mimetype,
+                    headers=json.dumps(_replayed_headers(response)))
+        )
+
+
+def release(record_key, claimed_at):
+    with tenant_engine().begin() as conn:
+        conn.execute(delete(keys).where(keys.c.key == record_key, keys.c.created_at == claimed_at))
+
+
+def purge_expired(app):
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=app.config.get("IDEMPOTENCY_TTL_SECONDS", 86400))
+    with tenant_engine().begin() as conn:
+        return conn.execute(delete(keys).where(keys.c.created_at < cutoff)).rowcount
+
+
+def _answer_from(record, fingerprint):
+    if record is None or record.status_code is None:
+        return jsonify({"message": f"A request with this {HEADER} is still being processed."}), 409
+    if record.fingerprint != fingerprint:
+        return jsonify({"message": f"{HEADER} was already used for a different request."}), 422
+
+    response = Response(record.body, status=record.status_code, mimetype=record.mimetype)
+    for name, value in json.loads(record.headers or "[]"):
+        response.headers.add(name, value)
+    response.headers["Idempotent-Replayed"] = "true"
+    return response
+
+
+def _replayed_headers(response):
+    return [[name, value] for name, value in response.headers.items()
+            if name.lower() not in NOT_REPLAYED and not is_hop_by_hop_header(name)]
+
+
+def _record_key(key, args):
+    # positional args are the caller id from token_required / mechanic_token_required
+    scope = f"{request.endpoint}:{':'.join(map(str, args))}:{key}"
+    return hashlib.sha256(scope.encode("utf-8")).hexdigest()
+
+
+def _fingerprint():
+    digest = hashlib.sha256(f"{request.method} {request.full_path}\n".encode("utf-8"))
+    digest.update(request.get_data())
+    return digest.hexdigest()
+
+
+@idempotency_cli.command("purge")
+@with_appcontext
+def purge_command():
+    """Delete stored responses older than IDEMPOTENCY_TTL_SECONDS."""
+    removed = purge_expired(current_app)
+    click.echo(f"🧹 Removed {removed} expired idempotency keys")
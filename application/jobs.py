@@ -0,0 +1,371 @@
+# File: application/jobs.py
+# Background jobs. Heavy work (ticket exports, inventory imports, reports, rollup and
+# archive maintenance) goes into the job table and the request only waits for the insert:
+# POST /jobs/ answers 202 with an id to poll at GET /jobs/<id>. Code can queue work with
+# enqueue(), it joins the caller's transaction so the job exists exactly when the change
+# that asked for it committed.
+#
+# `flask worker` runs them on a pool of JOB_WORKER_PROCESSES processes. Every round it
+#   - puts running jobs whose lease ran out (their worker died) back in the queue, or
+#     fails them after JOB_MAX_ATTEMPTS
+#   - renews the leases of the jobs it's running itself
+#   - claims queued jobs for its idle processes, highest priority first, then oldest,
+#     skipping types that already have their concurrency limit running on any worker
+# On Postgres the candidates are read with FOR UPDATE SKIP LOCKED, so workers never wait
+# on each other's rows, and a transaction-level advisory lock per job type stops two
+# workers from both taking a type's last slot. SQLite has neither and needs neither, its
+# writers are serialized: a claim is a conditional UPDATE that only goes through while the
+# job is still queued and its type still under its limit.
+#
+# Handlers run in the pool's processes, with their own app context and connections, in
+# the shop (application/tenancy.py) the job was queued for. They take
+# (app, session, **params), return something JSON-able for the result and raise to fail.
+# When a process dies outright the pool gives up on everything it was running: those jobs
+# fail with the error and the worker carries on with a fresh pool.
+
+import csv
+import inspect
+import io
+import json
+import multiprocessing
+import os
+import socket
+import time
+import zlib
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, func, insert, select, update
+from application.analytics import rebuild_rollups
+from application.archive import archive_completed, dump_tickets
+from application.blueprints.service_tickets.schemas import tickets_schema
+from application.extensions import db
+from application.forecasting import reorder_suggestions
+from application.models import Inventory, Job
+from application.tenancy import tenant_context, tenant_names
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+jobs = Job.__table__
+JOB_TYPES = {}
+
+
+class InvalidJob(ValueError):
+    pass
+
+
+class JobType:
+    def __init__(self, name, handler, priority, concurrency):
+        self.name = name
+        self.handler = handler
+        self.priority = priority
+        self.concurrency = concurrency
+
+
+def job_type(name, priority=0, concurrency=1):
+    """Registers a handler. priority is the default for its jobs, concurrency how many may
+    run at once across all workers (JOB_CONCURRENCY overrides it per deployment)."""
+    def register(handler):
+        JOB_TYPES[name] = JobType(name, handler, priority, concurrency)
+        return handler
+    return register
+
+
+def concurrency_limit(app, name):
+    return app.config.get("JOB_CONCURRENCY", {}).get(name, JOB_TYPES[name].concurrency)
+
+
+def enqueue(session, name, params=None, priority=None, created_by=None):
+    """Adds a job to the caller's transaction. Raises InvalidJob for unknown types or
+    parameters the handler doesn't take."""
+    kind = JOB_TYPES.get(name)
+    if kind is None:
+        raise InvalidJob(f"Unknown job type '{name}'.")
+    params = params or {}
+    try:
+        inspect.signature(kind.handler).bind(None, None, **params)
+    except TypeError as e:
+        raise InvalidJob(f"Bad parameters for {name}: {e}.")
+    job = Job(job_type=name, params=json.dumps(params), created_by=created_by,
+              priority=kind.priority if priority is None else priority)
+    session.add(job)
+    session.flush()
+    return job
+
+
+def requeue_expired(app, session):
+    """Running jobs nobody renewed: back in the queue, or failed once they've used up
+    JOB_MAX_ATTEMPTS. Returns (requeued, failed)."""
+    now = datetime.utcnow()
+    expired = (jobs.c.status == RUNNING) & (jobs.c.lease_until < now)
+    max_attempts = app.config.get("JOB_MAX_ATTEMPTS", 3)
+    failed = session.execute(
+        update(jobs).where(expired, jobs.c.attempts >= max_attempts)
+        .values(status=FAILED, finished_at=now, lease_until=None,
+                error=f"Worker lost {max_attempts} times, giving up.")
+    ).rowcount
+    requeued = session.execute(
+        update(jobs).where(expired).values(status=QUEUED, worker=None, lease_until=None)
+    ).rowcount
+    session.commit()
+    return requeued, failed
+
+
+def renew_leases(app, session, worker, job_ids):
+    if job_ids:
+        session.execute(
+            update(jobs).where(jobs.c.id.in_(job_ids), jobs.c.status == RUNNING, jobs.c.worker == worker)
+            .values(lease_until=datetime.utcnow() + timedelta(seconds=app.config.get("JOB_LEASE_SECONDS", 60)))
+        )
+    session.commit()
+
+
+def claim(app, session, worker, slots):
+    """Marks up to slots queued jobs as running on worker, returns [(id, job_type)]."""
+    if slots <= 0:
+        return []
+    postgres = session.get_bind().dialect.name == "postgresql"
+    running = dict(session.execute(
+        select(jobs.c.job_type, func.count()).where(jobs.c.status == RUNNING).group_by(jobs.c.job_type)
+    ).all())
+
+    # the best few of every type that has room, so a full type can't hide the others
+    candidates = []
+    for name in sorted(JOB_TYPES):
+        room = min(concurrency_limit(app, name) - running.get(name, 0), slots)
+        if room <= 0:
+            continue
+        query = (
+            select(jobs.c.id, jobs.c.job_type, jobs.c.priority)
+            .where(jobs.c.status == QUEUED, jobs.c.job_type == name)
+            .order_by(jobs.c.priority.desc(), jobs.c.id)
+            .limit(room)
+        )
+        if postgres:
+            query = query.with_for_update(skip_locked=True)
+        candidates += session.execute(query).all()
+    candidates.sort(key=lambda row: (-row.priority, row.id))
+
+    now = datetime.utcnow()
+    lease_until = now + timedelta(seconds=app.config.get("JOB_LEASE_SECONDS", 60))
+    other = jobs.alias("other")
+    locked = set()
+    claimed = []
+    for job_id, name, _ in candidates[:slots]:
+        if postgres and name not in locked:
+            # held until the commit below, the count in the UPDATE then sees every claim
+            # another worker committed for this type
+            session.execute(select(func.pg_advisory_xact_lock(zlib.crc32(name.encode("utf-8")))))
+            locked.add(name)
+        running_now = (
+            select(func.count()).select_from(other)
+            .where(other.c.job_type == name, other.c.status == RUNNING)
+            .scalar_subquery()
+        )
+        taken = session.execute(
+            update(jobs)
+            .where(jobs.c.id == job_id, jobs.c.status == QUEUED, running_now < concurrency_limit(app, name))
+            .values(status=RUNNING, worker=worker, lease_until=lease_until, started_at=now,
+                    attempts=jobs.c.attempts + 1)
+        )
+        if taken.rowcount:
+            claimed.append((job_id, name))
+    session.commit()
+    return claimed
+
+
+def run_job(app, session, job_id, worker):
+    """Runs a claimed job and records how it went. Returns the job's final status, None
+    when the job was no longer ours to finish (its lease ran out and it moved on)."""
+    job = session.get(Job, job_id)
+    name, params = job.job_type, json.loads(job.params)
+    session.rollback()  # no transaction left open around the handler
+    try:
+        kind = JOB_TYPES.get(name)
+        if kind is None:
+            raise InvalidJob(f"Unknown job type '{name}'.")
+        outcome = {"status": SUCCEEDED, "result": json.dumps(kind.handler(app, session, **params)), "error": None}
+    except Exception as e:
+        session.rollback()
+        outcome = {"status": FAILED, "error": f"{type(e).__name__}: {e}"[:1000]}
+    finished = session.execute(
+        update(jobs).where(jobs.c.id == job_id, jobs.c.status == RUNNING, jobs.c.worker == worker)
+        .values(finished_at=datetime.utcnow(), lease_until=None, **outcome)
+    ).rowcount
+    session.commit()
+    return outcome["status"] if finished else None
+
+
+def fail_job(session, job_id, worker, error):
+    """Fails a running job from outside its handler, e.g. when its process died. Returns
+    FAILED, or None when the job was no longer ours."""
+    failed = session.execute(
+        update(jobs).where(jobs.c.id == job_id, jobs.c.status == RUNNING, jobs.c.worker == worker)
+        .values(status=FAILED, finished_at=datetime.utcnow(), lease_until=None, error=error[:1000])
+    ).rowcount
+    session.commit()
+    return FAILED if failed else None
+
+
+def purge_finished(app, session):
+    cutoff = datetime.utcnow() - timedelta(days=app.config.get("JOB_RETENTION_DAYS", 7))
+    removed = session.execute(
+        delete(jobs).where(jobs.c.status.in_([SUCCEEDED, FAILED]), jobs.c.finished_at < cutoff)
+    ).rowcount
+    session.commit()
+    return removed
+
+
+# the pool's processes are forked from the worker and reach the app through this
+_worker_app = None
+
+
+def _init_process():
+    # same as post_fork in gunicorn.conf.py: the pooled connections belong to the parent
+    with _worker_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def _run_in_process(job_id, tenant, worker):
+    with _worker_app.app_context(), tenant_context(tenant):
+        return run_job(_worker_app, db.session, job_id, worker)
+
+
+@click.command("worker")
+@click.option("--processes", type=int, default=None, help="Jobs run at once, default JOB_WORKER_PROCESSES.")
+@click.option("--burst", is_flag=True, help="Exit once the queue is empty instead of waiting for more jobs.")
+@with_appcontext
+def worker_command(processes, burst):
+    """Run queued background jobs for the primary database and every shop."""
+    global _worker_app
+    _worker_app = app = current_app._get_current_object()
+    processes = processes or app.config.get("JOB_WORKER_PROCESSES", 1)
+    poll_interval = app.config.get("JOB_POLL_INTERVAL", 1)
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    shops = [None] + tenant_names(app)
+    in_flight = {}  # future -> (shop, job id, job type)
+    purged_at = float("-inf")
+
+    click.echo(f"👷 Worker {worker} running {processes} jobs at a time")
+    context = multiprocessing.get_context("fork")
+
+    def new_pool():
+        return ProcessPoolExecutor(processes, mp_context=context, initializer=_init_process)
+
+    pool = new_pool()
+    try:
+        while True:
+            if time.monotonic() - purged_at > 3600:
+                for tenant in shops:
+                    with tenant_context(tenant):
+                        purge_finished(app, db.session)
+                purged_at = time.monotonic()
+
+            for tenant in shops:
+                with tenant_context(tenant):
+                    requeue_expired(app, db.session)
+                    renew_leases(app, db.session, worker, [job_id for shop, job_id, _ in in_flight.values() if shop == tenant])
+                    for job_id, name in claim(app, db.session, worker, processes - len(in_flight)):
+                        in_flight[pool.submit(_run_in_process, job_id, tenant, worker)] = (tenant, job_id, name)
+
+            if not in_flight:
+                if burst:
+                    return
+                time.sleep(poll_interval)
+                continue
+            done, _ = wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+            if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                # a process died (killed, out of memory, a crash in C code). The pool fails
+                # everything it was running and takes no more work, so start a new one.
+                click.echo("💥 A worker process died, restarting the pool")
+                done = set(in_flight)
+                wait(done)
+                pool.shutdown(wait=False)
+                pool = new_pool()
+            for future in done:
+                tenant, job_id, name = in_flight.pop(future)
+                try:
+                    status = future.result()
+                except Exception as e:
+                    # run_job records the handler's own errors, this is the process or the
+                    # database giving out underneath it
+                    with tenant_context(tenant):
+                        status = fail_job(db.session, job_id, worker, f"{type(e).__name__}: {e}")
+                icon = {SUCCEEDED: "✅", FAILED: "❌"}.get(status, "⏭️")
+                click.echo(f"{icon} {tenant or '(primary)'} job {job_id} ({name}): {status or 'taken over by another worker'}")
+    finally:
+        pool.shutdown()
+
+
+# job types
+
+@job_type("tickets.export", priority=0, concurrency=2)
+def export_tickets(app, session, format="json", status=None, include_archived=False):
+    """Every ticket (or every ticket with status) with totals, as JSON or CSV text."""
+    if format not in ("json", "csv"):
+        raise InvalidJob("format must be json or csv.")
+    filters = {"status": status} if status else {}
+    tickets = dump_tickets(session, tickets_schema, archived=include_archived, **filters)
+    if format == "json":
+        return {"count": len(tickets), "tickets": tickets}
+
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["id", "description", "status", "customer", "mechanics", "created_at", "completed_at",
+                     "part_count", "total_parts_cost", "archived"])
+    for t in tickets:
+        writer.writerow([
+            t["id"], t["description"], t["status"], (t.get("customer") or {}).get("name"),
+            "; ".join(m["name"] for m in t.get("mechanics", [])), t["created_at"], t["completed_at"],
+            t["part_count"], t["total_parts_cost"], t.get("archived", False),
+        ])
+    return {"count": len(tickets), "csv": out.getvalue()}
+
+
+@job_type("inventory.import", priority=5, concurrency=1)
+def import_inventory(app, session, items):
+    """Adds parts from items ([{name, price, quantity_on_hand?}]). A part whose name already
+    exists (ignoring case) gets its price and stock updated instead. All or nothing."""
+    if not isinstance(items, list):
+        raise InvalidJob("items must be a list.")
+    for n, item in enumerate(items):
+        if not isinstance(item, dict) or not item.get("name") or not isinstance(item.get("price"), (int, float)):
+            raise InvalidJob(f"items[{n}] needs a name and a numeric price.")
+
+    existing = {name.lower(): part_id for part_id, name in session.execute(select(Inventory.id, Inventory.name))}
+    new, changed = {}, []
+    for item in items:
+        row = {"name": item["name"], "price": item["price"]}
+        if "quantity_on_hand" in item:
+            row["quantity_on_hand"] = item["quantity_on_hand"]
+        part_id = existing.get(item["name"].lower())
+        if part_id is None:
+            new[item["name"].lower()] = {"quantity_on_hand": None, **row}  # last one wins
+        else:
+            changed.append({"id": part_id, **row})
+    if new:
+        session.execute(insert(Inventory), list(new.values()))
+    if changed:
+        session.execute(update(Inventory), changed)  # executemany by primary key
+    session.commit()
+    return {"created": len(new), "updated": len(changed)}
+
+
+@job_type("reports.reorder", priority=0, concurrency=1)
+def reorder_report(app, session, include_all=False):
+    return {"suggestions": reorder_suggestions(app, session, include_all)}
+
+
+@job_type("analytics.rebuild", priority=-10, concurrency=1)
+def rebuild_analytics(app, session):
+    rebuild_rollups(session)
+    return {"rebuilt": True}
+
+
+@job_type("archive.run", priority=-10, concurrency=1)
+def archive_tickets(app, session, days=None, batch_size=None):
+    return {"archived": archive_completed(app, session, days, batch_size)}
@@ -1,6 +1,7 @@
 # File: application/models.py
 
 from datetime import datetime
+from sqlalchemy import event
 from application.extensions import db
 
 # junction table: service_ticket <--> mechanic (Many-to-Many)
@@ -14,7 +15,8 @@ service_mechanic = db.Table(
 ticket_parts = db.Table(
     'ticket_parts',
     db.Column('service_ticket_id', db.Integer, db.ForeignKey('service_ticket.id'), primary_key=True),
-    db.Column('inventory_id', db.Integer, db.ForeignKey('inventory.id'), primary_key=True)
+    db.Column('inventory_id', db.Integer, db.ForeignKey('inventory.id'), primary_key=True),
+    db.Column('quantity', db.Integer, nullable=False, default=1, server_default="1")
 )
 
 
@@ -40,12 +42,26 @@ class Mechanic(db.Model):
     )
 
 
+class CustomerTrigram(db.Model):
+    # n-gram index for duplicate detection, see application/similarity.py
+    trigram = db.Column(db.String(3), primary_key=True)
+    field = db.Column(db.String(5), primary_key=True)  # "name" or "email"
+    customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), primary_key=True, index=True)
+    gram_count = db.Column(db.Integer, nullable=False)  # trigrams in this customer's field, for scoring
+    # covering index, lookups never touch the table itself
+    __table_args__ = (db.Index("ix_customer_trigram_lookup", "field", "trigram", "customer_id", "gram_count"),)
+
+
 class ServiceTicket(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(300), nullable=False)
     status = db.Column(db.String(50), default="Pending")
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime)  # stamped when status goes to Completed
     customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), nullable=False)
+    # bumped on every update, stale writes fail instead of overwriting (application/concurrency.py)
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
     # need this for test_service_tickets.py
     mechanics = db.relationship(
         "Mechanic",
@@ -59,13 +75,181 @@ class ServiceTicket(db.Model):
         back_populates="tickets"
     )
 
+
+@event.listens_for(ServiceTicket.status, "set")
+def _stamp_completion(target, value, oldvalue, initiator):
+    if value == "Completed" and oldvalue != "Completed":
+        target.completed_at = datetime.utcnow()
+    elif value != "Completed" and oldvalue == "Completed":
+        target.completed_at = None
+
+
+# cold storage for tickets completed long ago, moved here by application/archive.py.
+# Same columns as the hot tables (ids are kept), plus when the row was archived.
+# Only ever written through Core, so the relationships are view-only.
+
+service_mechanic_archive = db.Table(
+    'service_mechanic_archive',
+    db.Column('service_ticket_id', db.Integer, db.ForeignKey('service_ticket_archive.id'), primary_key=True),
+    db.Column('mechanic_id', db.Integer, db.ForeignKey('mechanic.id'), primary_key=True)
+)
+
+ticket_parts_archive = db.Table(
+    'ticket_parts_archive',
+    db.Column('service_ticket_id', db.Integer, db.ForeignKey('service_ticket_archive.id'), primary_key=True),
+    db.Column('inventory_id', db.Integer, db.ForeignKey('inventory.id'), primary_key=True),
+    db.Column('quantity', db.Integer, nullable=False, default=1, server_default="1")
+)
+
+
+class ArchivedTicket(db.Model):
+    __tablename__ = "service_ticket_archive"
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    description = db.Column(db.String(300), nullable=False)
+    status = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, index=True)
+    completed_at = db.Column(db.DateTime)
+    customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), nullable=False, index=True)
+    version = db.Column(db.Integer, nullable=False, server_default="1")
+    archived_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    customer = db.relationship("Customer", viewonly=True)
+    mechanics = db.relationship("Mechanic", secondary=service_mechanic_archive, viewonly=True)
+    parts = db.relationship("Inventory", secondary=ticket_parts_archive, viewonly=True)
+
+
+class Appointment(db.Model):
+    # a mechanic booked on a ticket for [starts_at, ends_at), see application/scheduling.py
+    id = db.Column(db.Integer, primary_key=True)
+    service_ticket_id = db.Column(db.Integer, db.ForeignKey("service_ticket.id"), nullable=False, index=True)
+    mechanic_id = db.Column(db.Integer, db.ForeignKey("mechanic.id"), nullable=False)
+    starts_at = db.Column(db.DateTime, nullable=False)
+    ends_at = db.Column(db.DateTime, nullable=False)
+    bay = db.Column(db.String(20))
+    __table_args__ = (
+        # overlap checks are a range scan per mechanic
+        db.Index("ix_appointment_mechanic_time", "mechanic_id", "starts_at", "ends_at"),
+        db.CheckConstraint("ends_at > starts_at", name="ck_appointment_not_empty"),
+    )
+
+
 class Inventory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False)
     price = db.Column(db.Float, nullable=False)
+    # NULL = not stock-tracked, reservations always go through (see application/stock.py)
+    quantity_on_hand = db.Column(db.Integer)
+    __table_args__ = (
+        # prefix lookups on lower(name) for the /inventory/search fallback
+        db.Index("ix_inventory_name_lower", db.func.lower(name)),
+        db.CheckConstraint("quantity_on_hand >= 0", name="ck_inventory_stock_not_negative"),
+    )
 
     tickets = db.relationship(
         "ServiceTicket",
         secondary=ticket_parts,
         back_populates="parts"
     )
+
+
+class IdempotencyKey(db.Model):
+    # stored responses for Idempotency-Key replays, see application/idempotency.py
+    key = db.Column(db.String(64), primary_key=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer)  # NULL while the first request is still running
+    body = db.Column(db.LargeBinary)
+    mimetype = db.Column(db.String(100))
+    headers = db.Column(db.Text)  # JSON [[name, value], ...], ETag, Location and friends
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+
+class WebhookEndpoint(db.Model):
+    # where a customer wants ticket events POSTed, see application/webhooks.py
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey("customer.id"), nullable=False, index=True)
+    url = db.Column(db.String(500), nullable=False)
+    secret = db.Column(db.String(64), nullable=False)  # HMAC key for the signature header
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # delivery state: consecutive failures drive the backoff, lease_until keeps two
+    # dispatchers off the same endpoint
+    failures = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    retry_at = db.Column(db.DateTime)
+    lease_until = db.Column(db.DateTime)
+
+
+class OutboxEvent(db.Model):
+    # one event for one endpoint, written in the transaction that caused it. No foreign key
+    # to the ticket, archiving it shouldn't have to wait for the notification.
+    id = db.Column(db.Integer, primary_key=True)
+    endpoint_id = db.Column(db.Integer, db.ForeignKey("webhook_endpoint.id"), nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    delivered_at = db.Column(db.DateTime)
+    failed_at = db.Column(db.DateTime)  # gave up after WEBHOOK_MAX_ATTEMPTS
+    last_error = db.Column(db.String(300))
+    __table_args__ = (
+        # the dispatcher only ever looks for what's still pending, in order, per endpoint
+        db.Index(
+            "ix_outbox_event_pending", "endpoint_id", "id",
+            sqlite_where=db.text("delivered_at IS NULL AND failed_at IS NULL"),
+            postgresql_where=db.text("delivered_at IS NULL AND failed_at IS NULL"),
+        ),
+    )
+
+
+class Job(db.Model):
+    # background work for `flask worker`, see application/jobs.py
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False, default="{}")  # JSON, keyword arguments for the handler
+    priority = db.Column(db.Integer, nullable=False, default=0)  # higher runs first
+    status = db.Column(db.String(20), nullable=False, default="queued")  # queued, running, succeeded, failed
+    created_by = db.Column(db.Integer)  # mechanic id, no foreign key so jobs outlive their mechanic
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    # the worker holding a running job keeps pushing lease_until forward, a job whose
+    # lease ran out lost its worker and goes back in the queue
+    worker = db.Column(db.String(100))
+    lease_until = db.Column(db.DateTime)
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.String(1000))
+    __table_args__ = (
+        # workers take the best queued jobs of each type, nothing else reads queued rows in bulk
+        db.Index(
+            "ix_job_queued", job_type, priority.desc(), id,
+            sqlite_where=db.text("status = 'queued'"),
+            postgresql_where=db.text("status = 'queued'"),
+        ),
+        # running jobs per type, for the concurrency limits
+        db.Index(
+            "ix_job_running", job_type, lease_until,
+            sqlite_where=db.text("status = 'running'"),
+            postgresql_where=db.text("status = 'running'"),
+        ),
+    )
+
+
+# analytics rollups, kept current by application/analytics.py. No foreign keys on
+# purpose, deleting a customer or a part shouldn't have to touch reporting tables.
+
+class DailyTicketStats(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    tickets_created = db.Column(db.Integer, nullable=False, default=0)
+    tickets_completed = db.Column(db.Integer, nullable=False, default=0)
+    completion_seconds = db.Column(db.Float, nullable=False, default=0)  # summed, for the average
+
+
+class PartRevenue(db.Model):
+    inventory_id = db.Column(db.Integer, primary_key=True)
+    units = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0)
+
+
+class CustomerValue(db.Model):
+    customer_id = db.Column(db.Integer, primary_key=True)
+    ticket_count = db.Column(db.Integer, nullable=False, default=0)
+    parts_revenue = db.Column(db.Float, nullable=False, default=0)
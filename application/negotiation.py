@@ -0,0 +1,58 @@
+# File: application/negotiation.py
+# Content negotiation for schema dumps. JSON stays the default, clients that send
+# Accept: application/msgpack (or application/cbor) get the same data in a binary
+# format that's smaller and much cheaper to parse on the shop tablets.
+
+from flask import Response, jsonify, request
+from application.tenancy import current_tenant
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional
+    cbor2 = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+CBOR = "application/cbor"
+
+# older msgpack clients still send the x- name
+ALIASES = {"application/x-msgpack": MSGPACK}
+
+
+def available_mimetypes():
+    # JSON first so */* and missing Accept headers keep getting JSON
+    mimetypes = [JSON]
+    if msgpack is not None:
+        mimetypes += [MSGPACK, "application/x-msgpack"]
+    if cbor2 is not None:
+        mimetypes.append(CBOR)
+    return mimetypes
+
+
+def negotiated_mimetype():
+    best = request.accept_mimetypes.best_match(available_mimetypes(), default=JSON)
+    return ALIASES.get(best, best)
+
+
+def render(data, status=200):
+    """Serialize already-dumped schema data in whatever format the client asked for."""
+    mimetype = negotiated_mimetype()
+    if mimetype == MSGPACK:
+        response = Response(msgpack.packb(data, use_bin_type=True), mimetype=MSGPACK)
+    elif mimetype == CBOR:
+        response = Response(cbor2.dumps(data), mimetype=CBOR)
+    else:
+        response = jsonify(data)
+    response.status_code = status
+    response.vary.add("Accept")
+    return response
+
+
+def negotiated_cache_key():
+    # for @cache.cached(key_prefix=...), one cache entry per format (and per shop)
+    return f"view/{current_tenant() or ''}/{request.full_path}/{negotiated_mimetype()}"
@@ -0,0 +1,142 @@
+# File: application/routing.py
+# Read replica routing. GET/HEAD requests read from a replica (round-robin, skipping
+# ones that fail their health check), everything else goes to the primary.
+# Once a session flushes it sticks to the primary for the rest of the request, and
+# after a write request the client gets a short-lived cookie that keeps its reads on
+# the primary too, so people see their own writes even with replication lag.
+# A session picks its replica on its first read and keeps it until the transaction ends,
+# so a list query and its lazy loads see the same replica (and the same lag).
+# Replicas are health checked by a background thread, never on a request's path.
+# Requests for a shop (application/tenancy.py) go to that shop's shard instead, shards
+# don't have replicas.
+
+import itertools
+import os
+import threading
+import time
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+PIN_COOKIE = "read_primary"
+TENANT_BIND_PREFIX = "tenant_"
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.bind is not None:
+            # explicitly joined to a connection (e.g. a /batch transaction), use it for everything
+            return self.bind
+        tenant = g.get("tenant") if has_app_context() else None
+        if bind is None and tenant:
+            return self._db.engines[TENANT_BIND_PREFIX + tenant]
+        if bind is None and not self._flushing and not self.info.get("primary_pinned"):
+            replica = self.info.get("replica")
+            if replica is None:
+                replica = self.info["replica"] = _replica_for_request()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _forget_replica(session, transaction):
+    # commit, rollback or close: the next transaction may pick another replica
+    if transaction.parent is None:
+        session.info.pop("replica", None)
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _pin_to_primary(session, flush_context, instances):
+    session.info["primary_pinned"] = True
+
+
+class ReplicaRouter:
+    def __init__(self, engines, check_interval=30):
+        self.engines = list(engines)
+        self.check_interval = check_interval
+        self._cycle = itertools.cycle(range(len(self.engines)))
+        self._lock = threading.Lock()
+        self._healthy = {}
+        self._checker_pid = None
+
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def next_engine(self):
+        self._ensure_checker()
+        for _ in range(len(self.engines)):
+            with self._lock:
+                engine = self.engines[next(self._cycle)]
+            if self.is_healthy(engine):
+                return engine
+        # every replica is down, the primary will have to cope
+        return None
+
+    def is_healthy(self, engine):
+        return self._healthy.get(engine, True)
+
+    def mark_down(self, engine):
+        self._healthy[engine] = False
+
+    def check(self):
+        for engine in self.engines:
+            try:
+                with engine.connect() as conn:
+                    conn.execute(text("SELECT 1"))
+                self._healthy[engine] = True
+            except Exception:
+                self._healthy[engine] = False
+
+    def _ensure_checker(self):
+        # one checker thread per process, started on first use: gunicorn forks the workers
+        # after create_app and a thread started in the master doesn't survive the fork
+        if self._checker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._checker_pid == os.getpid():
+                return
+            self._checker_pid = os.getpid()
+            threading.Thread(target=self._check_forever, name="replica-health", daemon=True).start()
+
+    def _check_forever(self):
+        while True:
+            time.sleep(self.check_interval)
+            self.check()
+
+    def _on_error(self, context):
+        if context.is_disconnect and context.engine is not None:
+            self.mark_down(context.engine)
+
+
+def init_replica_routing(app, engines):
+    replica_keys = [key for key in engines if key and key.startswith("replica")]
+    if not replica_keys:
+        return
+
+    app.extensions["replica_router"] = ReplicaRouter(
+        [engines[key] for key in sorted(replica_keys)],
+        check_interval=app.config.get("REPLICA_HEALTH_CHECK_INTERVAL", 30),
+    )
+
+    @app.after_request
+    def _pin_writer_to_primary(response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            response.set_cookie(
+                PIN_COOKIE, "1",
+                max_age=app.config.get("REPLICA_PIN_SECONDS", 5),
+                httponly=True,
+            )
+        return response
+
+
+def _replica_for_request():
+    if not has_request_context() or request.method not in READ_METHODS:
+        return None
+    if request.cookies.get(PIN_COOKIE):
+        return None
+    router = current_app.extensions.get("replica_router")
+    if router is None:
+        return None
+    return router.next_engine()
@@ -0,0 +1,286 @@
+# File: application/scheduling.py
+# Appointment calendar. Each worker keeps every mechanic's (and bay's) upcoming bookings
+# in memory as sorted parallel lists. Bookings for one mechanic never overlap, because the
+# database check below rejects them. Sorting by start therefore sorts the ends too, so
+# "is this range free" is one bisect plus a step back: the interval tree degenerates to a
+# sorted list. "Next free slot" hops from booking end to booking end with a bisect each,
+# inside opening hours.
+#
+# The in-memory index only answers questions and rejects obvious clashes early.
+# Booking still locks the mechanic row (and the bay, through an advisory lock on
+# Postgres), inserts, then looks for an overlap in the database in the same transaction.
+# Two workers with stale indexes can't double book either of them.
+# Committed ORM writes patch the index, and it's rebuilt after APPOINTMENT_INDEX_MAX_AGE
+# or when an atomic /batch rolls back writes it had already patched in.
+
+import bisect
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, or_, select
+from application.models import Appointment, Mechanic
+from application.routing import RoutingSession
+from application.tenancy import tenant_state
+
+EXTENSION_KEY = "appointment_schedule"
+
+
+class SlotTaken(Exception):
+    def __init__(self, conflicts, message="That slot is already booked."):
+        super().__init__(message)
+        self.conflicts = sorted(conflicts)
+
+
+class Calendar:
+    def __init__(self):
+        self.starts, self.ends, self.ids = [], [], []
+
+    def add(self, appointment_id, start, end):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, appointment_id)
+
+    def remove(self, appointment_id, start):
+        i = bisect.bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.ids[i] == appointment_id:
+                del self.starts[i], self.ends[i], self.ids[i]
+                return
+            i += 1
+
+    def _first_clash(self, start, end):
+        # last booking that starts before the range ends, then back while they still reach into it
+        i = bisect.bisect_left(self.starts, end) - 1
+        first = None
+        while i >= 0 and self.ends[i] > start:
+            first = i
+            i -= 1
+        return first
+
+    def conflicts(self, start, end):
+        first = self._first_clash(start, end)
+        if first is None:
+            return []
+        last = bisect.bisect_left(self.starts, end)
+        return self.ids[first:last]
+
+    def next_free(self, after, duration, hours, until):
+        slot = hours.fit(after, duration)
+        while slot is not None and slot < until:
+            clash = self._first_clash(slot, slot + duration)
+            if clash is None:
+                return slot
+            slot = hours.fit(self.ends[clash], duration)
+        return None
+
+
+class OpeningHours:
+    def __init__(self, open_hour, close_hour):
+        self.open_hour, self.close_hour = open_hour, close_hour
+
+    def fit(self, at, duration):
+        """Earliest start at or after `at` that ends by closing time, None if it never fits."""
+        if duration > timedelta(hours=self.close_hour - self.open_hour):
+            return None
+        opens = at.replace(hour=self.open_hour, minute=0, second=0, microsecond=0)
+        closes = opens + timedelta(hours=self.close_hour - self.open_hour)
+        if at < opens:
+            at = opens
+        if at + duration > closes:
+            at = opens + timedelta(days=1)
+        return at
+
+
+class Schedule:
+    def __init__(self):
+        self.loaded_at = float("-inf")
+        self._lock = threading.Lock()
+        self._calendars = {}  # ("mechanic", id) / ("bay", name) -> Calendar
+        self._booked = {}  # appointment id -> (keys, start)
+
+    def load(self, session, since):
+        calendars = {("mechanic", mechanic_id): Calendar() for mechanic_id in session.scalars(select(Mechanic.id))}
+        booked = {}
+        for row in session.execute(
+            select(Appointment.__table__).where(Appointment.ends_at > since).order_by(Appointment.starts_at)
+        ):
+            keys = _keys(row)
+            for key in keys:
+                calendars.setdefault(key, Calendar()).add(row.id, row.starts_at, row.ends_at)
+            booked[row.id] = (keys, row.starts_at)
+        with self._lock:
+            self._calendars, self._booked = calendars, booked
+            self.loaded_at = time.monotonic()
+
+    def upsert(self, appointment):
+        with self._lock:
+            self._remove(appointment.id)
+            keys = _keys(appointment)
+            for key in keys:
+                self._calendars.setdefault(key, Calendar()).add(appointment.id, appointment.starts_at, appointment.ends_at)
+            self._booked[appointment.id] = (keys, appointment.starts_at)
+
+    def remove(self, appointment_id):
+        with self._lock:
+            self._remove(appointment_id)
+
+    def _remove(self, appointment_id):
+        keys, start = self._booked.pop(appointment_id, ((), None))
+        for key in keys:
+            if key in self._calendars:
+                self._calendars[key].remove(appointment_id, start)
+
+    def add_mechanic(self, mechanic_id):
+        with self._lock:
+            self._calendars.setdefault(("mechanic", mechanic_id), Calendar())
+
+    def drop_mechanic(self, mechanic_id):
+        with self._lock:
+            self._calendars.pop(("mechanic", mechanic_id), None)
+
+    def conflicts(self, start, end, mechanic_id=None, bay=None):
+        keys = [("mechanic", mechanic_id)] * (mechanic_id is not None) + [("bay", bay)] * (bay is not None)
+        with self._lock:
+            return sorted({i for key in keys if key in self._calendars for i in self._calendars[key].conflicts(start, end)})
+
+    def free_mechanics(self, start, end):
+        with self._lock:
+            return [key[1] for key, calendar in sorted(self._calendars.items())
+                    if key[0] == "mechanic" and not calendar.conflicts(start, end)]
+
+    def next_free(self, after, duration, hours, until, mechanic_id=None):
+        """(mechanic id, start) of the earliest slot, for one mechanic or whoever's free first."""
+        earliest = hours.fit(after, duration)
+        best = None
+        with self._lock:
+            for key, calendar in sorted(self._calendars.items()):
+                if key[0] != "mechanic" or (mechanic_id is not None and key[1] != mechanic_id):
+                    continue
+                slot = calendar.next_free(after, duration, hours, until)
+                if slot is not None and (best is None or slot < best[1]):
+                    best = (key[1], slot)
+                    if slot == earliest:  # can't beat the opening of the window
+                        break
+        return best
+
+
+def _keys(appointment):
+    keys = [("mechanic", appointment.mechanic_id)]
+    if appointment.bay:
+        keys.append(("bay", appointment.bay))
+    return keys
+
+
+def opening_hours(app):
+    return OpeningHours(app.config.get("APPOINTMENT_OPEN_HOUR", 8), app.config.get("APPOINTMENT_CLOSE_HOUR", 18))
+
+
+def schedule_for(app, session):
+    """The app's schedule, rebuilt if it's missing or older than APPOINTMENT_INDEX_MAX_AGE."""
+    schedule = tenant_state(app).get(EXTENSION_KEY)
+    if schedule is None:
+        schedule = tenant_state(app)[EXTENSION_KEY] = Schedule()
+    if time.monotonic() - schedule.loaded_at > app.config.get("APPOINTMENT_INDEX_MAX_AGE", 300):
+        # a day back so appointments running right now are still in there
+        schedule.load(session, datetime.utcnow() - timedelta(days=1))
+    return schedule
+
+
+def invalidate(app):
+    # for writes the index saw that never made it to the database, rebuild on next use
+    schedule = tenant_state(app).get(EXTENSION_KEY)
+    if schedule is not None:
+        schedule.loaded_at = float("-inf")
+
+
+def book(app, session, ticket_id, starts_at, ends_at, mechanic_id=None, bay=None):
+    """Adds an Appointment in the caller's transaction. Without a mechanic_id it goes to the
+    lowest numbered mechanic who's free. Raises SlotTaken, roll back when it does."""
+    schedule = schedule_for(app, session)
+    if mechanic_id is None:
+        free = schedule.free_mechanics(starts_at, ends_at)
+        if not free:
+            raise SlotTaken([], "No mechanic is free then.")
+        mechanic_id = free[0]
+    known = schedule.conflicts(starts_at, ends_at, mechanic_id, bay)
+    if known:
+        raise SlotTaken(known)
+
+    # the real check: serialize bookings per mechanic and per bay, then look for an overlap
+    # that this worker's index hasn't seen yet (on SQLite the insert already holds the write lock)
+    session.execute(select(Mechanic.id).where(Mechanic.id == mechanic_id).with_for_update())
+    if bay and _locks_bays(session):
+        # two mechanics booking one bay lock different mechanic rows, bays have no row to lock.
+        # Taken after the mechanic, in the same order everywhere, and released at commit
+        session.execute(select(func.pg_advisory_xact_lock(func.hashtext(f"appointment-bay:{bay}"))))
+    appointment = Appointment(service_ticket_id=ticket_id, mechanic_id=mechanic_id,
+                              starts_at=starts_at, ends_at=ends_at, bay=bay)
+    session.add(appointment)
+    session.flush()
+    same_resource = Appointment.mechanic_id == mechanic_id
+    if bay:
+        same_resource = or_(same_resource, Appointment.bay == bay)
+    clashes = session.scalars(
+        select(Appointment.id).where(
+            same_resource,
+            Appointment.id != appointment.id,
+            Appointment.starts_at < ends_at,
+            Appointment.ends_at > starts_at,
+        )
+    ).all()
+    if clashes:
+        schedule.loaded_at = float("-inf")  # someone else booked it, reload next time
+        raise SlotTaken(clashes)
+    return appointment
+
+
+def _locks_bays(session):
+    return session.get_bind().dialect.name == "postgresql"
+
+
+# keep the index in step with committed ORM writes
+
+def _current_schedule():
+    return tenant_state(current_app).get(EXTENSION_KEY) if has_app_context() else None
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_appointment_changes(session, flush_context):
+    if _current_schedule() is None:
+        return
+    changes = session.info.setdefault("appointment_changes", [])
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Appointment):
+            changes.append(("upsert", SimpleNamespace(**{c.key: getattr(obj, c.key) for c in Appointment.__table__.columns})))
+        elif isinstance(obj, Mechanic):
+            changes.append(("mechanic", obj.id))
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            changes.append(("remove", obj.id))
+        elif isinstance(obj, Mechanic):
+            changes.append(("drop_mechanic", obj.id))
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _apply_appointment_changes(session):
+    changes = session.info.pop("appointment_changes", None)
+    schedule = _current_schedule()
+    if not changes or schedule is None:
+        return
+    for kind, value in changes:
+        if kind == "upsert":
+            schedule.upsert(value)
+        elif kind == "remove":
+            schedule.remove(value)
+        elif kind == "mechanic":
+            schedule.add_mechanic(value)
+        else:
+            schedule.drop_mechanic(value)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _drop_appointment_changes(session):
+    session.info.pop("appointment_changes", None)
@@ -0,0 +1,125 @@
+# File: application/similarity.py
+# Near-duplicate customer detection ("Jon Smith" vs "John Smith").
+# Every customer's name and email local part are broken into trigrams (pg_trgm style,
+# words padded with two spaces in front and one behind) and stored in customer_trigram.
+# A lookup reads only the index entries for the query's own trigrams and scores those
+# customers by trigram similarity (shared / union) in the same covering-index query, so
+# the work follows how many customers share trigrams with the query, not the table
+# size. Only the top matches are loaded as Customer objects.
+
+import re
+import click
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import delete, event, func, insert, inspect, select
+from application.extensions import db
+from application.models import Customer, CustomerTrigram
+
+trigrams_cli = AppGroup("trigrams", help="Maintain the customer duplicate-detection index.")
+trigram_table = CustomerTrigram.__table__
+
+
+def trigrams(text):
+    grams = set()
+    for word in re.findall(r"[^\W_]+", (text or "").lower()):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def email_local_part(email):
+    # "jon.smith+cars@example.com" -> "jon.smith", the split into words happens in trigrams()
+    return (email or "").split("@", 1)[0].split("+", 1)[0]
+
+
+def similarity(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def customer_rows(customer_id, name, email):
+    rows = []
+    for field, value in (("name", name), ("email", email_local_part(email))):
+        grams = trigrams(value)
+        rows.extend({"trigram": gram, "field": field, "customer_id": customer_id, "gram_count": len(grams)} for gram in grams)
+    return rows
+
+
+def find_similar(session, name=None, email=None, threshold=0.5, limit=10, exclude_id=None):
+    """Returns [(customer, score)] best first, score being the better of name/email similarity."""
+    scores = {}
+    for field, grams in (("name", trigrams(name)), ("email", trigrams(email_local_part(email)))):
+        if not grams:
+            continue
+        for customer_id, score in _field_matches(session, field, grams, threshold, limit + 1):
+            scores[customer_id] = max(score, scores.get(customer_id, 0.0))
+    scores.pop(exclude_id, None)
+    best = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    if not best:
+        return []
+
+    customers = {c.id: c for c in session.scalars(select(Customer).where(Customer.id.in_([i for i, _ in best])))}
+    return [(customers[i], round(score, 3)) for i, score in best if i in customers]
+
+
+def _field_matches(session, field, grams, threshold, limit):
+    # the similarity is worked out in the index scan: shared = matching rows,
+    # union = len(grams) + the customer's own trigram count (stored on every row) - shared
+    shared = func.count()
+    union = len(grams) + func.max(trigram_table.c.gram_count) - shared
+    score = (shared * 1.0 / union).label("score")
+    stmt = (
+        select(trigram_table.c.customer_id, score)
+        .where(trigram_table.c.field == field, trigram_table.c.trigram.in_(grams))
+        .group_by(trigram_table.c.customer_id)
+        .having(shared * 1.0 >= threshold * union)
+        .order_by(score.desc(), trigram_table.c.customer_id)
+        .limit(limit)
+    )
+    return session.execute(stmt).all()
+
+
+def rebuild_trigrams(session):
+    session.execute(delete(trigram_table))
+    rows = []
+    for customer_id, name, email in session.execute(select(Customer.id, Customer.name, Customer.email)):
+        rows.extend(customer_rows(customer_id, name, email))
+    if rows:
+        session.execute(insert(trigram_table), rows)
+    session.commit()
+    return len(rows)
+
+
+# keep customer_trigram in step with ORM writes, in the same transaction
+
+@event.listens_for(Customer, "after_insert")
+def _index_new_customer(mapper, connection, target):
+    _insert_rows(connection, target)
+
+
+@event.listens_for(Customer, "after_update")
+def _reindex_customer(mapper, connection, target):
+    state = inspect(target)
+    if not (state.attrs.name.history.has_changes() or state.attrs.email.history.has_changes()):
+        return
+    connection.execute(delete(trigram_table).where(trigram_table.c.customer_id == target.id))
+    _insert_rows(connection, target)
+
+
+@event.listens_for(Customer, "before_delete")
+def _unindex_customer(mapper, connection, target):
+    connection.execute(delete(trigram_table).where(trigram_table.c.customer_id == target.id))
+
+
+def _insert_rows(connection, customer):
+    rows = customer_rows(customer.id, customer.name, customer.email)
+    if rows:
+        connection.execute(insert(trigram_table), rows)
+
+
+@trigrams_cli.command("rebuild")
+@with_appcontext
+def rebuild_command():
+    """Re-index every customer, for databases that had customers before the index existed."""
+    count = rebuild_trigrams(db.session)
+    click.echo(f"🔤 Indexed {count} customer trigrams")
@@ -0,0 +1,185 @@
+# File: application/slow_queries.py
+# Opt-in slow query log. Anything slower than SLOW_QUERY_THRESHOLD_MS gets written
+# (statement, redacted params, endpoint, EXPLAIN output) to a small side SQLite file.
+# Kept out of the main database on purpose so logging never fights the app for locks.
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from flask import has_request_context, request
+from sqlalchemy import event
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS slow_query (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    statement TEXT NOT NULL,
+    parameters TEXT,
+    endpoint TEXT,
+    duration_ms REAL NOT NULL,
+    plan TEXT,
+    created_at TEXT NOT NULL
+)
+"""
+
+
+def init_slow_query_log(app, engine):
+    if not app.config.get("SLOW_QUERY_LOG_ENABLED"):
+        return
+
+    threshold_ms = app.config.get("SLOW_QUERY_THRESHOLD_MS", 200)
+    log_path = slow_query_log_path(app)
+    max_rows = app.config.get("SLOW_QUERY_LOG_MAX_ROWS", 10000)
+
+    with _connect(log_path) as log:
+        log.execute(_SCHEMA)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _check_duration(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["slow_query_start"].pop()
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms < threshold_ms:
+            return
+
+        record_slow_query(
+            log_path,
+            statement=statement,
+            parameters=redact_parameters(parameters),
+            endpoint=request.endpoint if has_request_context() else None,
+            duration_ms=duration_ms,
+            plan=_explain(conn, statement, parameters, executemany),
+            max_rows=max_rows,
+        )
+
+
+def record_slow_query(log_path, statement, parameters, endpoint, duration_ms, plan, max_rows=10000):
+    with _connect(log_path) as log:
+        log.execute(
+            "INSERT INTO slow_query (statement, parameters, endpoint, duration_ms, plan, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (statement, parameters, endpoint, duration_ms, plan, datetime.utcnow().isoformat()),
+        )
+        # poor man's rotation, keep only the newest max_rows entries
+        log.execute(
+            "DELETE FROM slow_query WHERE id <= (SELECT MAX(id) FROM slow_query) - ?",
+            (max_rows,),
+        )
+
+
+def top_offenders(log_path, limit=20):
+    with _connect(log_path) as log:
+        log.execute(_SCHEMA)
+        rows = log.execute(
+            """
+            SELECT statement,
+                   COUNT(*) AS calls,
+                   SUM(duration_ms) AS total_ms,
+                   AVG(duration_ms) AS avg_ms,
+                   MAX(duration_ms) AS max_ms,
+                   GROUP_CONCAT(DISTINCT endpoint) AS endpoints,
+                   (SELECT s2.plan FROM slow_query s2
+                     WHERE s2.statement = s1.statement
+                     ORDER BY s2.id DESC LIMIT 1) AS plan,
+                   MAX(created_at) AS last_seen
+            FROM slow_query s1
+            GROUP BY statement
+            ORDER BY total_ms DESC
+            LIMIT ?
+            """,
+            (limit,),
+        ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def clear_slow_queries(log_path):
+    with _connect(log_path) as log:
+        log.execute(_SCHEMA)
+        log.execute("DELETE FROM slow_query")
+
+
+def redact_parameters(parameters):
+    # never store actual values (passwords, emails...), only their types
+    if parameters is None:
+        return None
+    if isinstance(parameters, dict):
+        return repr({key: _redact(value) for key, value in parameters.items()})
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (list, tuple, dict)):
+            # executemany, one entry is plenty to see the shape
+            return f"{redact_parameters(parameters[0])} x{len(parameters)}"
+        return repr([_redact(value) for value in parameters])
+    return _redact(parameters)
+
+
+def _redact(value):
+    if value is None:
+        return None
+    return f"<{type(value).__name__}>"
+
+
+def _explain(conn, statement, parameters, executemany):
+    # a leading WITH is still a read, the CTEs in analytics and forecasting start that way
+    if executemany or not statement.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+
+    dialect = conn.dialect.name
+    if dialect == "sqlite":
+        explain_sql = "EXPLAIN QUERY PLAN " + statement
+    elif dialect == "postgresql":
+        explain_sql = "EXPLAIN " + statement
+    else:
+        return None
+
+    # raw DBAPI cursor so the EXPLAIN doesn't clobber the real cursor or re-trigger these events.
+    # It's the request's own connection and transaction: on Postgres a failed statement
+    # aborts the whole transaction, so the EXPLAIN gets a savepoint to fail into
+    savepoint = dialect == "postgresql" and not getattr(conn.connection.dbapi_connection, "autocommit", False)
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            if savepoint:
+                cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(explain_sql, parameters)
+                rows = cursor.fetchall()
+            except Exception:
+                if savepoint:
+                    cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            finally:
+                if savepoint:
+                    cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f"EXPLAIN failed: {e}"
+
+    if dialect == "sqlite":
+        # (id, parent, notused, detail)
+        return "\n".join(str(row[-1]) for row in rows)
+    return "\n".join(str(row[0]) for row in rows)
+
+
+def slow_query_log_path(app):
+    # relative paths live next to the app database in the instance folder, same as Flask-SQLAlchemy
+    log_path = app.config.get("SLOW_QUERY_LOG_PATH", "slow_queries.db")
+    if not os.path.isabs(log_path):
+        os.makedirs(app.instance_path, exist_ok=True)
+        log_path = os.path.join(app.instance_path, log_path)
+    return log_path
+
+
+@contextmanager
+def _connect(log_path):
+    log = sqlite3.connect(log_path, timeout=5)
+    log.row_factory = sqlite3.Row
+    try:
+        yield log
+        log.commit()
+    finally:
+        log.close()
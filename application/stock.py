@@ -0,0 +1,43 @@
+# File: application/stock.py
+# Stock reservations. Taking parts off the shelf is one conditional UPDATE
+# (quantity_on_hand - n WHERE quantity_on_hand >= n), so the check and the decrement
+# happen atomically in the database: two mechanics grabbing the last alternator can't
+# both win, and nobody has to lock the table or re-read the row.
+# Parts with quantity_on_hand NULL aren't stock-tracked and always reserve.
+
+from sqlalchemy import insert, or_, select, update
+from application.models import Inventory, ticket_parts
+from application.analytics import record_parts_booked
+
+inventory = Inventory.__table__
+
+
+class OutOfStock(Exception):
+    def __init__(self, part_id, requested):
+        super().__init__(f"Not enough stock for part {part_id} (wanted {requested}).")
+        self.part_id = part_id
+        self.requested = requested
+
+
+def reserve(session, ticket_id, part_id, quantity=1):
+    """Moves quantity of a part onto a ticket. False if the part doesn't exist, OutOfStock if
+    there isn't enough. Runs in the caller's transaction, roll back on OutOfStock."""
+    on_hand = inventory.c.quantity_on_hand
+    taken = session.execute(
+        update(inventory)
+        .where(inventory.c.id == part_id, or_(on_hand.is_(None), on_hand >= quantity))
+        .values(quantity_on_hand=on_hand - quantity)
+    )
+    if taken.rowcount == 0:
+        if session.scalar(select(inventory.c.id).where(inventory.c.id == part_id)) is None:
+            return False
+        raise OutOfStock(part_id, quantity)
+
+    on_ticket = (ticket_parts.c.service_ticket_id == ticket_id) & (ticket_parts.c.inventory_id == part_id)
+    booked = session.execute(
+        update(ticket_parts).where(on_ticket).values(quantity=ticket_parts.c.quantity + quantity)
+    )
+    if booked.rowcount == 0:
+        session.execute(insert(ticket_parts).values(service_ticket_id=ticket_id, inventory_id=part_id, quantity=quantity))
+    record_parts_booked(session.connection(), ticket_id, part_id, quantity)
+    return True
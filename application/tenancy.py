@@ -0,0 +1,151 @@
+# File: application/tenancy.py
+# One API, several shops. Every shop (tenant) lives in its own shard: a SQLite file or a
+# Postgres schema, configured as a "tenant_<name>" entry in SQLALCHEMY_BINDS (see
+# tenant_binds in config.py). Shops don't share a write lock or a table, so adding a
+# shop adds write capacity instead of contention.
+#
+# A request's tenant comes from the "tenant" claim in its JWT (encode_token adds the
+# current one), otherwise from the Host header (TENANT_HOSTS, or the first label of the
+# host name when it's a shop's name). A token is only good for the shop that issued it.
+# Requests that don't resolve to a shop use the primary database, the original
+# single-shop setup, so nothing changes until shops are configured.
+# RoutingSession sends the request's queries to its shop's bind, and the per-worker indexes
+# (assignment heap, calendar, typeahead) keep one copy per shop through tenant_state().
+#
+# `flask tenants upgrade` creates missing tables and indexes on every shard.
+# `flask tenants run <command>` runs any other CLI command once per shop.
+
+import contextlib
+import click
+from flask import current_app, g, has_app_context, jsonify, request
+from flask.cli import AppGroup, with_appcontext
+from jose import JWTError
+from application.extensions import db
+from application.routing import TENANT_BIND_PREFIX as BIND_PREFIX
+
+tenants_cli = AppGroup("tenants", help="Manage the per-shop database shards.")
+
+
+def tenant_names(app):
+    return sorted(key[len(BIND_PREFIX):] for key in app.config.get("SQLALCHEMY_BINDS", {}) if key.startswith(BIND_PREFIX))
+
+
+def current_tenant():
+    """The shop the current request (or `tenants run`) is working for, None for the primary."""
+    return g.get("tenant") if has_app_context() else None
+
+
+def tenant_engine():
+    """The engine for the current shop, the primary engine when there isn't one."""
+    tenant = current_tenant()
+    return db.engines[BIND_PREFIX + tenant] if tenant else db.engine
+
+
+def tenant_state(app):
+    """app.extensions for the current shop, so in-memory indexes never mix two shops' rows."""
+    tenant = current_tenant()
+    if tenant is None:
+        return app.extensions
+    return app.extensions.setdefault("tenants", {}).setdefault(tenant, {})
+
+
+@contextlib.contextmanager
+def tenant_context(tenant):
+    # for code running outside a request (CLI, jobs), needs an app context
+    previous = g.get("tenant")
+    g.tenant = tenant
+    db.session.remove()  # don't carry a session bound to the previous shop's connections over
+    try:
+        yield
+    finally:
+        db.session.remove()
+        g.tenant = previous
+
+
+def resolve_tenant(app):
+    """(tenant, error message) for the current request."""
+    from application.utils import _decode_token, _extract_token  # utils imports this module
+
+    tenants = set(tenant_names(app))
+    from_host = _tenant_for_host(app, tenants)
+    token = _extract_token()
+    if not token:
+        return from_host, None
+    try:
+        claims = _decode_token(token)
+    except JWTError:
+        return from_host, None  # the route's decorator answers for bad tokens
+    from_token = claims.get("tenant")
+    if from_token is not None and from_token not in tenants:
+        return None, "Unknown shop."
+    if from_host is not None and from_token != from_host:
+        return None, "This token belongs to another shop."
+    return from_token, None
+
+
+def _tenant_for_host(app, tenants):
+    host = request.host.split(":")[0].lower()
+    tenant = app.config.get("TENANT_HOSTS", {}).get(host)
+    if tenant is None and host.split(".")[0] in tenants:
+        tenant = host.split(".")[0]
+    return tenant
+
+
+def init_tenancy(app):
+    if not tenant_names(app):
+        return
+
+    @app.before_request
+    def _route_to_tenant():
+        tenant, error = resolve_tenant(app)
+        if error:
+            return jsonify({"message": error}), 403
+        g.tenant = tenant
+
+
+def shard_engines(app):
+    """[(tenant, engine)] for the primary (None) and every shop."""
+    return [(None, db.engine)] + [(tenant, db.engines[BIND_PREFIX + tenant]) for tenant in tenant_names(app)]
+
+
+def upgrade_shards(app):
+    # no migration scripts in this repo, the schema comes from the models: create_all only
+    # adds what's missing (tables and their indexes/triggers) and leaves data alone
+    upgraded = []
+    for tenant, engine in shard_engines(app):
+        db.metadata.create_all(engine)
+        upgraded.append(tenant)
+    return upgraded
+
+
+@tenants_cli.command("list")
+@with_appcontext
+def list_command():
+    """Show the configured shops and where their data lives."""
+    for tenant, engine in shard_engines(current_app):
+        click.echo(f"🏪 {tenant or '(primary)'}: {engine.url.render_as_string(hide_password=True)}")
+
+
+@tenants_cli.command("upgrade")
+@with_appcontext
+def upgrade_command():
+    """Create missing tables and indexes on the primary and every shop shard."""
+    for tenant in upgrade_shards(current_app):
+        click.echo(f"🏪 {tenant or '(primary)'} is up to date")
+
+
+@tenants_cli.command("run", context_settings={"ignore_unknown_options": True})
+@click.option("--tenant", "only", multiple=True, help="Only these shops (repeatable), default is all of them.")
+@click.argument("command", nargs=-1, type=click.UNPROCESSED, required=True)
+@with_appcontext
+def run_command(only, command):
+    """Run another flask command once per shop, e.g. `flask tenants run archive run`."""
+    app = current_app._get_current_object()
+    for tenant in only or tenant_names(app):
+        if tenant not in tenant_names(app):
+            raise click.BadParameter(f"unknown shop '{tenant}'", param_hint="--tenant")
+        click.echo(f"🏪 {tenant}")
+        with tenant_context(tenant):
+            ctx = app.cli.make_context("flask", list(command), parent=click.get_current_context())
+            with ctx:
+                app.cli.invoke(ctx)
@@ -0,0 +1,207 @@
+# File: application/typeahead.py
+# In-memory prefix index for inventory part names (/inventory/search?prefix=).
+# Every lowercased name is stored once per word it contains ("front brake pad",
+# "brake pad", "pad") in one sorted list, so a prefix lookup is two bisects plus a slice.
+# Committed part writes in this process patch the index in place. Writes from other
+# workers show up when the index gets older than INVENTORY_INDEX_MAX_AGE and is
+# reloaded. With INVENTORY_SEARCH_INDEX off, lookups go to the lower(name) DB index.
+# Stock isn't served from the index: it moves with every reservation, through Core UPDATEs
+# (application/stock.py, the import job) that no ORM event sees, so with_current_stock
+# reads it for the handful of parts a search returns.
+
+import bisect
+import heapq
+import re
+import threading
+import time
+from types import SimpleNamespace
+from flask import current_app, has_app_context
+from sqlalchemy import event, func, select
+from application.models import Inventory
+from application.routing import RoutingSession
+from application.tenancy import tenant_state
+
+EXTENSION_KEY = "inventory_prefix_index"
+# sorts after any character a name can contain
+HIGH = "\U0010ffff"
+
+
+def name_keys(name):
+    lowered = " ".join(re.findall(r"\w+", name.lower()))
+    starts = [m.start() for m in re.finditer(r"\w+", lowered)]
+    return [lowered[start:] for start in starts]
+
+
+class PrefixIndex:
+    # ranked results are memoized per prefix (up to TOP_K of them), short prefixes match
+    # thousands of names and ranking those is the slow part. A write only forgets the
+    # prefixes of the name it touched.
+    TOP_K = 50
+    MAX_MEMO = 10_000
+
+    def __init__(self, dump):
+        self.dump = dump
+        self.loaded_at = float("-inf")
+        self._lock = threading.Lock()
+        self._keys = []  # sorted (key, part id)
+        self._parts = {}  # part id -> (rank, part row)
+        self._memo = {}  # prefix -> ranked part ids
+        self._dumped = {}  # part id -> schema dump, filled as parts get returned
+
+    def load(self, session):
+        entries, parts = [], {}
+        # plain rows, the schema only dumps the handful that get returned
+        for row in session.execute(select(Inventory.__table__)):
+            parts[row.id] = (_rank(row.id, row.name), row)
+            entries.extend((key, row.id) for key in name_keys(row.name))
+        entries.sort()
+        with self._lock:
+            self._keys, self._parts, self._memo, self._dumped = entries, parts, {}, {}
+            self.loaded_at = time.monotonic()
+
+    def upsert(self, part_id, part):
+        with self._lock:
+            self._remove(part_id)
+            self._parts[part_id] = (_rank(part_id, part.name), part)
+            for key in name_keys(part.name):
+                bisect.insort(self._keys, (key, part_id))
+            self._forget(part.name)
+
+    def remove(self, part_id):
+        with self._lock:
+            self._remove(part_id)
+
+    def _remove(self, part_id):
+        existing = self._parts.pop(part_id, None)
+        self._dumped.pop(part_id, None)
+        if existing is None:
+            return
+        for key in name_keys(existing[1].name):
+            i = bisect.bisect_left(self._keys, (key, part_id))
+            if i < len(self._keys) and self._keys[i] == (key, part_id):
+                del self._keys[i]
+        self._forget(existing[1].name)
+
+    def _forget(self, name):
+        for key in name_keys(name):
+            for end in range(1, len(key) + 1):
+                self._memo.pop(key[:end], None)
+
+    def search(self, prefix, limit=10):
+        prefix = " ".join(re.findall(r"\w+", prefix.lower()))
+        if not prefix:
+            return []
+        with self._lock:
+            ranked = self._memo.get(prefix)
+            if ranked is None:
+                ranked = self._top(prefix)
+                if len(self._memo) >= self.MAX_MEMO:
+                    self._memo = {}
+                self._memo[prefix] = ranked
+            results = []
+            for part_id in ranked[:limit]:
+                dumped = self._dumped.get(part_id)
+                if dumped is None:
+                    dumped = self._dumped[part_id] = self.dump(self._parts[part_id][1])
+                results.append(dumped)
+            return results
+
+    def _top(self, prefix):
+        lo = bisect.bisect_left(self._keys, (prefix,))
+        hi = bisect.bisect_left(self._keys, (prefix + HIGH,), lo)
+        parts = self._parts
+        # a whole-name prefix beats a later word matching, then shorter names first
+        candidates = {}
+        for key, part_id in self._keys[lo:hi]:
+            rank = parts[part_id][0]
+            whole = len(key) == rank[0]
+            if whole or part_id not in candidates:
+                candidates[part_id] = (not whole, rank)
+        best = heapq.nsmallest(self.TOP_K, candidates.items(), key=lambda item: item[1])
+        return [part_id for part_id, _ in best]
+
+
+def _rank(part_id, name):
+    lowered = " ".join(re.findall(r"\w+", name.lower()))
+    return (len(lowered), lowered, part_id)
+
+
+def prefix_index(app, session, dump):
+    """The app's index, (re)loaded if it's missing or older than INVENTORY_INDEX_MAX_AGE."""
+    index = tenant_state(app).get(EXTENSION_KEY)
+    if index is None:
+        index = tenant_state(app)[EXTENSION_KEY] = PrefixIndex(dump)
+    if time.monotonic() - index.loaded_at > app.config.get("INVENTORY_INDEX_MAX_AGE", 60):
+        index.load(session)
+    return index
+
+
+def invalidate(app):
+    # for writes the index saw that never made it to the database, reload on next use
+    index = tenant_state(app).get(EXTENSION_KEY)
+    if index is not None:
+        index.loaded_at = float("-inf")
+
+
+def with_current_stock(session, dumped):
+    """Copies of the dumped parts with quantity_on_hand as it is in the database now."""
+    if not dumped:
+        return dumped
+    stock = dict(session.execute(
+        select(Inventory.id, Inventory.quantity_on_hand).where(Inventory.id.in_([part["id"] for part in dumped]))
+    ).all())
+    # copies, the dumps are shared with every other request through the index
+    return [{**part, "quantity_on_hand": stock.get(part["id"], part["quantity_on_hand"])} for part in dumped]
+
+
+def database_prefix_search(session, prefix, limit=10):
+    # range scan on the lower(name) index, only matches from the start of the name
+    prefix = prefix.strip().lower()
+    if not prefix:
+        return []
+    lowered = func.lower(Inventory.name)
+    return session.scalars(
+        select(Inventory)
+        .where(lowered >= prefix, lowered < prefix + HIGH)
+        .order_by(func.length(Inventory.name), lowered)
+        .limit(limit)
+    ).all()
+
+
+# keep the index in step with committed writes made through the ORM
+
+def _current_index():
+    return tenant_state(current_app).get(EXTENSION_KEY) if has_app_context() else None
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _collect_inventory_changes(session, flush_context):
+    # snapshot now, the objects are expired by the time after_commit runs
+    index = _current_index()
+    if index is None:
+        return
+    changes = session.info.setdefault("inventory_changes", {})
+    for obj in session.new | session.dirty:
+        if isinstance(obj, Inventory):
+            changes[obj.id] = SimpleNamespace(**{c.key: getattr(obj, c.key) for c in Inventory.__table__.columns})
+    for obj in session.deleted:
+        if isinstance(obj, Inventory):
+            changes[obj.id] = None
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _apply_inventory_changes(session):
+    changes = session.info.pop("inventory_changes", None)
+    index = _current_index()
+    if not changes or index is None:
+        return
+    for part_id, change in changes.items():
+        if change is None:
+            index.remove(part_id)
+        else:
+            index.upsert(part_id, change)
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _drop_inventory_changes(session):
+    session.info.pop("inventory_changes", None)
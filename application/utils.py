@@ -1,11 +1,12 @@
 # File: application/utils.py
 
 from functools import wraps
-from flask import request, jsonify
+from flask import request, jsonify, g
 from jose import jwt, JWTError
 import datetime
 from werkzeug.security import generate_password_hash, check_password_hash
 from application.models import Customer, Mechanic
+from application.tenancy import current_tenant
 from config import Config
 
 SECRET_KEY = Config.SECRET_KEY
@@ -18,13 +19,17 @@ def hash_password(password):
 def verify_password(password, hashed):
     return check_password_hash(hashed, password)
 
-def encode_token(user_id, role="customer"):
+def encode_token(user_id, role="customer", tenant=None):
     payload = {
         "sub": str(user_id),  
         "role": role,
         "exp": datetime.datetime.utcnow() + datetime.timedelta(hours=24)
         #need this to make sure the tests dont break...again .utcnow()
     }
+    # ids only mean something inside one shop's database, see application/tenancy.py
+    tenant = tenant or current_tenant()
+    if tenant:
+        payload["tenant"] = tenant
     return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
 
 
@@ -35,7 +40,7 @@ def token_required(f):
         if not token:
             return jsonify({"message": "Missing token!"}), 401
         try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            data = _decode_token(token)
             # remove after testing 
             print("🧠 Decoded Token Payload (Customer):", data)
 
@@ -54,7 +59,7 @@ def mechanic_token_required(f):
         if not token:
             return jsonify({"message": "Missing token!"}), 401
         try:
-            data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            data = _decode_token(token)
             print("🧠 Decoded Token Payload (Mechanic):", data)
 
             if data.get("role") != "mechanic":
@@ -65,6 +70,15 @@ def mechanic_token_required(f):
             return jsonify({"message": "Invalid or expired token."}), 401
     return decorated
 
+def _decode_token(token):
+    # g lives on the app context, which /batch sub-requests share, so a batch decodes its JWT once
+    cached = g.get("decoded_token")
+    if cached and cached[0] == token:
+        return cached[1]
+    data = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    g.decoded_token = (token, data)
+    return data
+
 def _extract_token():
     auth_header = request.headers.get("Authorization")
     if auth_header and " " in auth_header:
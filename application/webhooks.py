@@ -0,0 +1,308 @@
+# File: application/webhooks.py
+# Ticket event webhooks through a transactional outbox. A status change writes one
+# outbox_event row per endpoint of the ticket's customer, on the same connection and in
+# the same transaction as the change: a rolled back change never notifies, and a committed
+# one is never lost. The request itself makes no network call.
+#
+# `flask webhooks dispatch` is the background process that delivers them. Each round it
+#   - leases endpoints that have pending events and aren't backing off (lease_until keeps
+#     a second dispatcher away, so this works on SQLite and Postgres alike)
+#   - POSTs up to WEBHOOK_BATCH_SIZE events per endpoint as one request, oldest first,
+#     several endpoints at a time on a thread pool, no DB connection held meanwhile. The
+#     host is resolved and vetted again for every POST and the connection goes to the
+#     vetted address, redirects are failures, so a URL can't be turned on internal services
+#     after it was registered
+#   - marks the batch delivered on a 2xx. Anything else backs the whole endpoint off
+#     (WEBHOOK_BACKOFF_BASE doubling per failure, capped at WEBHOOK_BACKOFF_MAX) so events
+#     stay in order, and gives up on events after WEBHOOK_MAX_ATTEMPTS.
+#
+# Bodies are signed like  X-Webhook-Signature: t=<unix time>,v1=<hex HMAC-SHA256 of
+# "<t>.<body>" keyed with the endpoint secret>. See verify_signature for the receiving end.
+
+import hashlib
+import hmac
+import http.client
+import ipaddress
+import json
+import math
+import random
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from datetime import datetime, timedelta
+import click
+from flask import current_app
+from flask.cli import AppGroup, with_appcontext
+from sqlalchemy import delete, event, inspect, insert, or_, select, update
+from application.extensions import db
+from application.models import OutboxEvent, ServiceTicket, WebhookEndpoint
+from application.tenancy import tenant_context, tenant_names
+
+webhooks_cli = AppGroup("webhooks", help="Deliver ticket event webhooks.")
+
+STATUS_CHANGED = "ticket.status_changed"
+SIGNATURE_HEADER = "X-Webhook-Signature"
+
+endpoints = WebhookEndpoint.__table__
+outbox = OutboxEvent.__table__
+pending = outbox.c.delivered_at.is_(None) & outbox.c.failed_at.is_(None)
+
+
+def record_status_change(connection, ticket_id, customer_id, old, new, version):
+    """Queues a status change for every endpoint of the customer, on the caller's connection."""
+    endpoint_ids = connection.execute(
+        select(endpoints.c.id).where(endpoints.c.customer_id == customer_id)
+    ).scalars().all()
+    if not endpoint_ids:
+        return
+    now = datetime.utcnow()
+    payload = json.dumps({
+        "ticket_id": ticket_id,
+        "customer_id": customer_id,
+        "from": old,
+        "to": new,
+        "version": version,
+        "occurred_at": now.isoformat(),
+    })
+    connection.execute(insert(outbox), [
+        {"endpoint_id": endpoint_id, "event_type": STATUS_CHANGED, "payload": payload, "created_at": now}
+        for endpoint_id in endpoint_ids
+    ])
+
+
+@event.listens_for(ServiceTicket, "after_update")
+def _ticket_status_changed(mapper, connection, target):
+    # touch() in application/concurrency.py marks status modified without changing it,
+    # that leaves nothing in history.deleted
+    history = inspect(target).attrs.status.history
+    if history.deleted and history.added and history.deleted[0] != history.added[0]:
+        record_status_change(connection, target.id, target.customer_id, history.deleted[0],
+                             history.added[0], target.version)
+
+
+class UnsafeURL(ValueError):
+    pass
+
+
+def resolve_target(url, allow_private=False):
+    """(parsed url, IP address to connect to). Raises UnsafeURL for anything the
+    dispatcher must not POST to: it runs inside our network, so loopback, link-local
+    (cloud metadata) and private addresses are off limits unless allow_private."""
+    parts = urlsplit(url or "")
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise UnsafeURL("url must be an http(s) URL.")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        addresses = [info[4][0] for info in socket.getaddrinfo(parts.hostname, port, proto=socket.IPPROTO_TCP)]
+    except (socket.gaierror, ValueError):
+        raise UnsafeURL("url's host doesn't resolve.")
+    if not allow_private and any(not ipaddress.ip_address(a.split("%")[0]).is_global for a in addresses):
+        raise UnsafeURL("url must point at a public address.")
+    return parts, addresses[0]
+
+
+class _PinnedHTTPConnection(http.client.HTTPConnection):
+    # connects to the address resolve_target vetted, a second DNS lookup could answer differently
+    def __init__(self, host, address, **kwargs):
+        super().__init__(host, **kwargs)
+        self.address = address
+
+    def connect(self):
+        self.sock = socket.create_connection((self.address, self.port), self.timeout)
+
+
+class _PinnedHTTPSConnection(http.client.HTTPSConnection):
+    def __init__(self, host, address, **kwargs):
+        super().__init__(host, context=ssl.create_default_context(), **kwargs)
+        self.address = address
+
+    def connect(self):
+        sock = socket.create_connection((self.address, self.port), self.timeout)
+        # certificate and SNI still checked against the host name
+        self.sock = self._context.wrap_socket(sock, server_hostname=self.host)
+
+
+def sign(secret, body, timestamp=None):
+    timestamp = int(time.time()) if timestamp is None else timestamp
+    digest = hmac.new(secret.encode("utf-8"), f"{timestamp}.".encode("utf-8") + body, hashlib.sha256)
+    return f"t={timestamp},v1={digest.hexdigest()}"
+
+
+def verify_signature(secret, header, body, tolerance=300):
+    """What a receiver does: recompute the HMAC and refuse stale timestamps (replays)."""
+    try:
+        parts = dict(item.split("=", 1) for item in header.split(","))
+        timestamp = int(parts["t"])
+    except (KeyError, ValueError):
+        return False
+    if abs(time.time() - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(sign(secret, body, timestamp), header)
+
+
+def backoff(app, failures):
+    delay = min(app.config.get("WEBHOOK_BACKOFF_BASE", 5) * 2 ** (failures - 1), app.config.get("WEBHOOK_BACKOFF_MAX", 3600))
+    # jitter so endpoints that failed together don't all come back in the same round
+    return timedelta(seconds=delay * random.uniform(0.8, 1.0))
+
+
+def dispatch_once(app, session):
+    """One round of deliveries for the current shop. Returns (delivered, failed) event counts."""
+    config = app.config
+    now = datetime.utcnow()
+    timeout = config.get("WEBHOOK_TIMEOUT", 10)
+
+    due = session.scalars(
+        select(endpoints.c.id)
+        .where(or_(endpoints.c.retry_at.is_(None), endpoints.c.retry_at <= now))
+        .where(or_(endpoints.c.lease_until.is_(None), endpoints.c.lease_until < now))
+        .where(select(outbox.c.id).where(outbox.c.endpoint_id == endpoints.c.id, pending).exists())
+        .order_by(endpoints.c.id)
+        .limit(config.get("WEBHOOK_ENDPOINTS_PER_ROUND", 50))
+    ).all()
+    # the lease has to outlast the whole round: the POSTs go out concurrency at a time and
+    # each may take up to timeout. An endpoint whose dispatcher died is picked up again
+    # once it runs out, and _post won't start a batch it can't finish before then.
+    concurrency = config.get("WEBHOOK_CONCURRENCY", 8)
+    lease_until = now + timedelta(seconds=(math.ceil(len(due) / concurrency) + 1) * timeout * 2)
+    claimed = []
+    for endpoint_id in due:
+        leased = session.execute(
+            update(endpoints)
+            .where(endpoints.c.id == endpoint_id)
+            .where(or_(endpoints.c.lease_until.is_(None), endpoints.c.lease_until < now))
+            .values(lease_until=lease_until)
+        )
+        if leased.rowcount:
+            claimed.append(endpoint_id)
+    session.commit()
+    if not claimed:
+        return 0, 0
+
+    batches = []
+    for endpoint_id in claimed:
+        endpoint = session.execute(select(endpoints).where(endpoints.c.id == endpoint_id)).one()
+        rows = session.execute(
+            select(outbox.c.id, outbox.c.event_type, outbox.c.payload, outbox.c.created_at, outbox.c.attempts)
+            .where(outbox.c.endpoint_id == endpoint_id, pending)
+            .order_by(outbox.c.id)
+            .limit(config.get("WEBHOOK_BATCH_SIZE", 100))
+        ).all()
+        batches.append((endpoint, rows))
+    session.rollback()  # don't sit in a read transaction while the requests are out
+
+    allow_private = config.get("WEBHOOK_ALLOW_PRIVATE_URLS", False)
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as pool:
+        errors = list(pool.map(
+            lambda batch: _post(batch[0], batch[1], timeout, lease_until, allow_private), batches
+        ))
+
+    delivered = failed = 0
+    now = datetime.utcnow()
+    max_attempts = config.get("WEBHOOK_MAX_ATTEMPTS", 10)
+    for (endpoint, rows), error in zip(batches, errors):
+        ids = [row.id for row in rows]
+        if error is LEASE_RAN_OUT:
+            continue  # nothing sent, the lease expires and the next round sends it
+        if error is None:
+            session.execute(update(outbox).where(outbox.c.id.in_(ids))
+                            .values(delivered_at=now, attempts=outbox.c.attempts + 1, last_error=None))
+            session.execute(update(endpoints).where(endpoints.c.id == endpoint.id)
+                            .values(failures=0, retry_at=None, lease_until=None))
+            delivered += len(ids)
+            continue
+        session.execute(update(outbox).where(outbox.c.id.in_(ids))
+                        .values(attempts=outbox.c.attempts + 1, last_error=error[:300]))
+        given_up = [row.id for row in rows if row.attempts + 1 >= max_attempts]
+        if given_up:
+            session.execute(update(outbox).where(outbox.c.id.in_(given_up)).values(failed_at=now))
+            failed += len(given_up)
+        session.execute(update(endpoints).where(endpoints.c.id == endpoint.id).values(
+            failures=endpoint.failures + 1, retry_at=now + backoff(app, endpoint.failures + 1), lease_until=None,
+        ))
+    session.commit()
+    return delivered, failed
+
+
+# _post's answer when the round took too long to start the batch safely
+LEASE_RAN_OUT = "lease ran out"
+
+
+def _post(endpoint, rows, timeout, lease_until, allow_private=False):
+    """None when the endpoint took the batch, otherwise why not."""
+    if datetime.utcnow() + timedelta(seconds=timeout * 2) > lease_until:
+        return LEASE_RAN_OUT
+    body = json.dumps({"events": [
+        {"id": row.id, "type": row.event_type, "created_at": row.created_at.isoformat(), "data": json.loads(row.payload)}
+        for row in rows
+    ]}).encode("utf-8")
+    # checked again on every delivery, the host's DNS may have changed since it was registered
+    try:
+        parts, address = resolve_target(endpoint.url, allow_private)
+    except UnsafeURL as e:
+        return str(e)
+    connection_class = _PinnedHTTPSConnection if parts.scheme == "https" else _PinnedHTTPConnection
+    connection = connection_class(parts.hostname, address, port=parts.port, timeout=timeout)
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    try:
+        connection.request("POST", path, body=body, headers={
+            "Content-Type": "application/json",
+            "User-Agent": "mechanic-api-webhooks",
+            SIGNATURE_HEADER: sign(endpoint.secret, body),
+        })
+        response = connection.getresponse()
+        response.read()
+    except (OSError, http.client.HTTPException) as e:
+        return f"{type(e).__name__}: {e}"
+    finally:
+        connection.close()
+    # redirects aren't followed, a 3xx could point anywhere
+    if 200 <= response.status < 300:
+        return None
+    return f"HTTP {response.status}"
+
+
+def dispatch_all_shops(app):
+    """One round for the primary database and every shop, returns summed (delivered, failed)."""
+    delivered = failed = 0
+    for tenant in [None] + tenant_names(app):
+        with tenant_context(tenant):
+            shop_delivered, shop_failed = dispatch_once(app, db.session)
+        delivered += shop_delivered
+        failed += shop_failed
+    return delivered, failed
+
+
+def purge_delivered(app, session):
+    cutoff = datetime.utcnow() - timedelta(days=app.config.get("WEBHOOK_RETENTION_DAYS", 7))
+    removed = session.execute(
+        delete(outbox).where(or_(outbox.c.delivered_at < cutoff, outbox.c.failed_at < cutoff))
+    ).rowcount
+    session.commit()
+    return removed
+
+
+@webhooks_cli.command("dispatch")
+@click.option("--once", is_flag=True, help="Run a single round and exit.")
+@with_appcontext
+def dispatch_command(once):
+    """Deliver pending webhook events, polling every WEBHOOK_POLL_INTERVAL seconds."""
+    app = current_app._get_current_object()
+    while True:
+        delivered, failed = dispatch_all_shops(app)
+        if delivered or failed or once:
+            click.echo(f"📬 Delivered {delivered} events, gave up on {failed}")
+        if once:
+            return
+        if not delivered:
+            time.sleep(app.config.get("WEBHOOK_POLL_INTERVAL", 2))
+
+
+@webhooks_cli.command("purge")
+@with_appcontext
+def purge_command():
+    """Delete delivered and abandoned events older than WEBHOOK_RETENTION_DAYS."""
+    removed = purge_delivered(current_app, db.session)
+    click.echo(f"🧹 Removed {removed} old webhook events")
@@ -0,0 +1,126 @@
+# File: application/workflow.py
+# Ticket status state machine and bulk status changes.
+#
+#   Pending      -> In Progress, Completed, Cancelled
+#   In Progress  -> Pending, On Hold, Completed, Cancelled
+#   On Hold      -> In Progress, Cancelled
+#   Completed    -> In Progress        (reopen)
+#   Cancelled    -> Pending            (reopen)
+#
+# A bulk change reads every ticket with one SELECT (id, status, version), checks each
+# transition in Python, then writes one UPDATE ... WHERE (id, version) IN (...) per target
+# status. The version guard from application/concurrency.py means a ticket that changed
+# between the SELECT and the UPDATE is simply not matched and comes back as a conflict.
+# The UPDATE skips the ORM, so the completion rollups and webhook events are written by
+# hand (callers should also invalidate the assignment heap).
+
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import case, select, tuple_, update
+from application.analytics import record_completion
+from application.models import ServiceTicket
+from application.webhooks import record_status_change
+
+PENDING = "Pending"
+IN_PROGRESS = "In Progress"
+ON_HOLD = "On Hold"
+COMPLETED = "Completed"
+CANCELLED = "Cancelled"
+
+TRANSITIONS = {
+    PENDING: {IN_PROGRESS, COMPLETED, CANCELLED},
+    IN_PROGRESS: {PENDING, ON_HOLD, COMPLETED, CANCELLED},
+    ON_HOLD: {IN_PROGRESS, CANCELLED},
+    COMPLETED: {IN_PROGRESS},
+    CANCELLED: {PENDING},
+}
+STATUSES = list(TRANSITIONS)
+CLOSED = (COMPLETED, CANCELLED)  # don't count towards a mechanic's workload
+
+tickets = ServiceTicket.__table__
+
+
+class InvalidTransition(Exception):
+    def __init__(self, current, target):
+        super().__init__(f"Can't move a ticket from '{current}' to '{target}'.")
+        self.current = current
+        self.target = target
+        self.allowed = sorted(TRANSITIONS.get(current, ()))
+
+
+def check_transition(current, target):
+    """Raises InvalidTransition unless target is a known status reachable from current.
+    Staying put is allowed, tickets from before the state machine count as Pending."""
+    current = current if current in TRANSITIONS else PENDING
+    if target != current and target not in TRANSITIONS[current]:
+        raise InvalidTransition(current, target)
+
+
+def bulk_transition(session, changes):
+    """Applies {ticket id: (target status, expected version or None)} in the caller's
+    transaction and returns one result dict per ticket, in the order given."""
+    rows = {
+        row.id: row for row in session.execute(
+            select(tickets.c.id, tickets.c.status, tickets.c.version, tickets.c.created_at, tickets.c.completed_at,
+                   tickets.c.customer_id)
+            .where(tickets.c.id.in_(list(changes)))
+        )
+    }
+
+    results, moves = {}, defaultdict(list)
+    for ticket_id, (target, expected_version) in changes.items():
+        row = rows.get(ticket_id)
+        if row is None:
+            results[ticket_id] = {"ticket_id": ticket_id, "result": "not_found"}
+            continue
+        result = {"ticket_id": ticket_id, "from": row.status, "to": target, "version": row.version}
+        results[ticket_id] = result
+        if expected_version is not None and expected_version != row.version:
+            result["result"] = "conflict"
+            continue
+        try:
+            check_transition(row.status, target)
+        except InvalidTransition as e:
+            result.update(result="invalid_transition", allowed=e.allowed)
+            continue
+        if row.status == target:
+            result["result"] = "unchanged"
+            continue
+        moves[target].append(row)
+
+    now = datetime.utcnow()
+    dialect = session.get_bind().dialect
+    for target, moving in moves.items():
+        if target == COMPLETED:
+            completed_at = now
+        else:
+            # reopening clears the stamp, everything else leaves it alone
+            completed_at = case((tickets.c.status == COMPLETED, None), else_=tickets.c.completed_at)
+        statement = (
+            update(tickets)
+            .where(tuple_(tickets.c.id, tickets.c.version).in_([(row.id, row.version) for row in moving]))
+            .values(status=target, version=tickets.c.version + 1, completed_at=completed_at)
+        )
+        if dialect.update_returning:
+            updated = set(session.execute(statement.returning(tickets.c.id)).scalars())
+        else:
+            session.execute(statement)
+            updated = {
+                ticket_id for ticket_id, version in session.execute(
+                    select(tickets.c.id, tickets.c.version).where(tickets.c.id.in_([row.id for row in moving]))
+                ) if version == rows[ticket_id].version + 1
+            }
+
+        connection = session.connection()
+        for row in moving:
+            result = results[row.id]
+            if row.id not in updated:
+                result["result"] = "conflict"
+                continue
+            result.update(result="updated", version=row.version + 1)
+            if row.completed_at is not None and row.status == COMPLETED:
+                record_completion(connection, row.created_at, row.completed_at, sign=-1)
+            if target == COMPLETED:
+                record_completion(connection, row.created_at, now)
+            record_status_change(connection, row.id, row.customer_id, row.status, target, row.version + 1)
+    return [results[ticket_id] for ticket_id in changes]
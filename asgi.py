@@ -0,0 +1,10 @@
+# File: asgi.py
+# ASGI entry point, the async sibling of flask_app.py
+# Run with: uvicorn asgi:app --workers 1 --port 5000
+from application.asgi import create_asgi_app
+from config import ProductionConfig
+from dotenv import load_dotenv
+
+load_dotenv()
+
+app = create_asgi_app(ProductionConfig)
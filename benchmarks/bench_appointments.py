@@ -0,0 +1,95 @@
+# File: benchmarks/bench_appointments.py
+# "Is mechanic X free between t1 and t2" over months of bookings.
+# "scan" checks every booking, "database" is the overlap query on
+# ix_appointment_mechanic_time, "index" is application/scheduling.py (bisect in memory).
+#
+#   python benchmarks/bench_appointments.py [mechanics] [days] [checks]
+
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from application.extensions import db
+from application.models import Appointment, Customer, Mechanic, ServiceTicket
+from application.scheduling import Schedule
+from bench_sqlite_concurrency import make_engine
+
+
+def bookings(mechanics, days, start):
+    # back to back hour-or-two jobs through an 8-18 day, with the odd gap
+    rng = random.Random(5)
+    rows = []
+    for mechanic_id in range(1, mechanics + 1):
+        for day in range(days):
+            t = start + timedelta(days=day, hours=8)
+            closes = t + timedelta(hours=10)
+            while True:
+                t += timedelta(minutes=rng.choice([0, 0, 30]))
+                end = t + timedelta(minutes=rng.choice([60, 90, 120]))
+                if end > closes:
+                    break
+                rows.append({"service_ticket_id": 1, "mechanic_id": mechanic_id, "starts_at": t, "ends_at": end})
+                t = end
+    return rows
+
+
+def main():
+    mechanics = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 180
+    checks = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+    start = datetime(2025, 1, 1)
+    rows = bookings(mechanics, days, start)
+    rng = random.Random(9)
+    probes = []
+    for _ in range(checks):
+        t1 = start + timedelta(days=rng.randrange(days), hours=rng.randrange(8, 17), minutes=rng.choice([0, 15, 30, 45]))
+        probes.append((rng.randint(1, mechanics), t1, t1 + timedelta(minutes=45)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "appointments.db"), tuned=True)
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(Customer), [{"id": 1, "name": "Bench", "email": "bench@example.com", "password": "x"}])
+            conn.execute(insert(Mechanic), [{"id": i, "name": f"Mech {i}", "password": "x"} for i in range(1, mechanics + 1)])
+            conn.execute(insert(ServiceTicket), [{"id": 1, "description": "job", "customer_id": 1}])
+            conn.execute(insert(Appointment), rows)
+        print(f"{mechanics} mechanics, {days} days, {len(rows)} bookings, {checks} checks")
+
+        def scan():
+            return [[r for r in rows if r["mechanic_id"] == m and r["starts_at"] < t2 and r["ends_at"] > t1] != []
+                    for m, t1, t2 in probes]
+
+        def database():
+            with Session(engine) as session:
+                return [session.scalar(select(Appointment.id).where(
+                    Appointment.mechanic_id == m, Appointment.starts_at < t2, Appointment.ends_at > t1).limit(1)) is not None
+                    for m, t1, t2 in probes]
+
+        schedule = Schedule()
+        with Session(engine) as session:
+            began = time.perf_counter()
+            schedule.load(session, start)
+            print(f"  index build: {time.perf_counter() - began:.3f}s")
+
+        def index():
+            return [schedule.conflicts(t1, t2, m) != [] for m, t1, t2 in probes]
+
+        answers = {}
+        for name, fn in (("scan", scan), ("database", database), ("index", index)):
+            began = time.perf_counter()
+            answers[name] = fn()
+            elapsed = time.perf_counter() - began
+            print(f"{name:>9}: {elapsed:.3f}s, {elapsed / checks * 1e6:.1f}us per check")
+        print("same answers:", answers["scan"] == answers["database"] == answers["index"])
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+# File: benchmarks/bench_asgi_vs_sync.py
+# Same database, same read-heavy endpoint, two deployments:
+#   sync:  gunicorn with N sync workers (one request per process at a time)
+#   asgi:  uvicorn with one worker running application/asgi.py
+# Reports throughput, p95 latency and total server RSS so they can be compared at a
+# similar memory budget. Needs gunicorn, uvicorn and aiosqlite, RSS comes from /proc (Linux).
+#
+#   python benchmarks/bench_asgi_vs_sync.py [concurrency] [seconds] [sync_workers]
+
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from application import create_app
+from application.extensions import db
+from application.models import Customer, Mechanic, ServiceTicket, Inventory
+from config import TestingConfig
+from procstats import server_rss_mb
+
+PATH = "/service-tickets/"
+
+
+def seed(db_uri, tickets=50):
+    class SeedConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = db_uri
+
+    app = create_app(SeedConfig)
+    with app.app_context():
+        db.create_all()
+        customer = Customer(name="Bench", email="bench@example.com", password="x")
+        mechanics = [Mechanic(name=f"Mech {i}", password="x") for i in range(5)]
+        parts = [Inventory(name=f"Part {i}", price=10 + i) for i in range(10)]
+        db.session.add_all([customer, *mechanics, *parts])
+        for i in range(tickets):
+            db.session.add(ServiceTicket(
+                description=f"ticket {i}", customer=customer,
+                mechanics=mechanics[i % 5:i % 5 + 2], parts=parts[i % 10:i % 10 + 3],
+            ))
+        db.session.commit()
+        db.engine.dispose()
+
+
+def start_server(kind, port, db_uri, sync_workers):
+    env = dict(os.environ, DATABASE_URI=db_uri, PYTHONPATH=ROOT)
+    if kind == "sync":
+        cmd = [sys.executable, "-m", "gunicorn", "-w", str(sync_workers), "-k", "sync",
+               "-b", f"127.0.0.1:{port}", "flask_app:app"]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--workers", "1",
+               "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/")
+            conn.getresponse().read()
+            return proc
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"{kind} server did not come up")
+
+
+def hammer(port, concurrency, seconds):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                conn.request("GET", PATH)
+                res = conn.getresponse()
+                res.read()
+                ok = res.status == 200
+            except (OSError, http.client.HTTPException):
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+                ok = False
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - started)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else float("nan")
+    return len(latencies) / seconds, p95, errors[0]
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 10
+    sync_workers = int(sys.argv[3]) if len(sys.argv) > 3 else 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_uri = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(db_uri)
+
+        for kind, port in (("sync", 5101), ("asgi", 5102)):
+            proc = start_server(kind, port, db_uri, sync_workers)
+            try:
+                rps, p95, errors = hammer(port, concurrency, seconds)
+                rss = server_rss_mb(proc.pid)
+            finally:
+                proc.terminate()
+                proc.wait()
+            print(f"{kind:>5}: {rps:.0f} req/s, p95 {p95:.0f} ms, {errors} errors, {rss:.0f} MB RSS total")
@@ -0,0 +1,84 @@
+# File: benchmarks/bench_assignment.py
+# Picking a mechanic for each new ticket. "query" counts everyone's open tickets with a
+# GROUP BY and takes the minimum for every ticket, "heap" is application/assignment.py
+# (built once, then a peek and a push per ticket).
+#
+#   python benchmarks/bench_assignment.py [mechanics] [open tickets] [new tickets]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from application.assignment import WorkloadHeap, open_workloads
+from application.extensions import db
+from application.models import Customer, Mechanic, ServiceTicket, service_mechanic
+from bench_sqlite_concurrency import make_engine
+
+
+def seed(engine, mechanics, tickets):
+    rng = random.Random(3)
+    with engine.begin() as conn:
+        conn.execute(insert(Customer), [{"id": 1, "name": "Bench", "email": "bench@example.com", "password": "x"}])
+        conn.execute(insert(Mechanic), [{"id": i, "name": f"Mech {i}", "password": "x"} for i in range(1, mechanics + 1)])
+        conn.execute(insert(ServiceTicket), [
+            {"id": i, "description": "job", "customer_id": 1, "status": rng.choice(["Pending", "In Progress", "Completed"])}
+            for i in range(1, tickets + 1)
+        ])
+        conn.execute(insert(service_mechanic), [
+            {"service_ticket_id": i, "mechanic_id": rng.randint(1, mechanics)} for i in range(1, tickets + 1)
+        ])
+
+
+def by_query(session, new_tickets):
+    picks = []
+    extra = {}
+    for _ in range(new_tickets):
+        load = open_workloads(session)
+        # stand in for the insert the real request would make
+        mechanic_id = min(load, key=lambda m: (load[m] + extra.get(m, 0), m))
+        extra[mechanic_id] = extra.get(mechanic_id, 0) + 1
+        picks.append(mechanic_id)
+    return picks
+
+
+def by_heap(session, new_tickets):
+    heap = WorkloadHeap()
+    heap.load(session)
+    picks = []
+    for _ in range(new_tickets):
+        mechanic_id = heap.least_loaded()
+        heap.adjust(mechanic_id, 1)
+        picks.append(mechanic_id)
+    return picks
+
+
+def main():
+    mechanics = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    tickets = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    new_tickets = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "assign.db"), tuned=True)
+        db.metadata.create_all(engine)
+        seed(engine, mechanics, tickets)
+        print(f"{mechanics} mechanics, {tickets} existing tickets, assigning {new_tickets}")
+
+        results = {}
+        for name, fn in (("query", by_query), ("heap", by_heap)):
+            with Session(engine) as session:
+                began = time.perf_counter()
+                results[name] = fn(session, new_tickets)
+                elapsed = time.perf_counter() - began
+            print(f"{name:>6}: {elapsed:.3f}s total, {elapsed / new_tickets * 1000:.3f}ms per ticket")
+        print("same picks:", results["query"] == results["heap"])
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
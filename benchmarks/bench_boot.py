@@ -0,0 +1,55 @@
+# File: benchmarks/bench_boot.py
+# Fresh interpreter each run: import time, create_app time and the first /apidocs spec
+# fetch, with SWAGGER_MODE=dynamic (docstring YAML parsed at runtime) vs static (prebuilt file).
+#
+#   python benchmarks/bench_boot.py [runs]
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+PROBE = """
+import json, time
+t0 = time.perf_counter()
+from application import create_app
+from config import TestingConfig
+t1 = time.perf_counter()
+app = create_app(TestingConfig)
+t2 = time.perf_counter()
+client = app.test_client()
+res = client.get("/apispec_1.json", follow_redirects=True)
+assert res.status_code == 200, res.status_code
+t3 = time.perf_counter()
+print("RESULT " + json.dumps({"import": t1 - t0, "create_app": t2 - t1, "first_spec": t3 - t2}))
+"""
+
+
+def probe(mode, spec_dir):
+    env = dict(os.environ, SWAGGER_MODE=mode, SWAGGER_SPEC_DIR=spec_dir, PYTHONPATH=ROOT)
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    line = next(line for line in out.stdout.splitlines() if line.startswith("RESULT "))
+    return json.loads(line[len("RESULT "):])
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with tempfile.TemporaryDirectory() as spec_dir:
+        env = dict(os.environ, SWAGGER_MODE="dynamic", SWAGGER_SPEC_DIR=spec_dir)
+        subprocess.run(
+            [sys.executable, "-m", "flask", "--app", "flask_app", "spec", "build"],
+            cwd=ROOT, env=env, check=True, capture_output=True,
+        )
+
+        for mode in ("dynamic", "static"):
+            results = [probe(mode, spec_dir) for _ in range(runs)]
+            summary = ", ".join(
+                f"{key} {statistics.median(r[key] for r in results) * 1000:.0f} ms"
+                for key in ("import", "create_app", "first_spec")
+            )
+            print(f"{mode:>8}: {summary}")
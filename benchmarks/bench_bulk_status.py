@@ -0,0 +1,72 @@
+# File: benchmarks/bench_bulk_status.py
+# Closing a shift's worth of tickets: one PUT /<id>/update-status per ticket vs a single
+# PUT /service-tickets/status, through the test client on a file database (tuned SQLite
+# profile), so every request pays for its token check, its queries and its commit.
+#
+#   python benchmarks/bench_bulk_status.py [tickets] [rounds]
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from application import create_app
+from application.extensions import db
+from application.models import Customer, ServiceTicket
+from application.utils import encode_token
+from config import TestingConfig, engine_options_for
+
+
+def make_app(path):
+    uri = f"sqlite:///{path}"
+
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = uri
+        SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(uri)
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.add(Customer(id=1, name="Bench", email="bench@example.com", password="x"))
+        db.session.commit()
+    return app
+
+
+def reset(app, count):
+    with app.app_context():
+        db.session.query(ServiceTicket).delete()
+        db.session.add_all([ServiceTicket(id=i, description="job", customer_id=1, status="In Progress")
+                            for i in range(1, count + 1)])
+        db.session.commit()
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    headers = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, "bulk.db"))
+        client = app.test_client()
+        timings = {"one by one": 0.0, "bulk": 0.0}
+        for _ in range(rounds):
+            reset(app, count)
+            started = time.perf_counter()
+            for ticket_id in range(1, count + 1):
+                client.put(f"/service-tickets/{ticket_id}/update-status", json={"status": "Completed"}, headers=headers)
+            timings["one by one"] += time.perf_counter() - started
+
+            reset(app, count)
+            started = time.perf_counter()
+            response = client.put("/service-tickets/status", json={"ticket_ids": list(range(1, count + 1)),
+                                                                   "status": "Completed"}, headers=headers)
+            timings["bulk"] += time.perf_counter() - started
+            assert response.get_json()["updated"] == count
+
+        print(f"closing {count} tickets, {rounds} rounds")
+        for name, total in timings.items():
+            print(f"{name:>11}: {total / rounds * 1000:.1f}ms")
+        with app.app_context():
+            db.engine.dispose()
@@ -0,0 +1,89 @@
+# File: benchmarks/bench_customer_similarity.py
+# Duplicate lookups as the customer table grows: the customer_trigram index vs loading
+# every customer and scoring them in Python (the O(N) way).
+#
+#   python benchmarks/bench_customer_similarity.py [sizes, comma separated] [lookups]
+
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import insert, select
+from application import create_app
+from application.extensions import db
+from application.models import Customer
+from application.similarity import find_similar, rebuild_trigrams, similarity, trigrams
+from config import TestingConfig
+
+# like a real customer base: a few dozen common first names, and surnames glued together
+# from syllables so there are lots of distinct ones. Lookup cost follows how many customers
+# share the query's rarest trigrams, a table full of "John Smith"s would be the worst case.
+FIRST = (
+    "james mary john patricia robert jennifer michael linda william elizabeth david barbara "
+    "richard susan joseph jessica thomas sarah charles karen wei priya maria jose ahmed fatima "
+    "daniel nancy matthew lisa anthony betty mark sandra paul ashley steven emily kevin donna"
+).split()
+SYLLABLES = "an ber ca del er fi gan har is jon kow lee mar nov ok pet quin ros sch tan ur vas wick xi yam zel ov ez sk".split()
+
+
+def people(count):
+    rng = random.Random(3)
+    for i in range(count):
+        first = rng.choice(FIRST)
+        last = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        # the suffix keeps names unique
+        yield {"name": f"{first} {last} {_letters(i)}", "email": f"{first}.{last}{i}@example.com", "password": "x"}
+
+
+def _letters(n):
+    out = ""
+    while True:
+        n, r = divmod(n, 26)
+        out += "bcdfghjklmnpqrstvwxzyaeiou"[r]
+        if not n:
+            return out
+
+
+def brute_force(session, name, threshold=0.5):
+    query = trigrams(name)
+    return [c for c in session.scalars(select(Customer)) if similarity(query, trigrams(c.name)) >= threshold]
+
+
+def timed(fn, names):
+    samples = []
+    for name in names:
+        started = time.perf_counter()
+        fn(name)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+if __name__ == "__main__":
+    sizes = [int(n) for n in (sys.argv[1] if len(sys.argv) > 1 else "1000,10000,100000").split(",")]
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    print(f"{'customers':>10} {'trigram ms':>12} {'full scan ms':>14}")
+    for size in sizes:
+        app = create_app(TestingConfig)
+        with app.app_context():
+            db.create_all()
+            rows = list(people(size))
+            db.session.execute(insert(Customer), rows)
+            rebuild_trigrams(db.session)
+
+            rng = random.Random(9)
+            # misspell existing names by dropping a letter
+            names = []
+            for row in rng.sample(rows, lookups):
+                i = rng.randrange(len(row["name"]))
+                names.append(row["name"][:i] + row["name"][i + 1:])
+
+            indexed = timed(lambda n: find_similar(db.session, name=n), names)
+            scanned = timed(lambda n: brute_force(db.session, n), names[:3])
+            print(f"{size:10,} {indexed:12.1f} {scanned:14.1f}")
+            db.session.remove()
+            db.drop_all()
@@ -0,0 +1,73 @@
+# File: benchmarks/bench_gunicorn_startup.py
+# Boots gunicorn twice, plain (every worker imports the app itself) and with the shipped
+# gunicorn.conf.py (preload + gc.freeze), and reports time-to-first-request plus Rss/Pss
+# per worker. Pss is where copy-on-write sharing shows up, Rss counts shared pages in full.
+#
+#   python benchmarks/bench_gunicorn_startup.py [workers]
+
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from procstats import process_tree, memory_mb
+
+PORT = 5103
+
+
+def boot(config_file, workers, db_uri):
+    env = dict(os.environ, DATABASE_URI=db_uri, WEB_CONCURRENCY=str(workers), PORT=str(PORT), PYTHONPATH=ROOT)
+    cmd = [sys.executable, "-m", "gunicorn", "-c", config_file, "-w", str(workers),
+           "-b", f"127.0.0.1:{PORT}", "flask_app:app"]
+
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    while True:
+        if time.perf_counter() - started > 60:
+            proc.kill()
+            raise RuntimeError("gunicorn did not come up")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=5)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                break
+        except OSError:
+            time.sleep(0.05)
+    first_request = time.perf_counter() - started
+
+    # let every worker finish booting and serve something so pages get touched
+    time.sleep(2)
+    for _ in range(workers * 4):
+        conn = http.client.HTTPConnection("127.0.0.1", PORT, timeout=5)
+        conn.request("GET", "/apispec_1.json")
+        conn.getresponse().read()
+
+    worker_pids = [pid for pid in process_tree(proc.pid) if pid != proc.pid]
+    stats = [memory_mb(pid) for pid in worker_pids]
+
+    proc.terminate()
+    proc.wait()
+    return first_request, stats
+
+
+if __name__ == "__main__":
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_uri = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        plain_config = os.path.join(tmp, "plain.conf.py")
+        open(plain_config, "w").close()
+
+        for label, config_file in (("plain", plain_config), ("profile", os.path.join(ROOT, "gunicorn.conf.py"))):
+            first_request, stats = boot(config_file, workers, db_uri)
+            rss = sum(s[0] for s in stats) / len(stats)
+            pss = sum(s[1] for s in stats) / len(stats)
+            print(
+                f"{label:>8}: first request after {first_request:.2f}s, "
+                f"{len(stats)} workers, {rss:.1f} MB Rss / {pss:.1f} MB Pss per worker"
+            )
@@ -0,0 +1,106 @@
+# File: benchmarks/bench_reorder_forecast.py
+# Reorder forecasting over two years of ticket_parts history.
+# "numpy" is application/forecasting.py (one GROUP BY part/day into a matrix, vectorized
+# stats). "python" is the loop it replaced: pull every ticket_parts row with its ticket
+# date, bucket per part per day in dicts, then average / std dev / season each part in Python.
+#
+#   python benchmarks/bench_reorder_forecast.py [parts] [tickets]
+
+import math
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from application.extensions import db
+from application.forecasting import forecast, usage_matrix
+from application.models import Customer, Inventory, ServiceTicket, ticket_parts
+from bench_sqlite_concurrency import make_engine
+
+HISTORY_DAYS, WINDOW, LEAD_TIME, Z = 730, 56, 7, 1.65
+
+
+def seed(engine, parts, tickets, today):
+    rng = random.Random(7)
+    # a few parts (oil filters, pads) go on most jobs, the long tail rarely moves
+    popularity = [1 / rank for rank in range(1, parts + 1)]
+    with engine.begin() as conn:
+        conn.execute(insert(Customer), [{"name": "Bench", "email": "bench@example.com", "password": "x"}])
+        conn.execute(insert(Inventory), [{"id": i, "name": f"Part {i}", "price": 10} for i in range(1, parts + 1)])
+        conn.execute(insert(ServiceTicket), [
+            {"id": i, "description": "job", "customer_id": 1,
+             "created_at": today - timedelta(days=rng.randrange(1, HISTORY_DAYS), hours=rng.randrange(24))}
+            for i in range(1, tickets + 1)
+        ])
+        conn.execute(insert(ticket_parts), [
+            {"service_ticket_id": t, "inventory_id": p, "quantity": rng.randint(1, 4)}
+            for t in range(1, tickets + 1)
+            for p in set(rng.choices(range(1, parts + 1), weights=popularity, k=3))
+        ])
+
+
+def numpy_version(session, start, today):
+    part_ids, usage = usage_matrix(session, start, today)
+    return dict(zip(part_ids.tolist(), forecast(usage, WINDOW, LEAD_TIME, Z)[3].tolist()))
+
+
+def python_version(session, start, today):
+    days = (today - start).days
+    daily = {}
+    for part_id, created_at, quantity in session.execute(
+        select(ticket_parts.c.inventory_id, ServiceTicket.created_at, ticket_parts.c.quantity)
+        .join(ServiceTicket, ServiceTicket.id == ticket_parts.c.service_ticket_id)
+        .where(ServiceTicket.created_at >= start, ServiceTicket.created_at < today)
+    ):
+        series = daily.setdefault(part_id, [0] * days)
+        series[(created_at.date() - start.date()).days] += quantity
+
+    reorder_points = {}
+    for part_id in session.scalars(select(Inventory.id)):
+        series = daily.get(part_id, [0] * days)
+        recent = series[-WINDOW:]
+        average = sum(recent) / len(recent)
+        spread = statistics.pstdev(recent)
+        seasonal = 1.0
+        yearly = sum(series[-365:]) / 365
+        if any(series[:-365]) and yearly > 0:
+            ahead = sum(series[-365:-365 + 28]) / 28
+            seasonal = min(max(ahead / yearly, 0.5), 2.0)
+        demand = average * seasonal
+        reorder_points[part_id] = demand * LEAD_TIME + Z * spread * math.sqrt(LEAD_TIME)
+    return reorder_points
+
+
+def main():
+    parts = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    tickets = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=HISTORY_DAYS)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "forecast.db"), tuned=True)
+        db.metadata.create_all(engine)
+        seed(engine, parts, tickets, today)
+        print(f"{parts} parts, {tickets} tickets, up to 3 parts each, {HISTORY_DAYS} days")
+
+        results = {}
+        for name, fn in (("python", python_version), ("numpy", numpy_version)):
+            with Session(engine) as session:
+                began = time.perf_counter()
+                results[name] = fn(session, start, today)
+                print(f"{name:>7}: {time.perf_counter() - began:.2f}s")
+
+        worst = max(abs(results["python"][p] - results["numpy"][p]) for p in results["python"])
+        print(f"largest reorder point difference: {worst:.2e}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
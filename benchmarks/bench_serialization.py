@@ -0,0 +1,64 @@
+# File: benchmarks/bench_serialization.py
+# Payload size and encode/decode time for tickets_schema output: JSON vs msgpack vs CBOR.
+# The schema dump itself is shared by all three, so it's done once and not timed.
+#
+#   python benchmarks/bench_serialization.py [tickets] [rounds]
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import cbor2
+import msgpack
+from application import create_app
+from application.extensions import db
+from application.models import Customer, Mechanic, ServiceTicket, Inventory
+from application.blueprints.service_tickets.schemas import tickets_schema
+from config import TestingConfig
+
+FORMATS = {
+    "json": (lambda data: json.dumps(data).encode("utf-8"), json.loads),
+    "msgpack": (lambda data: msgpack.packb(data, use_bin_type=True), lambda raw: msgpack.unpackb(raw, raw=False)),
+    "cbor": (cbor2.dumps, cbor2.loads),
+}
+
+
+def ticket_dump(count):
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        customers = [Customer(name=f"Customer {i}", email=f"c{i}@example.com", password="x") for i in range(20)]
+        mechanics = [Mechanic(name=f"Mechanic {i}", password="x") for i in range(10)]
+        parts = [Inventory(name=f"Part {i}", price=5 + i * 1.25) for i in range(40)]
+        db.session.add_all(customers + mechanics + parts)
+        for i in range(count):
+            db.session.add(ServiceTicket(
+                description=f"Ticket {i}: grinding noise when braking, check pads and rotors",
+                customer=customers[i % 20],
+                mechanics=mechanics[i % 10:i % 10 + 2],
+                parts=parts[i % 40:i % 40 + 3],
+            ))
+        db.session.commit()
+        return tickets_schema.dump(ServiceTicket.query.all())
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    data = ticket_dump(count)
+
+    for name, (encode, decode) in FORMATS.items():
+        started = time.perf_counter()
+        for _ in range(rounds):
+            raw = encode(data)
+        encode_ms = (time.perf_counter() - started) / rounds * 1000
+
+        started = time.perf_counter()
+        for _ in range(rounds):
+            assert decode(raw) == data
+        decode_ms = (time.perf_counter() - started) / rounds * 1000
+
+        print(f"{name:>8}: {len(raw) / 1024:8.1f} KB, encode {encode_ms:6.2f} ms, decode {decode_ms:6.2f} ms")
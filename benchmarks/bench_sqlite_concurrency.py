@@ -0,0 +1,92 @@
+# File: benchmarks/bench_sqlite_concurrency.py
+# Several processes (think gunicorn workers) sharing one SQLite file: half of them keep
+# inserting tickets, the other half run report-style scans over service_ticket.
+# Compares what we shipped before (no engine options, no pragmas) with the tuned
+# profile from config.py (WAL, synchronous=NORMAL, busy_timeout, mmap, sized pool).
+#
+#   python benchmarks/bench_sqlite_concurrency.py [processes] [seconds] [seed_tickets]
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, text
+from application.engine import init_sqlite_pragmas
+from application.extensions import db
+import application.models  # noqa: F401  registers the tables on db.metadata
+from config import Config, engine_options_for
+
+
+def make_engine(db_path, tuned):
+    uri = f"sqlite:///{db_path}"
+    engine = create_engine(uri, **(engine_options_for(uri, threads=1) if tuned else {}))
+    if tuned:
+        init_sqlite_pragmas(engine, Config.SQLITE_PRAGMAS)
+    return engine
+
+
+def worker(db_path, tuned, writer, seconds, results):
+    engine = make_engine(db_path, tuned)
+    ok = failed = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        try:
+            with engine.begin() as conn:
+                if writer:
+                    conn.execute(
+                        text("INSERT INTO service_ticket (description, status, customer_id) VALUES (:d, 'Pending', 1)"),
+                        {"d": "bench ticket"},
+                    )
+                else:
+                    conn.execute(text("SELECT status, COUNT(*), SUM(LENGTH(description)) FROM service_ticket GROUP BY status")).all()
+            ok += 1
+        except Exception:  # "database is locked" surfaces as OperationalError
+            failed += 1
+    results.put((writer, ok, failed))
+
+
+def run(tuned, processes, seconds, seed_tickets):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        engine = make_engine(db_path, tuned)
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(
+                text("INSERT INTO service_ticket (description, status, customer_id) VALUES (:d, :s, 1)"),
+                [{"d": f"seed ticket {i} grinding noise", "s": "Completed" if i % 3 else "Pending"} for i in range(seed_tickets)],
+            )
+        engine.dispose()
+
+        results = multiprocessing.Queue()
+        pool = [
+            multiprocessing.Process(target=worker, args=(db_path, tuned, n % 2 == 1, seconds, results))
+            for n in range(processes)
+        ]
+        for p in pool:
+            p.start()
+        totals = [results.get() for _ in pool]
+        for p in pool:
+            p.join()
+
+    writes = sum(t[1] for t in totals if t[0])
+    reads = sum(t[1] for t in totals if not t[0])
+    failed = sum(t[2] for t in totals)
+    return writes, reads, failed
+
+
+if __name__ == "__main__":
+    multiprocessing.set_start_method("fork")
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    seed_tickets = int(sys.argv[3]) if len(sys.argv) > 3 else 50000
+
+    for label, tuned in (("default", False), ("tuned", True)):
+        writes, reads, failed = run(tuned, processes, seconds, seed_tickets)
+        print(
+            f"{label:>8}: {writes / seconds:.0f} writes/s, {reads / seconds:.0f} reads/s, "
+            f"{failed} failed (database is locked)"
+        )
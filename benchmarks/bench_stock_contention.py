@@ -0,0 +1,106 @@
+# File: benchmarks/bench_stock_contention.py
+# Many processes reserving the same part at once, against the tuned SQLite profile.
+# "conditional" is application/stock.py (one UPDATE ... WHERE quantity_on_hand >= n),
+# "read-modify-write" is the obvious SELECT, check in Python, UPDATE to the new value.
+# The second one oversells once reservers interleave between their read and their write.
+#
+#   python benchmarks/bench_stock_contention.py [processes] [stock]
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session
+from application.extensions import db
+from application.models import Customer, Inventory, ServiceTicket, ticket_parts
+from application.stock import OutOfStock, reserve
+from bench_sqlite_concurrency import make_engine
+
+inventory = Inventory.__table__
+
+
+def conditional(session, ticket_id):
+    return reserve(session, ticket_id, 1, 1)
+
+
+def read_modify_write(session, ticket_id):
+    on_hand = session.scalar(select(inventory.c.quantity_on_hand).where(inventory.c.id == 1))
+    if on_hand < 1:
+        raise OutOfStock(1, 1)
+    time.sleep(0)  # let the scheduler interleave, like a real request doing other work here
+    session.execute(update(inventory).where(inventory.c.id == 1).values(quantity_on_hand=on_hand - 1))
+    booked = session.execute(
+        update(ticket_parts)
+        .where(ticket_parts.c.service_ticket_id == ticket_id, ticket_parts.c.inventory_id == 1)
+        .values(quantity=ticket_parts.c.quantity + 1)
+    )
+    if booked.rowcount == 0:
+        session.execute(insert(ticket_parts).values(service_ticket_id=ticket_id, inventory_id=1, quantity=1))
+    return True
+
+
+STRATEGIES = {"conditional": conditional, "read-modify-write": read_modify_write}
+
+
+def worker(db_path, strategy, ticket_id, results):
+    engine = make_engine(db_path, tuned=True)
+    reserved = errors = 0
+    while True:
+        try:
+            with Session(engine) as session, session.begin():
+                STRATEGIES[strategy](session, ticket_id)
+            reserved += 1
+        except OutOfStock:
+            break
+        except Exception:  # database is locked
+            errors += 1
+    results.put((reserved, errors))
+
+
+def run(strategy, processes, stock):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "stock.db")
+        engine = make_engine(db_path, tuned=True)
+        db.metadata.create_all(engine)
+        with engine.begin() as conn:
+            conn.execute(insert(Customer.__table__).values(name="Bench", email="bench@example.com", password="x"))
+            conn.execute(insert(ServiceTicket.__table__), [
+                {"description": f"ticket {i}", "status": "Pending", "customer_id": 1} for i in range(processes)
+            ])
+            conn.execute(insert(inventory).values(name="Alternator", price=250, quantity_on_hand=stock))
+
+        results = multiprocessing.Queue()
+        started = time.perf_counter()
+        pool = [multiprocessing.Process(target=worker, args=(db_path, strategy, i + 1, results)) for i in range(processes)]
+        for p in pool:
+            p.start()
+        totals = [results.get() for _ in pool]
+        for p in pool:
+            p.join()
+        elapsed = time.perf_counter() - started
+
+        with engine.connect() as conn:
+            booked = conn.scalar(select(func.sum(ticket_parts.c.quantity)))
+            left = conn.scalar(select(inventory.c.quantity_on_hand))
+        engine.dispose()
+
+    return elapsed, sum(t[0] for t in totals), sum(t[1] for t in totals), booked, left
+
+
+if __name__ == "__main__":
+    multiprocessing.set_start_method("fork")
+    processes = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    stock = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    print(f"{processes} reservers, {stock} units on the shelf")
+    for strategy in STRATEGIES:
+        elapsed, reserved, errors, booked, left = run(strategy, processes, stock)
+        print(
+            f"{strategy:>18}: {reserved / elapsed:6.0f} reservations/s, {booked} booked on tickets, "
+            f"{left} left on shelf, oversold by {max(booked - stock, 0)}, {errors} lock errors"
+        )
@@ -0,0 +1,75 @@
+# File: benchmarks/bench_tenant_shards.py
+# Write throughput with every shop in one database vs one SQLite shard per shop
+# (application/tenancy.py). Each process is a worker serving one shop: it creates a ticket
+# and books a part on it in one transaction. The transaction also waits hold_ms while it
+# holds the write lock, standing in for the rest of a real request's transaction (reads,
+# validation, round trips to a networked database). With one database every shop queues
+# for the same lock. With shards, only workers for the same shop do.
+#
+#   python benchmarks/bench_tenant_shards.py [workers] [seconds] [hold_ms] [max_shards]
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import text
+from application.extensions import db
+from bench_sqlite_concurrency import make_engine
+
+
+def worker(db_path, seconds, hold, results):
+    engine = make_engine(db_path, tuned=True)
+    done = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        with engine.begin() as conn:
+            ticket_id = conn.execute(
+                text("INSERT INTO service_ticket (description, status, customer_id, version) "
+                     "VALUES ('bench ticket', 'Pending', 1, 1) RETURNING id")
+            ).scalar_one()
+            conn.execute(text("INSERT INTO ticket_parts (service_ticket_id, inventory_id, quantity) VALUES (:t, 1, 1)"),
+                         {"t": ticket_id})
+            time.sleep(hold)
+        done += 1
+    engine.dispose()
+    results.put(done)
+
+
+def run(shards, workers, seconds, hold):
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [os.path.join(tmp, f"shop_{i}.db") for i in range(shards)]
+        for path in paths:
+            engine = make_engine(path, tuned=True)
+            db.metadata.create_all(engine)
+            engine.dispose()
+
+        results = multiprocessing.Queue()
+        # workers spread over the shops evenly, same number of workers in every run
+        pool = [multiprocessing.Process(target=worker, args=(paths[n % shards], seconds, hold, results))
+                for n in range(workers)]
+        for p in pool:
+            p.start()
+        total = sum(results.get() for _ in pool)
+        for p in pool:
+            p.join()
+    return total / seconds
+
+
+if __name__ == "__main__":
+    multiprocessing.set_start_method("fork")
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    hold = (float(sys.argv[3]) if len(sys.argv) > 3 else 2) / 1000
+    max_shards = int(sys.argv[4]) if len(sys.argv) > 4 else 8
+
+    baseline = None
+    shards = 1
+    while shards <= min(max_shards, workers):
+        rate = run(shards, workers, seconds, hold)
+        baseline = baseline or rate
+        print(f"{shards:>3} shard(s): {rate:7.0f} tickets/s  ({rate / baseline:.2f}x, ideal {shards}x)")
+        shards *= 2
@@ -0,0 +1,104 @@
+# File: benchmarks/bench_ticket_search.py
+# Ticket description search at scale: LIKE '%word%' scans vs the FTS5 index from
+# application/fulltext.py, on a SQLite file with a lot of generated tickets.
+# Also reports what the triggers cost on bulk inserts. Words that are in most tickets
+# go past SEARCH_RANK_LIMIT and come back newest-first, which skips bm25 scoring.
+#
+#   python benchmarks/bench_ticket_search.py [tickets] [rounds]
+
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+from application.extensions import db
+from application.fulltext import FTS_TABLE, search_tickets
+from application.models import Customer, ServiceTicket
+from config import Config
+
+WORDS = (
+    "brake grinding noise squeal pads rotors oil change leak filter tire rotation alignment "
+    "battery dead starter alternator coolant overheating radiator hose belt transmission slipping "
+    "clutch engine misfire spark plug check light exhaust rattle suspension shock strut wiper "
+    "headlight bulb door lock window regulator ac compressor heater blower fuse steering pump"
+).split()
+# real ticket text is zipf-ish: a few words everywhere, most words rare
+WEIGHTS = [1 / rank for rank in range(1, len(WORDS) + 1)]
+QUERIES = ["brake", "grinding brake", "coolant leak", "transmission slipping", "compressor", "steering pump"]
+
+
+def seed(engine, count):
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(Customer.__table__), {"name": "Bench", "email": "bench@example.com", "password": "x"})
+    started = time.perf_counter()
+    batch = 50_000
+    for start in range(0, count, batch):
+        rows = [
+            {"description": " ".join(rng.choices(WORDS, weights=WEIGHTS, k=rng.randint(4, 12))), "status": "Pending", "customer_id": 1}
+            for _ in range(min(batch, count - start))
+        ]
+        with engine.begin() as conn:
+            conn.execute(insert(ServiceTicket.__table__), rows)
+    return time.perf_counter() - started
+
+
+def like_search(session, q, per_page=10):
+    conditions = [ServiceTicket.description.like(f"%{term}%") for term in q.split()]
+    total = session.scalar(select(func.count()).select_from(ServiceTicket).where(*conditions))
+    session.scalars(select(ServiceTicket).where(*conditions).order_by(ServiceTicket.id.desc()).limit(per_page)).all()
+    return total
+
+
+def fts_search(session, q, per_page=10):
+    return search_tickets(session, q, per_page=per_page, rank_limit=Config.SEARCH_RANK_LIMIT)[1]
+
+
+def timed(fn, engine, rounds):
+    timings = {}
+    for q in QUERIES:
+        samples = []
+        for _ in range(rounds):
+            with Session(engine) as session:
+                started = time.perf_counter()
+                hits = fn(session, q)
+                samples.append((time.perf_counter() - started) * 1000)
+        timings[q] = (statistics.median(samples), hits)
+    return timings
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        plain = create_engine(f"sqlite:///{os.path.join(tmp, 'plain.db')}")
+        indexed = create_engine(f"sqlite:///{os.path.join(tmp, 'fts.db')}")
+        db.metadata.create_all(indexed)
+        db.metadata.create_all(plain)
+        # the "before" database: same schema, no fts table or triggers
+        with plain.begin() as conn:
+            for suffix in ("ai", "ad", "au"):
+                conn.exec_driver_sql(f"DROP TRIGGER {FTS_TABLE}_{suffix}")
+            conn.exec_driver_sql(f"DROP TABLE {FTS_TABLE}")
+
+        print(f"Seeding {count:,} tickets twice...")
+        plain_seconds = seed(plain, count)
+        fts_seconds = seed(indexed, count)
+        print(f"  insert without index: {count / plain_seconds:,.0f} rows/s")
+        print(f"  insert with FTS5 triggers: {count / fts_seconds:,.0f} rows/s")
+
+        like = timed(like_search, plain, rounds)
+        fts = timed(fts_search, indexed, rounds)
+
+        print(f"\n{'query':32} {'LIKE ms':>10} {'FTS5 ms':>10} {'speedup':>9} {'LIKE hits':>10} {'FTS hits':>10}")
+        for q in QUERIES:
+            like_ms, like_hits = like[q]
+            fts_ms, fts_hits = fts[q]
+            print(f"{q:32} {like_ms:10.1f} {fts_ms:10.1f} {like_ms / fts_ms:8.1f}x {like_hits:10,} {fts_hits:10,}")
@@ -0,0 +1,92 @@
+# File: benchmarks/bench_typeahead.py
+# /inventory/search lookups on a big generated catalogue: the in-memory prefix index vs
+# the lower(name) range scan it falls back to vs a LIKE '%word%' scan.
+#
+#   python benchmarks/bench_typeahead.py [parts] [lookups]
+
+import os
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import insert, select
+from application import create_app
+from application.extensions import db
+from application.models import Inventory
+from application.typeahead import PrefixIndex, database_prefix_search
+from application.blueprints.inventory.routes import inventory_schema
+from config import TestingConfig
+
+POSITIONS = "front rear left right upper lower inner outer".split()
+PARTS = (
+    "brake pad rotor caliper hose fluid oil filter air cabin fuel spark plug wire coil belt "
+    "tensioner pulley water pump thermostat radiator cap gasket seal bearing hub axle cv joint "
+    "tie rod end ball joint control arm bushing strut shock spring mount sway bar link wiper blade"
+).split()
+BRANDS = "bosch acdelco denso ngk motorcraft mopar brembo monroe moog gates dorman".split()
+
+
+def catalogue(count):
+    rng = random.Random(7)
+    for i in range(count):
+        words = [rng.choice(BRANDS), rng.choice(POSITIONS), *rng.sample(PARTS, 2), f"{rng.randint(100, 99999)}"]
+        yield {"name": " ".join(words).title(), "price": round(rng.uniform(2, 400), 2)}
+
+
+def timed(fn, prefixes):
+    samples = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        fn(prefix)
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    app = create_app(TestingConfig)
+    with app.app_context():
+        db.create_all()
+        db.session.execute(insert(Inventory), list(catalogue(count)))
+        db.session.commit()
+
+        started = time.perf_counter()
+        index = PrefixIndex(inventory_schema.dump)
+        index.load(db.session)
+        build_s = time.perf_counter() - started
+
+        tracemalloc.start()
+        measured = PrefixIndex(inventory_schema.dump)
+        measured.load(db.session)
+        index_mb = tracemalloc.get_traced_memory()[0] / 1024 / 1024
+        tracemalloc.stop()
+        del measured
+        print(f"{count:,} parts, index built in {build_s:.2f}s, ~{index_mb:.0f} MB")
+
+        rng = random.Random(1)
+        prefixes = [rng.choice(BRANDS + PARTS)[: rng.randint(2, 6)] for _ in range(lookups)]
+
+        def like_scan(prefix):
+            db.session.scalars(select(Inventory).where(Inventory.name.ilike(f"%{prefix}%")).limit(10)).all()
+
+        def cold_lookup(prefix):
+            index._memo.clear()
+            index.search(prefix, 10)
+
+        results = {
+            "prefix index (cold)": timed(cold_lookup, prefixes),
+            "prefix index (memo)": timed(lambda p: index.search(p, 10), prefixes),
+            "lower(name) range scan": timed(lambda p: database_prefix_search(db.session, p, 10), prefixes),
+            "LIKE '%...%'": timed(like_scan, prefixes),
+        }
+
+    print(f"\n{'lookup':24} {'p50 us':>10} {'p99 us':>10}")
+    for name, (p50, p99) in results.items():
+        print(f"{name:24} {p50:10.0f} {p99:10.0f}")
@@ -0,0 +1,29 @@
+# File: benchmarks/procstats.py
+# Tiny /proc readers for the server benchmarks (Linux only, saves pulling in psutil).
+
+import os
+
+
+def process_tree(pid):
+    pids = [pid]
+    for tid in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{tid}/children") as f:
+            for child in f.read().split():
+                pids.extend(process_tree(int(child)))
+    return pids
+
+
+def memory_mb(pid):
+    """Rss and Pss of a process in MB. Pss splits shared (copy-on-write) pages between the
+    processes sharing them, so it's the honest number for forked workers."""
+    stats = {"Rss": 0.0, "Pss": 0.0}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key = line.split(":")[0]
+            if key in stats:
+                stats[key] = int(line.split()[1]) / 1024
+    return stats["Rss"], stats["Pss"]
+
+
+def server_rss_mb(pid):
+    return sum(memory_mb(p)[0] for p in process_tree(pid))
@@ -1,17 +1,187 @@
 # File: config.py
 import os
 
+# gunicorn sizing, the DB pool is sized off these so every thread can hold a connection
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 2))
+GUNICORN_THREADS = int(os.environ.get("GUNICORN_THREADS", 4))
+# postgres max_connections we're allowed to eat across all workers (leave room for psql/migrations)
+DB_MAX_CONNECTIONS = int(os.environ.get("DB_MAX_CONNECTIONS", 80))
+DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 15000))
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", 5000))
+
+
+def engine_options_for(uri, threads=GUNICORN_THREADS, workers=WEB_CONCURRENCY):
+    """SQLALCHEMY_ENGINE_OPTIONS profile for the backend in the database URI."""
+    if uri.startswith("sqlite"):
+        options = {"connect_args": {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+        if ":memory:" not in uri:
+            # keep a connection per thread, overflow connections get closed on checkin and
+            # reopening them means redoing every pragma (flask-sqlalchemy uses StaticPool for :memory:)
+            options.update(pool_size=threads, max_overflow=threads)
+        # WAL, synchronous etc. are set per connection, see SQLITE_PRAGMAS
+        return options
+
+    # one connection per thread, overflow only up to what the DB can take for all workers
+    per_worker = max(DB_MAX_CONNECTIONS // workers, 1)
+    pool_size = min(threads, per_worker)
+    options = {
+        "pool_size": pool_size,
+        "max_overflow": max(per_worker - pool_size, 0),
+        "pool_timeout": 10,
+        "pool_pre_ping": True,   # render/pgbouncer drop idle connections on us
+        "pool_recycle": 1800,
+    }
+    if uri.startswith("postgres"):
+        options["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return options
+
+
+def replica_binds(uris):
+    """SQLALCHEMY_BINDS entries for read replicas, keys starting with "replica" get routed reads."""
+    uris = [uri.strip() for uri in uris.split(",") if uri.strip()]
+    return {f"replica_{i}": {"url": uri, **engine_options_for(uri)} for i, uri in enumerate(uris)}
+
+
+def tenant_binds(spec):
+    """SQLALCHEMY_BINDS entries for shop shards from "name=uri" pairs, see application/tenancy.py.
+    A postgres uri can end in #schema to keep several shops in one database."""
+    binds = {}
+    for entry in filter(None, (entry.strip() for entry in spec.split(","))):
+        name, uri = (part.strip() for part in entry.split("=", 1))
+        uri, _, schema = uri.partition("#")
+        options = engine_options_for(uri)
+        if schema:
+            connect_args = dict(options.get("connect_args", {}))
+            connect_args["options"] = f"{connect_args.get('options', '')} -c search_path={schema}".strip()
+            options["connect_args"] = connect_args
+        binds[f"tenant_{name}"] = {"url": uri, **options}
+    return binds
+
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "default-secret-key")
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URI", "sqlite:///mechanic_shop.db")
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(SQLALCHEMY_DATABASE_URI)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # comma separated, e.g. DATABASE_REPLICA_URIS=postgresql://replica1/shop,postgresql://replica2/shop
+    # one shard per shop, e.g. DATABASE_TENANT_URIS=north=sqlite:///north.db,south=postgresql://db/shops#south
+    SQLALCHEMY_BINDS = {
+        **replica_binds(os.environ.get("DATABASE_REPLICA_URIS", "")),
+        **tenant_binds(os.environ.get("DATABASE_TENANT_URIS", "")),
+    }
+    TENANT_HOSTS = {}  # host name -> shop, for hosts that don't start with the shop's name
+    REPLICA_HEALTH_CHECK_INTERVAL = 30  # seconds between SELECT 1 checks per replica
+    REPLICA_PIN_SECONDS = 5  # how long a client reads from the primary after writing
     CACHE_TYPE = "SimpleCache"
+    SWAGGER_MODE = os.environ.get("SWAGGER_MODE", "dynamic")  # dynamic | static | off
+    SWAGGER_SPEC_DIR = os.environ.get("SWAGGER_SPEC_DIR")  # defaults to application/static/apispec
+
+    # response compression, see application/compression.py
+    COMPRESS_ENABLED = True
+    COMPRESS_MIN_SIZE = 500  # bytes, below this gzip costs more than it saves
+    COMPRESS_LEVEL = 6  # gzip 1-9
+    COMPRESS_BR_LEVEL = 4  # brotli 0-11, past ~5 it gets slow for dynamic responses
+    COMPRESS_MIMETYPES = [
+        "application/json", "application/msgpack", "application/cbor",
+        "text/html", "text/css", "text/plain", "application/javascript",
+    ]
+    # endpoints whose bodies repeat (they're cached anyway), keep their compressed bytes around too
+    COMPRESS_CACHE_ENDPOINTS = ["inventory.get_all_parts"]
+    COMPRESS_CACHE_TIMEOUT = 60
+
+    # POST /batch limits
+    BATCH_MAX_REQUESTS = 20
+    BATCH_MAX_BODY_BYTES = 64 * 1024  # per sub-request
+
+    # Idempotency-Key replays
+    IDEMPOTENCY_ENABLED = True
+    IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+    IDEMPOTENCY_LOCK_TIMEOUT = 10  # how long a retry waits on an in-flight original
+    IDEMPOTENCY_PENDING_SECONDS = 60  # an original still running after this is presumed dead, a retry takes over
+    IDEMPOTENCY_POLL_INTERVAL = 0.05
+
+    # /service-tickets/search orders by relevance up to this many hits, newest first beyond it
+    SEARCH_RANK_LIMIT = 5000
+
+    # /inventory/search: in-memory prefix index, reloaded from the DB after this many seconds
+    # so writes from other workers show up. Off means every lookup hits the lower(name) index.
+    INVENTORY_SEARCH_INDEX = True
+    INVENTORY_INDEX_MAX_AGE = 60
+
+    # customer duplicate detection (trigram similarity, 0-1)
+    CUSTOMER_SIMILARITY_THRESHOLD = 0.5
+    # registration responses list likely duplicates in an X-Possible-Duplicates header
+    CUSTOMER_DUPLICATE_WARNING = True
+
+    # /inventory/reorder-suggestions, see application/forecasting.py
+    REORDER_HISTORY_DAYS = 730  # usage history pulled into the forecast
+    REORDER_WINDOW_DAYS = 56  # moving average / std dev window
+    REORDER_LEAD_TIME_DAYS = 7  # supplier lead time
+    REORDER_SERVICE_Z = 1.65  # safety stock z-score, 1.65 ~ 95% of lead times without a stockout
+    REORDER_COVER_DAYS = 30  # orders top stock up to the reorder point plus this many days of demand
+
+    # new tickets go to the mechanic with the fewest open tickets, see application/assignment.py
+    AUTO_ASSIGN_MECHANICS = True
+    ASSIGNMENT_HEAP_MAX_AGE = 300  # seconds before the workload heap is rebuilt from the DB
+
+    # appointments, see application/scheduling.py
+    APPOINTMENT_OPEN_HOUR = 8  # next-free slots stay inside these hours (UTC)
+    APPOINTMENT_CLOSE_HOUR = 18
+    APPOINTMENT_SEARCH_DAYS = 30  # how far ahead /appointments/next-free looks
+    APPOINTMENT_INDEX_MAX_AGE = 300  # seconds before the in-memory calendar is rebuilt from the DB
+
+    # PUT /service-tickets/status
+    BULK_STATUS_MAX_TICKETS = 200
+
+    # `flask archive run`, see application/archive.py
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", 365))  # completed longer ago than this moves to the archive
+    ARCHIVE_BATCH_SIZE = 500  # tickets per transaction
+
+    # ticket event webhooks, see application/webhooks.py
+    WEBHOOK_MAX_PER_CUSTOMER = 5
+    WEBHOOK_ALLOW_PRIVATE_URLS = False  # refuse URLs that resolve to loopback/private addresses
+    WEBHOOK_BATCH_SIZE = 100  # events per POST
+    WEBHOOK_CONCURRENCY = 8  # endpoints delivered to at the same time
+    WEBHOOK_ENDPOINTS_PER_ROUND = 50
+    WEBHOOK_TIMEOUT = 10  # seconds per POST
+    WEBHOOK_BACKOFF_BASE = 5  # seconds after the first failure, doubling from there
+    WEBHOOK_BACKOFF_MAX = 3600
+    WEBHOOK_MAX_ATTEMPTS = 10  # then the event is given up on
+    WEBHOOK_POLL_INTERVAL = 2  # seconds the dispatcher sleeps when there was nothing to send
+    WEBHOOK_RETENTION_DAYS = 7  # `flask webhooks purge` drops finished events older than this
+
+    # background jobs run by `flask worker`, see application/jobs.py
+    JOB_WORKER_PROCESSES = int(os.environ.get("JOB_WORKER_PROCESSES", os.cpu_count() or 1))
+    JOB_CONCURRENCY = {}  # per job type overrides of the limits in jobs.py, e.g. {"tickets.export": 4}
+    JOB_LEASE_SECONDS = 60  # a running job whose worker stopped renewing it for this long is requeued
+    JOB_MAX_ATTEMPTS = 3  # workers a job may lose before it's failed
+    JOB_POLL_INTERVAL = 1  # seconds an idle worker waits before looking again
+    JOB_RETENTION_DAYS = 7  # the worker deletes finished jobs (and their results) older than this
+
+    # applied on every new SQLite connection, ignored for other backends
+    # WAL lets readers run alongside the writer, busy_timeout makes writers queue instead of "database is locked"
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "mmap_size": 256 * 1024 * 1024,
+    }
+
+    # slow query log (off unless asked for), see application/slow_queries.py
+    SLOW_QUERY_LOG_ENABLED = os.environ.get("SLOW_QUERY_LOG_ENABLED", "false").lower() == "true"
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get("SLOW_QUERY_THRESHOLD_MS", 200))
+    SLOW_QUERY_LOG_PATH = os.environ.get("SLOW_QUERY_LOG_PATH", "slow_queries.db")
+    SLOW_QUERY_LOG_MAX_ROWS = 10000
 
 class ProductionConfig(Config):
     DEBUG = False
+    # serve the prebuilt spec from `flask spec build` instead of parsing docstrings in every worker
+    SWAGGER_MODE = os.environ.get("SWAGGER_MODE", "static")
     print(">>> Using ProductionConfig")
 
 class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(SQLALCHEMY_DATABASE_URI)
+    SQLALCHEMY_BINDS = {}
     SECRET_KEY = "test-secret-key"
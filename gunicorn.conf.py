@@ -0,0 +1,68 @@
+# File: gunicorn.conf.py
+# Production gunicorn profile, picked up automatically when you run `gunicorn` from the repo root.
+#
+# Sizing:
+#   gthread (default): WEB_CONCURRENCY workers x GUNICORN_THREADS threads. Start with
+#     workers = number of CPUs, threads = 4. The DB pool in config.py gives every thread
+#     its own connection, so workers x threads has to fit under DB_MAX_CONNECTIONS.
+#   gevent: GUNICORN_WORKER_CLASS=gevent, needs `pip install -r requirements-gevent.txt`.
+#     post_worker_init patches psycopg2 with psycogreen, without it every query would block
+#     the whole worker. One or two workers per CPU, GUNICORN_WORKER_CONNECTIONS greenlets
+#     each. Set GUNICORN_THREADS to how many DB connections a worker may hold, greenlets
+#     queue on the pool past that.
+#
+# Memory: the app is imported once in the master (preload_app) and the workers fork from
+# it. gc is kept off until the fork and everything alive at that point is frozen, so the
+# collector never touches (and copies) the pages the workers share with the master.
+
+import gc
+import os
+from config import WEB_CONCURRENCY, GUNICORN_THREADS
+
+wsgi_app = "flask_app:app"
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+preload_app = True
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+workers = WEB_CONCURRENCY
+threads = GUNICORN_THREADS
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 100))
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+# recycle workers now and then so slow leaks don't pile up, jitter stops them restarting together
+max_requests = 2000
+max_requests_jitter = 200
+
+accesslog = "-"
+errorlog = "-"
+
+# the master only imports the app and babysits workers, it can live without gc
+gc.disable()
+
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
+
+    # connections opened in the master (create_app, seeding...) must not be shared across
+    # processes, drop them without closing so the master's sockets stay intact
+    from application.extensions import db
+
+    app = server.app.wsgi()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    # gevent has monkey-patched the worker by now, psycopg2 is C and needs its own hook
+    # to yield to other greenlets while it waits on Postgres
+    if worker_class == "gevent":
+        from psycogreen.gevent import patch_psycopg
+
+        patch_psycopg()
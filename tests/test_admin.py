@@ -0,0 +1,92 @@
+# File: tests/test_admin.py
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+from sqlalchemy import text
+from application import create_app
+from application.extensions import db
+from application.models import Customer
+from application.slow_queries import _explain, redact_parameters, slow_query_log_path, top_offenders
+from application.utils import hash_password, encode_token
+from config import TestingConfig
+
+
+class SlowQueryConfig(TestingConfig):
+    SLOW_QUERY_LOG_ENABLED = True
+    SLOW_QUERY_THRESHOLD_MS = 0  # log everything so the test doesn't depend on timing
+
+
+class SlowQueryLogTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        SlowQueryConfig.SLOW_QUERY_LOG_PATH = os.path.join(self.tmpdir.name, "slow.db")
+        self.app = create_app(SlowQueryConfig)
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add(Customer(name="Slowpoke", email="slow@example.com", password=hash_password("pass123")))
+            db.session.commit()
+
+        self.headers = {"Authorization": f"Bearer {encode_token('1', role='mechanic')}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        self.tmpdir.cleanup()
+
+    def test_slow_queries_are_logged_with_endpoint_and_plan(self):
+        self.client.get("/customers/")
+        # threshold 0 logs all the create_all DDL too, ask for enough rows to get past it
+        response = self.client.get("/admin/slow-queries?limit=100", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        entries = [e for e in response.get_json() if "FROM customer" in e["statement"]]
+        self.assertTrue(entries)
+        self.assertIn("customers.get_all_customers", entries[0]["endpoints"])
+        self.assertIn("customer", entries[0]["plan"].lower())
+
+    def test_queries_with_ctes_get_a_plan(self):
+        with self.app.app_context():
+            db.session.execute(text("WITH named AS (SELECT id FROM customer) SELECT id FROM named"))
+        entries = [e for e in top_offenders(slow_query_log_path(self.app), 100) if e["statement"].startswith("WITH")]
+        self.assertIn("customer", entries[0]["plan"].lower())
+
+    def test_failed_explain_leaves_the_transaction_usable(self):
+        # Postgres stand-in: the EXPLAIN fails, which would abort the request's transaction
+        conn = mock.MagicMock()
+        conn.dialect.name = "postgresql"
+        conn.connection.dbapi_connection.autocommit = False
+        cursor = conn.connection.cursor.return_value
+
+        def execute(sql, parameters=None):
+            if sql.startswith("EXPLAIN"):
+                raise Exception("boom")
+
+        cursor.execute.side_effect = execute
+
+        self.assertEqual(_explain(conn, "SELECT 1", (), False), "EXPLAIN failed: boom")
+        self.assertEqual([c.args[0] for c in cursor.execute.call_args_list], [
+            "SAVEPOINT slow_query_explain", "EXPLAIN SELECT 1",
+            "ROLLBACK TO SAVEPOINT slow_query_explain", "RELEASE SAVEPOINT slow_query_explain",
+        ])
+
+    def test_parameters_are_redacted(self):
+        self.assertEqual(redact_parameters(("alice@example.com", 5)), "['<str>', '<int>']")
+        self.assertNotIn("secret", redact_parameters({"password": "secret"}))
+
+    def test_requires_mechanic_token(self):
+        response = self.client.get("/admin/slow-queries")
+        self.assertEqual(response.status_code, 401)
+
+    def test_clear_slow_queries(self):
+        self.client.get("/customers/")
+        response = self.client.delete("/admin/slow-queries", headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
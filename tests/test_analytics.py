@@ -0,0 +1,101 @@
+# File: tests/test_analytics.py
+
+import unittest
+import warnings
+from datetime import datetime
+from sqlalchemy.exc import SAWarning
+from application import create_app
+from application.analytics import rebuild_rollups
+from application.extensions import db
+from application.models import Customer, DailyTicketStats, Inventory, ServiceTicket
+from application.utils import encode_token
+from config import TestingConfig
+
+
+class AnalyticsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.mechanic = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+
+        with self.app.app_context():
+            db.create_all()
+            alice = Customer(name="Alice", email="alice@example.com", password="x")
+            bob = Customer(name="Bob", email="bob@example.com", password="x")
+            db.session.add_all([
+                alice, bob,
+                Inventory(name="Brake Pad", price=40),
+                Inventory(name="Oil Filter", price=10),
+                ServiceTicket(id=1, description="Brakes", customer=alice, created_at=datetime(2025, 3, 10, 8)),
+                ServiceTicket(id=2, description="Oil", customer=bob, created_at=datetime(2025, 3, 10, 9)),
+                ServiceTicket(id=3, description="Noise", customer=alice, created_at=datetime(2025, 3, 11, 9)),
+            ])
+            db.session.commit()
+
+        for ticket_id, part_id, quantity in ((1, 1, 2), (2, 2, 1), (3, 2, 3)):
+            self.client.post(f"/inventory/add-part/{ticket_id}", json={"part_id": part_id, "quantity": quantity},
+                             headers=self.mechanic)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _get(self, path, **params):
+        response = self.client.get(path, query_string=params, headers=self.mechanic)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def _complete(self, ticket_id, at, status="Completed"):
+        with self.app.app_context():
+            ticket = db.session.get(ServiceTicket, ticket_id)
+            ticket.status = status
+            if status == "Completed":
+                ticket.completed_at = at
+            db.session.commit()
+
+    def test_daily_volume_and_completion_time(self):
+        self._complete(1, datetime(2025, 3, 11, 8))
+        self._complete(2, datetime(2025, 3, 11, 21))
+        days = self._get("/analytics/daily", start="2025-03-01", end="2025-03-31")
+        self.assertEqual(days, [
+            {"day": "2025-03-10", "tickets_created": 2, "tickets_completed": 0, "avg_completion_hours": None},
+            {"day": "2025-03-11", "tickets_created": 1, "tickets_completed": 2, "avg_completion_hours": 30.0},
+        ])
+
+    def test_reopening_takes_the_completion_back_out(self):
+        self.client.put("/service-tickets/1/update-status", json={"status": "Completed"}, headers=self.mechanic)
+        self.client.put("/service-tickets/1/update-status", json={"status": "In Progress"}, headers=self.mechanic)
+        with self.app.app_context():
+            self.assertEqual(sum(d.tickets_completed for d in db.session.query(DailyTicketStats)), 0)
+            self.assertIsNone(db.session.get(ServiceTicket, 1).completed_at)
+
+    def test_parts_revenue_and_customer_value(self):
+        parts = self._get("/analytics/parts")
+        self.assertEqual([(p["name"], p["units"], p["revenue"]) for p in parts],
+                         [("Brake Pad", 2, 80.0), ("Oil Filter", 4, 40.0)])
+        customers = self._get("/analytics/customers")
+        self.assertEqual([(c["name"], c["ticket_count"], c["lifetime_value"]) for c in customers],
+                         [("Alice", 2, 110.0), ("Bob", 1, 10.0)])
+
+    def test_booking_a_part_warns_about_nothing(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", SAWarning)  # e.g. a cartesian product in the price lookup
+            response = self.client.post("/inventory/add-part/2", json={"part_id": 1, "quantity": 1},
+                                        headers=self.mechanic)
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual([p["revenue"] for p in self._get("/analytics/parts")], [120.0, 40.0])
+
+    def test_rebuild_matches_incremental(self):
+        self._complete(1, datetime(2025, 3, 11, 8))
+        before = [self._get(path, start="2025-03-01", end="2025-03-31")
+                  for path in ("/analytics/daily", "/analytics/parts", "/analytics/customers")]
+        with self.app.app_context():
+            rebuild_rollups(db.session)
+        after = [self._get(path, start="2025-03-01", end="2025-03-31")
+                 for path in ("/analytics/daily", "/analytics/parts", "/analytics/customers")]
+        self.assertEqual(before, after)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+# File: tests/test_apispec.py
+
+import json
+import os
+import tempfile
+import unittest
+from application import create_app
+from config import TestingConfig
+
+
+class SpecBuildTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        spec_dir = self.tmpdir.name
+
+        class DynamicConfig(TestingConfig):
+            SWAGGER_MODE = "dynamic"
+            SWAGGER_SPEC_DIR = spec_dir
+
+        class StaticConfig(TestingConfig):
+            SWAGGER_MODE = "static"
+            SWAGGER_SPEC_DIR = spec_dir
+
+        self.dynamic_config = DynamicConfig
+        self.static_config = StaticConfig
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_build_and_serve_static_spec(self):
+        dynamic_app = create_app(self.dynamic_config)
+        result = dynamic_app.test_cli_runner().invoke(args=["spec", "build"])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+        client = create_app(self.static_config).test_client()
+        legacy = client.get("/apispec_1.json")
+        self.assertEqual(legacy.status_code, 302)
+        self.assertRegex(legacy.location, r"/apispec-1\.0\.0\.[0-9a-f]+\.json$")
+
+        response = client.get(legacy.location)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertEqual(response.get_json(), dynamic_app.test_client().get("/apispec_1.json").get_json())
+        response.close()
+
+    def test_static_mode_without_build_falls_back_to_dynamic(self):
+        response = create_app(self.static_config).test_client().get("/apispec_1.json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("/customers/register", json.loads(response.data)["paths"])
+
+    def test_builds_for_other_routes_are_never_served(self):
+        # left over from an older deploy, and newer than anything
+        with open(os.path.join(self.tmpdir.name, "apispec-1.0.0.0123456789ab.json"), "w") as f:
+            json.dump({"paths": {}}, f)
+        client = create_app(self.static_config).test_client()
+        response = client.get("/apispec_1.json")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("/customers/register", json.loads(response.data)["paths"])
+
+        create_app(self.dynamic_config).test_cli_runner().invoke(args=["spec", "build"])
+        os.utime(os.path.join(self.tmpdir.name, "apispec-1.0.0.0123456789ab.json"))
+        client = create_app(self.static_config).test_client()
+        response = client.get(client.get("/apispec_1.json").location)
+        self.assertIn("/customers/register", response.get_json()["paths"])
+        response.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+# File: tests/test_appointments.py
+
+import unittest
+from unittest import mock
+from datetime import datetime, timedelta
+from application import create_app
+from application.extensions import db
+from application.models import Appointment, Customer, Mechanic, ServiceTicket
+from application import scheduling
+from application.scheduling import Calendar, OpeningHours
+from application.utils import encode_token
+from config import TestingConfig
+
+DAY = (datetime.utcnow() + timedelta(days=2)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def at(hour, minute=0, day=0):
+    return DAY + timedelta(days=day, hours=hour, minutes=minute)
+
+
+class CalendarTestCase(unittest.TestCase):
+    def setUp(self):
+        self.calendar = Calendar()
+        for appointment_id, (start, end) in enumerate([(9, 10), (10, 12), (14, 15)], start=1):
+            self.calendar.add(appointment_id, at(start), at(end))
+        self.hours = OpeningHours(8, 18)
+
+    def test_conflicts(self):
+        self.assertEqual(self.calendar.conflicts(at(8), at(9)), [])  # touching isn't overlapping
+        self.assertEqual(self.calendar.conflicts(at(9, 30), at(10, 30)), [1, 2])
+        self.assertEqual(self.calendar.conflicts(at(12), at(14)), [])
+        self.assertEqual(self.calendar.conflicts(at(7), at(20)), [1, 2, 3])
+
+    def test_next_free_hops_past_bookings_and_closing_time(self):
+        until = at(0, day=30)
+        self.assertEqual(self.calendar.next_free(at(9), timedelta(hours=1), self.hours, until), at(12))
+        self.assertEqual(self.calendar.next_free(at(9), timedelta(hours=3), self.hours, until), at(15))
+        self.assertEqual(self.calendar.next_free(at(16), timedelta(hours=3), self.hours, until), at(8, day=1))
+        self.assertIsNone(self.calendar.next_free(at(9), timedelta(hours=11), self.hours, until))
+
+    def test_remove(self):
+        self.calendar.remove(2, at(10))
+        self.assertEqual(self.calendar.conflicts(at(9), at(14)), [1])
+
+
+class AppointmentRoutesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Customer(id=1, name="Alice", email="alice@example.com", password="x"),
+                Mechanic(id=1, name="Mech 1", password="x"),
+                Mechanic(id=2, name="Mech 2", password="x"),
+                ServiceTicket(id=1, description="Brakes", customer_id=1),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _book(self, start, end, **extra):
+        body = {"service_ticket_id": 1, "starts_at": start.isoformat(), "ends_at": end.isoformat(), **extra}
+        return self.client.post("/appointments/", json=body, headers=self.headers)
+
+    def _get(self, path, **params):
+        return self.client.get(path, query_string=params, headers=self.headers)
+
+    def test_overlapping_booking_is_refused(self):
+        first = self._book(at(9), at(11), mechanic_id=1)
+        self.assertEqual(first.status_code, 201)
+        clash = self._book(at(10), at(12), mechanic_id=1)
+        self.assertEqual(clash.status_code, 409)
+        self.assertEqual(clash.get_json()["conflicts"], [first.get_json()["id"]])
+        self.assertEqual(self._book(at(11), at(12), mechanic_id=1).status_code, 201)
+        self.assertEqual(self._book(at(10), at(12), mechanic_id=2).status_code, 201)
+
+    def test_booking_in_a_rolled_back_batch_is_forgotten(self):
+        self.assertEqual(self._get("/appointments/availability", start=at(8).isoformat(), end=at(12).isoformat()).status_code, 200)
+        response = self.client.post("/batch", headers=self.headers, json={"atomic": True, "requests": [
+            {"method": "POST", "path": "/appointments/", "body": {
+                "service_ticket_id": 1, "mechanic_id": 1, "starts_at": at(9).isoformat(), "ends_at": at(11).isoformat()}},
+            {"method": "GET", "path": "/service-tickets/999"},
+        ]})
+        self.assertEqual([r["status"] for r in response.get_json()["responses"]], [201, 404])
+        self.assertFalse(response.get_json()["committed"])
+        self.assertEqual(self._book(at(9), at(11), mechanic_id=1).status_code, 201)
+
+    def test_bay_is_a_resource_too(self):
+        self.assertEqual(self._book(at(9), at(11), mechanic_id=1, bay="Bay 1").status_code, 201)
+        self.assertEqual(self._book(at(10), at(12), mechanic_id=2, bay="Bay 1").status_code, 409)
+        self.assertEqual(self._book(at(10), at(12), mechanic_id=2, bay="Bay 2").status_code, 201)
+
+    def test_bay_bookings_are_serialized_on_postgres(self):
+        # READ COMMITTED can't see another mechanic's uncommitted booking of the bay, the
+        # advisory lock makes the second booking wait for the first to commit. Stand-ins for
+        # the postgres functions record which locks get taken.
+        taken = []
+        with self.app.app_context():
+            raw = db.session.connection().connection.driver_connection
+            raw.create_function("hashtext", 1, lambda key: key)
+            raw.create_function("pg_advisory_xact_lock", 1, lambda key: taken.append(key))
+        with mock.patch.object(scheduling, "_locks_bays", return_value=True):
+            self.assertEqual(self._book(at(9), at(11), mechanic_id=1, bay="Bay 1").status_code, 201)
+            self.assertEqual(self._book(at(9), at(11), mechanic_id=2).status_code, 201)
+        self.assertEqual(taken, ["appointment-bay:Bay 1"])
+
+    def test_any_mechanic_and_availability(self):
+        self.assertEqual(self._book(at(9), at(10)).get_json()["mechanic_id"], 1)
+        self.assertEqual(self._book(at(9), at(10)).get_json()["mechanic_id"], 2)
+        self.assertEqual(self._book(at(9), at(10)).status_code, 409)
+
+        busy = self._get("/appointments/availability", start=at(9, 30).isoformat(), end=at(11).isoformat(), mechanic_id=1)
+        self.assertFalse(busy.get_json()["free"])
+        free = self._get("/appointments/availability", start=at(10).isoformat(), end=at(11).isoformat())
+        self.assertEqual(free.get_json()["free_mechanics"], [1, 2])
+
+    def test_next_free_slot(self):
+        self._book(at(8), at(12), mechanic_id=1)
+        self._book(at(8), at(10), mechanic_id=2)
+        self._book(at(10), at(17), mechanic_id=2)
+        slot = self._get("/appointments/next-free", after=at(8).isoformat(), duration_minutes=120).get_json()
+        self.assertEqual((slot["mechanic_id"], slot["starts_at"]), (1, at(12).isoformat()))
+        slot = self._get("/appointments/next-free", after=at(8).isoformat(), duration_minutes=120, mechanic_id=2).get_json()
+        self.assertEqual(slot["starts_at"], at(8, day=1).isoformat())
+        self.assertEqual(self._get("/appointments/next-free", duration_minutes=24 * 60).status_code, 404)
+
+    def test_cancel_frees_the_slot(self):
+        booked = self._book(at(9), at(11), mechanic_id=1).get_json()
+        self.assertEqual(self.client.delete(f"/appointments/{booked['id']}", headers=self.headers).status_code, 200)
+        self.assertEqual(self._book(at(9), at(11), mechanic_id=1).status_code, 201)
+
+    def test_database_catches_what_the_index_missed(self):
+        self._get("/appointments/availability", start=at(9).isoformat(), end=at(10).isoformat())  # build the index
+        with self.app.app_context():
+            # another worker's booking, this process never saw it
+            db.session.execute(Appointment.__table__.insert().values(
+                service_ticket_id=1, mechanic_id=1, starts_at=at(9), ends_at=at(11)))
+            db.session.commit()
+        response = self._book(at(10), at(12), mechanic_id=1)
+        self.assertEqual(response.status_code, 409)
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Appointment).count(), 1)
+
+    def test_validation(self):
+        self.assertEqual(self._book(at(11), at(9)).status_code, 400)
+        past = datetime.utcnow() - timedelta(days=1)
+        self.assertEqual(self._book(past, past + timedelta(hours=1)).status_code, 400)
+        self.assertEqual(self._book(at(9), at(10), mechanic_id=99).status_code, 404)
+        body = {"service_ticket_id": 1, "starts_at": at(9).isoformat(), "duration_minutes": 90}
+        self.assertEqual(self.client.post("/appointments/", json=body, headers=self.headers).get_json()["ends_at"],
+                         at(10, 30).isoformat())
+
+
+if __name__ == "__main__":
+    unittest.main()
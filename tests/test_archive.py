@@ -0,0 +1,141 @@
+# File: tests/test_archive.py
+
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from application import create_app
+from application.analytics import rebuild_rollups
+from application.archive import archive_completed
+from application.extensions import db
+from application.models import (
+    Appointment, ArchivedTicket, Customer, CustomerValue, Inventory, Mechanic, ServiceTicket,
+    service_mechanic_archive, ticket_parts, ticket_parts_archive,
+)
+from application.utils import encode_token
+from config import TestingConfig
+
+
+class ArchiveTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.customer_headers = {"Authorization": f"Bearer {encode_token(1)}"}
+        self.mechanic_headers = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+        now = datetime.utcnow()
+        self.old = now - timedelta(days=400)
+
+        with self.app.app_context():
+            db.create_all()
+            mechanic = Mechanic(id=1, name="Mech 1", password="x")
+            part = Inventory(id=1, name="Brake pad", price=25.0)
+            db.session.add_all([Customer(id=1, name="Alice", email="alice@example.com", password="x"), mechanic, part])
+            db.session.add_all([
+                # 1-3 are old enough, 3 is only Cancelled and stays
+                ServiceTicket(id=1, description="old brake job", customer_id=1, status="Completed",
+                              created_at=self.old, completed_at=self.old, mechanics=[mechanic]),
+                ServiceTicket(id=2, description="old oil change", customer_id=1, status="Completed",
+                              created_at=self.old, completed_at=self.old),
+                ServiceTicket(id=3, description="old cancelled brake job", customer_id=1, status="Cancelled",
+                              created_at=self.old),
+                ServiceTicket(id=4, description="recent brake job", customer_id=1, status="Completed",
+                              created_at=now, completed_at=now),
+                ServiceTicket(id=5, description="open brake job", customer_id=1, status="Pending", created_at=now),
+            ])
+            db.session.flush()
+            db.session.execute(ticket_parts.insert(), [
+                {"service_ticket_id": 1, "inventory_id": 1, "quantity": 2},
+                {"service_ticket_id": 4, "inventory_id": 1, "quantity": 1},
+            ])
+            db.session.add(Appointment(service_ticket_id=2, mechanic_id=1, starts_at=self.old,
+                                       ends_at=self.old + timedelta(hours=1)))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def archive(self, **kwargs):
+        with self.app.app_context():
+            return archive_completed(self.app, db.session, **kwargs)
+
+    def test_moves_old_completed_tickets_with_their_rows(self):
+        self.assertEqual(self.archive(batch_size=1), 2)
+        with self.app.app_context():
+            self.assertEqual(db.session.scalars(select(ServiceTicket.id).order_by(ServiceTicket.id)).all(), [3, 4, 5])
+            archived = db.session.get(ArchivedTicket, 1)
+            self.assertEqual(archived.description, "old brake job")
+            self.assertEqual(archived.completed_at, self.old)
+            self.assertIsNotNone(archived.archived_at)
+            self.assertEqual([m.id for m in archived.mechanics], [1])
+            self.assertEqual(db.session.execute(select(ticket_parts_archive)).all(), [(1, 1, 2)])
+            self.assertEqual(db.session.execute(select(service_mechanic_archive)).all(), [(1, 1)])
+            self.assertEqual(db.session.execute(select(ticket_parts.c.service_ticket_id)).scalars().all(), [4])
+            self.assertEqual(db.session.scalar(select(func.count(Appointment.id))), 0)
+        self.assertEqual(self.archive(), 0)  # nothing left to do
+
+    def test_keeps_the_newest_ticket(self):
+        with self.app.app_context():
+            db.session.delete(db.session.get(ServiceTicket, 5))
+            db.session.delete(db.session.get(ServiceTicket, 4))
+            db.session.commit()
+        # ticket 3 is the newest row now, 2 and 1 can go
+        self.assertEqual(self.archive(), 2)
+        with self.app.app_context():
+            ticket = db.session.get(ServiceTicket, 3)
+            ticket.status = "Pending"
+            db.session.commit()
+            ticket.status = "Completed"
+            ticket.completed_at = self.old
+            db.session.commit()
+        self.assertEqual(self.archive(), 0)
+
+    def test_read_endpoints_include_archived_on_request(self):
+        self.archive()
+
+        ids = [t["id"] for t in self.client.get("/service-tickets/").get_json()]
+        self.assertEqual(ids, [3, 4, 5])
+        tickets = self.client.get("/service-tickets/?include_archived=true").get_json()
+        self.assertEqual([(t["id"], t["archived"]) for t in tickets],
+                         [(1, True), (2, True), (3, False), (4, False), (5, False)])
+        self.assertEqual((tickets[0]["total_parts_cost"], tickets[0]["part_count"]), (50.0, 2))
+        self.assertEqual(tickets[0]["mechanics"][0]["id"], 1)
+
+        mine = self.client.get("/service-tickets/my-tickets?include_archived=true", headers=self.customer_headers)
+        self.assertEqual(len(mine.get_json()), 5)
+
+        self.assertEqual(self.client.get("/service-tickets/1").status_code, 404)
+        archived = self.client.get("/service-tickets/1?include_archived=true")
+        self.assertEqual(archived.status_code, 200)
+        self.assertTrue(archived.get_json()["archived"])
+
+        start = self.old.date().isoformat()
+        totals = self.client.get(f"/service-tickets/totals?start={start}", headers=self.mechanic_headers).get_json()
+        self.assertEqual((totals["ticket_count"], totals["part_count"]), (3, 1))
+        totals = self.client.get(f"/service-tickets/totals?start={start}&include_archived=true",
+                                 headers=self.mechanic_headers).get_json()
+        self.assertEqual((totals["ticket_count"], totals["part_count"], totals["total_parts_cost"]), (5, 3, 75.0))
+
+    def test_search_puts_archived_matches_last(self):
+        self.archive()
+        hot = self.client.get("/service-tickets/search?q=brake").get_json()
+        self.assertEqual(hot["total"], 3)
+
+        first = self.client.get("/service-tickets/search?q=brake&include_archived=true&per_page=2").get_json()
+        second = self.client.get("/service-tickets/search?q=brake&include_archived=true&per_page=2&page=2").get_json()
+        self.assertEqual(first["total"], 4)
+        self.assertEqual([t["archived"] for t in first["tickets"]], [False, False])
+        self.assertEqual([(t["id"], t["archived"]) for t in second["tickets"][1:]], [(1, True)])
+        ids = {t["id"] for t in first["tickets"] + second["tickets"]}
+        self.assertEqual(ids, {1, 3, 4, 5})
+
+    def test_rebuilt_rollups_count_archived_tickets(self):
+        self.archive()
+        with self.app.app_context():
+            rebuild_rollups(db.session)
+            value = db.session.get(CustomerValue, 1)
+            self.assertEqual((value.ticket_count, value.parts_revenue), (5, 75.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
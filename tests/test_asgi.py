@@ -0,0 +1,173 @@
+# File: tests/test_asgi.py
+
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import msgpack
+from application.extensions import db, limiter
+from application.models import Customer, Mechanic, ServiceTicket, Inventory
+from application.utils import hash_password
+from config import TestingConfig, engine_options_for
+
+try:
+    import aiosqlite  # noqa: F401
+    from application import asgi
+    from application.asgi import create_asgi_app
+    HAS_ASYNC = True
+except ImportError:
+    HAS_ASYNC = False
+
+
+async def call(app, method, path, query=b"", headers=None, body=b""):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query,
+        "headers": headers or [],
+        "client": ("127.0.0.1", 1234),
+        "server": ("testserver", 80),
+    }
+    sent = [{"type": "http.request", "body": body, "more_body": False}]
+    messages = []
+
+    async def receive():
+        return sent.pop(0) if sent else {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    status = messages[0]["status"]
+    payload = b"".join(m.get("body", b"") for m in messages[1:])
+    return status, payload, dict(messages[0]["headers"])
+
+
+@unittest.skipUnless(HAS_ASYNC, "ASGI mode needs asgiref and aiosqlite")
+class AsgiAppTestCase(unittest.TestCase):
+    def setUp(self):
+        # :memory: would give the async engine its own empty database, so use a real file
+        self.tmpdir = tempfile.TemporaryDirectory()
+        uri = f"sqlite:///{os.path.join(self.tmpdir.name, 'asgi.db')}"
+
+        class AsgiConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = uri
+            SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(uri)
+
+        self.config = AsgiConfig
+        self.app = create_asgi_app(AsgiConfig)
+        self.flask_app = self.app.flask_app
+
+        with self.flask_app.app_context():
+            db.create_all()
+            customer = Customer(name="Async", email="async@example.com", password=hash_password("pass123"))
+            mechanic = Mechanic(name="AsyncMech", password=hash_password("mechpass"))
+            part = Inventory(name="Brake Pad", price=49.99)
+            ticket = ServiceTicket(description="Squeaky brakes", customer=customer, mechanics=[mechanic], parts=[part])
+            db.session.add_all([customer, mechanic, part, ticket])
+            db.session.commit()
+
+    def tearDown(self):
+        if self.app.engine is not None:
+            asyncio.run(self.app.engine.dispose())
+        with self.flask_app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_async_routes_match_flask_responses(self):
+        client = self.flask_app.test_client()
+        requests = [
+            ("/service-tickets/", b""),
+            ("/customers/", b"page=1&per_page=5"),
+            ("/mechanics/", b""),
+            ("/mechanics/by-tickets", b""),
+            ("/inventory/", b""),
+        ]
+
+        async def fire_all():
+            # one event loop for everything, pooled async connections belong to the loop that made them
+            results = await asyncio.gather(*(call(self.app, "GET", path, query) for path, query in requests))
+            await self.app.engine.dispose()
+            return results
+
+        for (path, query), (status, body, _) in zip(requests, asyncio.run(fire_all())):
+            self.assertEqual(status, 200, path)
+            expected = client.get(f"{path}?{query.decode()}").get_json()
+            self.assertEqual(json.loads(body), expected, path)
+
+    def test_other_routes_fall_through_to_flask(self):
+        payload = json.dumps({"email": "async@example.com", "password": "pass123"}).encode()
+        status, body, _ = asyncio.run(call(
+            self.app, "POST", "/customers/login",
+            headers=[(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+            body=payload,
+        ))
+        self.assertEqual(status, 200)
+        self.assertIn("token", json.loads(body))
+
+    def test_native_responses_get_negotiation_and_compression(self):
+        with self.flask_app.app_context():
+            db.session.add_all([Mechanic(name=f"Mech {i}", password="x") for i in range(30)])
+            db.session.commit()
+        expected = self.flask_app.test_client().get("/mechanics/").get_json()
+        native = mock.Mock(wraps=asgi.list_all_mechanics)
+
+        async def fire():
+            results = [await call(self.app, "GET", "/mechanics/", headers=[(b"accept-encoding", b"gzip")]),
+                       await call(self.app, "GET", "/mechanics/", headers=[(b"accept", b"application/msgpack")])]
+            await self.app.engine.dispose()
+            return results
+
+        with mock.patch.dict(asgi.ASYNC_ROUTES, {"/mechanics/": native}):
+            (_, zipped, zipped_headers), (_, packed, packed_headers) = asyncio.run(fire())
+        self.assertEqual(native.call_count, 2)
+        self.assertEqual(zipped_headers[b"content-encoding"], b"gzip")
+        self.assertEqual(json.loads(gzip.decompress(zipped)), expected)
+        self.assertEqual(packed_headers[b"content-type"], b"application/msgpack")
+        self.assertEqual(msgpack.unpackb(packed), expected)
+
+    def test_native_routes_are_rate_limited_like_flask(self):
+        class LimitedConfig(self.config):
+            RATELIMIT_DEFAULT = "2 per minute"
+
+        native = mock.Mock(wraps=asgi.list_all_mechanics)
+
+        async def fire(app):
+            results = [await call(app, "GET", "/mechanics/") for _ in range(3)]
+            await app.engine.dispose()
+            return results
+
+        # the limiter is shared by every app, its default limits mustn't outlive the test
+        with mock.patch.object(limiter.limit_manager, "_default_limits", []), \
+                mock.patch.dict(asgi.ASYNC_ROUTES, {"/mechanics/": native}):
+            app = create_asgi_app(LimitedConfig)
+            responses = asyncio.run(fire(app))
+        self.assertEqual([status for status, _, _ in responses], [200, 200, 429])
+        self.assertEqual(native.call_count, 2)  # the limit answers before the query runs
+        with app.flask_app.app_context():
+            db.engine.dispose()
+
+    def test_without_the_async_driver_flask_serves_everything(self):
+        with mock.patch.object(asgi, "create_async_engine", side_effect=ImportError("No module named 'asyncpg'")):
+            app = create_asgi_app(self.config)
+        self.assertIsNone(app.engine)
+        status, body, _ = asyncio.run(call(app, "GET", "/inventory/"))
+        self.assertEqual(status, 200)
+        self.assertEqual([part["name"] for part in json.loads(body)], ["Brake Pad"])
+        with app.flask_app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    unittest.main()
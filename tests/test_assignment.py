@@ -0,0 +1,127 @@
+# File: tests/test_assignment.py
+
+import unittest
+from datetime import datetime, timedelta
+from application import create_app
+from application.assignment import WorkloadHeap, open_workloads, workload_heap
+from application.extensions import db
+from application.models import Customer, Mechanic, ServiceTicket
+from application.utils import encode_token
+from config import TestingConfig
+
+
+class WorkloadHeapTestCase(unittest.TestCase):
+    def test_least_loaded_skips_stale_entries(self):
+        heap = WorkloadHeap()
+        for mechanic_id in (1, 2, 3):
+            heap.adjust(mechanic_id, 0)
+        self.assertEqual(heap.least_loaded(), 1)
+        heap.adjust(1, 2)
+        heap.adjust(2, 1)
+        self.assertEqual(heap.least_loaded(), 3)
+        heap.adjust(3, 5)
+        heap.adjust(1, -2)
+        self.assertEqual(heap.least_loaded(), 1)
+        heap.remove(1)
+        self.assertEqual(heap.least_loaded(), 2)
+
+    def test_compacts_under_churn(self):
+        heap = WorkloadHeap()
+        for _ in range(1000):
+            heap.adjust(1, 1)
+            heap.adjust(2, 1)
+        self.assertLess(len(heap._heap), 100)
+        self.assertEqual((heap.workload(1), heap.least_loaded()), (1000, 1))
+
+
+class AutoAssignTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.customer = {"Authorization": f"Bearer {encode_token(1)}"}
+        self.mechanic = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+
+        with self.app.app_context():
+            db.create_all()
+            mechanics = [Mechanic(id=i, name=f"Mech {i}", password="x") for i in (1, 2, 3)]
+            db.session.add_all([Customer(id=1, name="Alice", email="alice@example.com", password="x"), *mechanics])
+            # mechanic 1 is busy, 2 has one job, 3 only has finished work
+            for i, (mechanic, status) in enumerate([(0, "Pending"), (0, "In Progress"), (1, "Pending"), (2, "Completed")]):
+                db.session.add(ServiceTicket(id=100 + i, description="old job", customer_id=1, status=status,
+                                             mechanics=[mechanics[mechanic]]))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _create(self):
+        response = self.client.post("/service-tickets/", json={"description": "Noise"}, headers=self.customer)
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()
+
+    def _workloads(self):
+        with self.app.app_context():
+            heap = workload_heap(self.app, db.session)
+            return {m: heap.workload(m) for m in (1, 2, 3)}, open_workloads(db.session)
+
+    def test_new_tickets_go_to_the_least_loaded(self):
+        assigned = [self._create()["assigned_mechanic_id"] for _ in range(4)]
+        self.assertEqual(assigned, [3, 2, 3, 1])
+        with self.app.app_context():
+            ticket = db.session.get(ServiceTicket, self._create()["ticket_id"])
+            self.assertEqual([m.id for m in ticket.mechanics], [2])
+        heap, database = self._workloads()
+        self.assertEqual(heap, database)
+
+    def test_assignment_in_a_rolled_back_batch_is_not_counted(self):
+        self._workloads()
+        response = self.client.post("/batch", headers=self.customer, json={"atomic": True, "requests": [
+            {"method": "POST", "path": "/service-tickets/", "body": {"description": "Noise"}},
+            {"method": "GET", "path": "/service-tickets/999"},
+        ]})
+        self.assertEqual([r["status"] for r in response.get_json()["responses"]], [201, 404])
+        heap, database = self._workloads()
+        self.assertEqual(heap, database)
+        self.assertEqual(self._create()["assigned_mechanic_id"], 3)
+
+    def test_completing_and_editing_update_the_heap(self):
+        self._workloads()  # build the heap
+        self.client.put("/service-tickets/100/update-status", json={"status": "Completed"}, headers=self.mechanic)
+        self.client.put("/service-tickets/101/edit", json={"remove_ids": [1], "add_ids": [3]}, headers=self.customer)
+        self.client.put("/service-tickets/103/update-status", json={"status": "In Progress"}, headers=self.mechanic)
+        heap, database = self._workloads()
+        self.assertEqual(heap, {1: 0, 2: 1, 3: 2})
+        self.assertEqual(heap, database)
+        self.assertEqual(self._create()["assigned_mechanic_id"], 1)
+
+    def test_no_assignment_when_switched_off(self):
+        self.app.config["AUTO_ASSIGN_MECHANICS"] = False
+        self.assertIsNone(self._create()["assigned_mechanic_id"])
+
+    def test_rebalance_assigns_the_backlog_oldest_first(self):
+        self.app.config["AUTO_ASSIGN_MECHANICS"] = False
+        with self.app.app_context():
+            now = datetime.utcnow()
+            db.session.add_all([
+                ServiceTicket(id=200 + i, description="backlog", customer_id=1, created_at=now - timedelta(hours=i))
+                for i in range(4)
+            ])
+            db.session.add(ServiceTicket(id=300, description="done", customer_id=1, status="Completed"))
+            db.session.commit()
+
+        response = self.client.post("/service-tickets/rebalance", headers=self.mechanic)
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["assigned"], 4)
+        self.assertEqual([(a["ticket_id"], a["mechanic_id"]) for a in body["assignments"]],
+                         [(203, 3), (202, 2), (201, 3), (200, 1)])
+        heap, database = self._workloads()
+        self.assertEqual(heap, {1: 3, 2: 2, 3: 2})
+        self.assertEqual(heap, database)
+        self.assertEqual(self.client.post("/service-tickets/rebalance", headers=self.mechanic).get_json()["assigned"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+# File: tests/test_batch.py
+
+import unittest
+from unittest import mock
+from application import create_app, utils
+from application.extensions import db
+from application.models import Customer, Inventory, ServiceTicket
+from application.utils import encode_token, hash_password
+from config import TestingConfig
+
+
+class BatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            customer = Customer(name="Batcher", email="batch@example.com", password=hash_password("x"))
+            db.session.add(customer)
+            db.session.commit()
+            self.headers = {"Authorization": f"Bearer {encode_token(customer.id)}"}
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _batch(self, requests, **extra):
+        return self.client.post("/batch", json={"requests": requests, **extra}, headers=self.headers)
+
+    def test_runs_sub_requests_in_order(self):
+        response = self._batch([
+            {"method": "POST", "path": "/service-tickets/", "body": {"description": "Brakes squeal"}},
+            {"method": "GET", "path": "/service-tickets/my-tickets"},
+            {"method": "GET", "path": "/does-not-exist"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()["responses"]
+        self.assertEqual([r["status"] for r in results], [201, 200, 404])
+        self.assertEqual(results[1]["body"][0]["description"], "Brakes squeal")
+
+    def test_token_decoded_once_per_batch(self):
+        with mock.patch.object(utils.jwt, "decode", wraps=utils.jwt.decode) as spy:
+            response = self._batch([{"method": "GET", "path": "/service-tickets/my-tickets"}] * 3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(spy.call_count, 1)
+
+    def test_atomic_batch_rolls_back_on_failure(self):
+        response = self._batch([
+            {"method": "POST", "path": "/service-tickets/", "body": {"description": "Oil change"}},
+            {"method": "POST", "path": "/service-tickets/", "body": {}},
+            {"method": "POST", "path": "/service-tickets/", "body": {"description": "Never runs"}},
+        ], atomic=True)
+        data = response.get_json()
+        self.assertFalse(data["committed"])
+        self.assertEqual([r["status"] for r in data["responses"]], [201, 400, 424])
+        with self.app.app_context():
+            self.assertEqual(db.session.query(ServiceTicket).count(), 0)
+
+    def test_atomic_batch_commits(self):
+        mechanic_headers = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+        response = self.client.post("/batch", headers=mechanic_headers, json={"atomic": True, "requests": [
+            {"method": "POST", "path": "/inventory/", "body": {"name": "Filter", "price": 9.5}},
+            {"method": "POST", "path": "/inventory/", "body": {"name": "Belt", "price": 20}},
+        ]})
+        self.assertTrue(response.get_json()["committed"])
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Inventory).count(), 2)
+
+    def test_rejects_oversized_and_nested_batches(self):
+        self.app.config["BATCH_MAX_REQUESTS"] = 2
+        too_many = self._batch([{"method": "GET", "path": "/inventory/"}] * 3)
+        self.assertEqual(too_many.status_code, 400)
+        nested = self._batch([{"method": "POST", "path": "/batch", "body": {"requests": []}}])
+        self.assertEqual(nested.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# File: tests/test_compression.py
+
+import gzip
+import json
+import unittest
+from unittest import mock
+from flask import Response
+from application import create_app, compression
+from application.extensions import db
+from application.models import Inventory
+from config import TestingConfig
+
+
+class CompressionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+
+        @self.app.route("/test-stream")
+        def stream():
+            return Response((json.dumps({"row": i}) + "\n" for i in range(200)), mimetype="application/json")
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([Inventory(name=f"Brake Pad {i}", price=10 + i) for i in range(50)])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_gzip_when_accepted(self):
+        plain = self.client.get("/inventory/")
+        response = self.client.get("/inventory/", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertLess(len(response.data), len(plain.data))
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+
+    @unittest.skipIf(compression.brotli is None, "brotli not installed")
+    def test_brotli_preferred_when_available(self):
+        response = self.client.get("/inventory/", headers={"Accept-Encoding": "gzip, br"})
+        self.assertEqual(response.headers["Content-Encoding"], "br")
+        self.assertIn(b"Brake Pad", compression.brotli.decompress(response.data))
+
+    def test_no_compression_without_header_or_below_threshold(self):
+        self.assertNotIn("Content-Encoding", self.client.get("/inventory/").headers)
+        small = self.client.get("/", headers={"Accept-Encoding": "gzip"})
+        self.assertNotIn("Content-Encoding", small.headers)
+
+    def test_streamed_response_is_compressed(self):
+        response = self.client.get("/test-stream", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        lines = gzip.decompress(response.data).decode().splitlines()
+        self.assertEqual(len(lines), 200)
+
+    def test_cached_endpoint_reuses_compressed_body(self):
+        headers = {"Accept-Encoding": "gzip"}
+        first = self.client.get("/inventory/", headers=headers)
+        with mock.patch.object(compression, "_compress", wraps=compression._compress) as spy:
+            second = self.client.get("/inventory/", headers=headers)
+        spy.assert_not_called()
+        self.assertEqual(first.data, second.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
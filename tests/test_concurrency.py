@@ -0,0 +1,173 @@
+# File: tests/test_concurrency.py
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+from sqlalchemy import event, update
+from sqlalchemy.orm.exc import StaleDataError
+from application import create_app
+from application.extensions import db
+from application.models import Customer, Inventory, Mechanic, ServiceTicket
+from application.utils import encode_token
+from config import TestingConfig, engine_options_for
+
+
+class OptimisticConcurrencyTestCase(unittest.TestCase):
+    def setUp(self):
+        # a file database so concurrent editors get separate connections
+        self.tmpdir = tempfile.TemporaryDirectory()
+        uri = f"sqlite:///{os.path.join(self.tmpdir.name, 'tickets.db')}"
+
+        class ConcurrencyConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = uri
+            SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(uri)
+            AUTO_ASSIGN_MECHANICS = False
+
+        self.app = create_app(ConcurrencyConfig)
+        self.client = self.app.test_client()
+        self.customer = {"Authorization": f"Bearer {encode_token(1)}"}
+        self.mechanic = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Customer(id=1, name="Alice", email="alice@example.com", password="x"),
+                Mechanic(id=1, name="Mech 1", password="x"),
+                Inventory(id=1, name="Brake Pad", price=40),
+                ServiceTicket(id=1, description="Brakes", customer_id=1),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def _version(self):
+        with self.app.app_context():
+            return db.session.get(ServiceTicket, 1).version
+
+    def _set_status(self, status, etag=None):
+        headers = dict(self.mechanic, **({"If-Match": f'"{etag}"'} if etag else {}))
+        return self.client.put("/service-tickets/1/update-status", json={"status": status}, headers=headers)
+
+    def test_etag_and_conditional_get(self):
+        response = self.client.get("/service-tickets/1")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_etag(), ("1", False))
+        self.assertEqual(response.get_json()["version"], 1)
+        self.assertEqual(self.client.get("/service-tickets/1", headers={"If-None-Match": '"1"'}).status_code, 304)
+
+    def test_stale_if_match_is_refused(self):
+        first = self._set_status("In Progress", etag="1")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.get_etag(), ("2", False))
+        stale = self._set_status("Completed", etag="1")
+        self.assertEqual(stale.status_code, 412)
+        self.assertEqual(stale.get_json()["version"], 2)
+        with self.app.app_context():
+            self.assertEqual(db.session.get(ServiceTicket, 1).status, "In Progress")
+        # no If-Match at all still works, the version check happens at commit
+        self.assertEqual(self._set_status("Completed").status_code, 200)
+
+    def test_collection_and_part_changes_bump_the_version(self):
+        self.client.put("/service-tickets/1/edit", json={"add_ids": [1]}, headers=self.customer)
+        self.assertEqual(self._version(), 2)
+        self.client.put("/service-tickets/1/add-part", json={"part_ids": [1]}, headers=self.customer)
+        self.assertEqual(self._version(), 3)
+        self.client.post("/inventory/add-part/1", json={"part_id": 1}, headers=self.mechanic)
+        self.assertEqual(self._version(), 4)
+
+    def test_concurrent_commit_gets_409(self):
+        engine = self._engine()
+        raced = []
+
+        def someone_else_first(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("UPDATE service_ticket") and not raced:
+                raced.append(True)
+                with engine.connect() as other:
+                    other.execute(update(ServiceTicket.__table__).values(status="Waiting on parts", version=2))
+                    other.commit()
+
+        event.listen(engine, "before_cursor_execute", someone_else_first)
+        try:
+            response = self._set_status("Completed", etag="1")
+        finally:
+            event.remove(engine, "before_cursor_execute", someone_else_first)
+        self.assertEqual(response.status_code, 409)
+        with self.app.app_context():
+            ticket = db.session.get(ServiceTicket, 1)
+            self.assertEqual((ticket.status, ticket.version), ("Waiting on parts", 2))
+
+    def _engine(self):
+        with self.app.app_context():
+            return db.engine
+
+    def test_concurrent_editors_lose_no_updates(self):
+        threads, edits = 6, 8
+        retries = []
+
+        def editor(n):
+            for i in range(edits):
+                while True:
+                    with self.app.app_context():
+                        ticket = db.session.get(ServiceTicket, 1)
+                        ticket.description += f" {n}.{i}"
+                        try:
+                            db.session.commit()
+                            break
+                        except StaleDataError:
+                            db.session.rollback()
+                            retries.append(n)
+                        finally:
+                            db.session.remove()
+
+        began = time.perf_counter()
+        workers = [threading.Thread(target=editor, args=(n,)) for n in range(threads)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        elapsed = time.perf_counter() - began
+
+        with self.app.app_context():
+            ticket = db.session.get(ServiceTicket, 1)
+            words = ticket.description.split()[1:]
+            self.assertEqual(sorted(words), sorted(f"{n}.{i}" for n in range(threads) for i in range(edits)))
+            self.assertEqual(ticket.version, 1 + threads * edits)
+        # no locks held between read and write, conflicts just retry
+        self.assertGreater(threads * edits / elapsed, 20)
+
+    def test_concurrent_api_editors_with_if_match(self):
+        threads, edits = 4, 5
+        successes = []
+
+        def editor(n):
+            client = self.app.test_client()
+            for i in range(edits):
+                while True:
+                    current = client.get("/service-tickets/1")
+                    etag, _ = current.get_etag()
+                    status = "In Progress" if current.get_json()["status"] == "Pending" else "Pending"
+                    response = client.put("/service-tickets/1/update-status", json={"status": status},
+                                          headers=dict(self.mechanic, **{"If-Match": f'"{etag}"'}))
+                    if response.status_code == 200:
+                        successes.append((n, i))
+                        break
+                    self.assertIn(response.status_code, (409, 412))
+
+        workers = [threading.Thread(target=editor, args=(n,)) for n in range(threads)]
+        for w in workers:
+            w.start()
+        for w in workers:
+            w.join()
+        self.assertEqual(len(successes), threads * edits)
+        self.assertEqual(self._version(), 1 + threads * edits)
+
+
+if __name__ == "__main__":
+    unittest.main()
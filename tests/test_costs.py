@@ -0,0 +1,78 @@
+# File: tests/test_costs.py
+
+import sqlite3
+import unittest
+from datetime import datetime
+from application import create_app
+from application.costs import ticket_totals
+from application.extensions import db
+from application.models import Customer, Inventory, ServiceTicket
+from application.utils import encode_token
+from config import TestingConfig
+
+
+class TicketCostTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.mechanic = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+
+        with self.app.app_context():
+            db.create_all()
+            customer = Customer(name="Coster", email="cost@example.com", password="x")
+            db.session.add_all([
+                customer,
+                Inventory(name="Brake Pad", price=35.5),
+                Inventory(name="Rotor", price=80),
+                ServiceTicket(description="Brakes", customer=customer, created_at=datetime(2025, 3, 10, 15)),
+                ServiceTicket(description="Inspection", customer=customer, created_at=datetime(2025, 3, 11)),
+                ServiceTicket(description="Old job", customer=customer, created_at=datetime(2025, 1, 2)),
+            ])
+            db.session.commit()
+
+        for ticket_id, part_id, quantity in ((1, 1, 4), (1, 2, 2), (3, 2, 1)):
+            self.client.post(f"/inventory/add-part/{ticket_id}", json={"part_id": part_id, "quantity": quantity},
+                             headers=self.mechanic)
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def test_ticket_list_includes_totals(self):
+        tickets = {t["id"]: t for t in self.client.get("/service-tickets/").get_json()}
+        self.assertEqual((tickets[1]["total_parts_cost"], tickets[1]["part_count"]), (302.0, 6))
+        self.assertEqual((tickets[2]["total_parts_cost"], tickets[2]["part_count"]), (0, 0))
+
+    def test_totals_for_more_ids_than_sqlite_takes_parameters(self):
+        with self.app.app_context():
+            # 32766 on a stock build, some distributions raise it, so pin it down here
+            sqlite = db.session.connection().connection.driver_connection
+            limit = sqlite.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+            try:
+                totals = ticket_totals(db.session, list(range(1, 2001)))
+            finally:
+                sqlite.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+        self.assertEqual(totals, {1: (302.0, 6), 3: (80.0, 1)})
+
+    def test_totals_for_date_range(self):
+        response = self.client.get("/service-tickets/totals", query_string={"start": "2025-03-01", "end": "2025-03-10"},
+                                   headers=self.mechanic)
+        self.assertEqual(response.get_json(), {
+            "start": "2025-03-01", "end": "2025-03-10",
+            "ticket_count": 1, "part_count": 6, "total_parts_cost": 302.0,
+        })
+        everything = self.client.get("/service-tickets/totals", query_string={"start": "2025-01-01", "end": "2025-12-31"},
+                                     headers=self.mechanic).get_json()
+        self.assertEqual((everything["ticket_count"], everything["total_parts_cost"]), (3, 382.0))
+
+    def test_totals_validation(self):
+        bad = self.client.get("/service-tickets/totals?start=March", headers=self.mechanic)
+        self.assertEqual(bad.status_code, 400)
+        backwards = self.client.get("/service-tickets/totals?start=2025-03-02&end=2025-03-01", headers=self.mechanic)
+        self.assertEqual(backwards.status_code, 400)
+        self.assertEqual(self.client.get("/service-tickets/totals").status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+# File: tests/test_forecasting.py
+
+import unittest
+from datetime import datetime, timedelta
+import numpy as np
+from application import create_app
+from application.extensions import db
+from application.forecasting import forecast
+from application.models import Customer, Inventory, ServiceTicket, ticket_parts
+from application.utils import encode_token
+from config import TestingConfig
+
+
+class ForecastTestCase(unittest.TestCase):
+    def test_flat_demand_has_no_safety_stock(self):
+        usage = np.full((1, 100), 3.0)
+        demand, seasonal, safety, reorder_point = forecast(usage, window=28, lead_time=7, z=1.65)
+        self.assertEqual((demand[0], seasonal[0], safety[0], reorder_point[0]), (3.0, 1.0, 0.0, 21.0))
+
+    def test_noisy_demand_adds_safety_stock(self):
+        usage = np.tile([0.0, 4.0], (1, 50))
+        demand, _, safety, reorder_point = forecast(usage, window=28, lead_time=4, z=2)
+        self.assertAlmostEqual(demand[0], 2.0)
+        self.assertAlmostEqual(safety[0], 2 * 2.0 * 2)  # z * std * sqrt(lead time)
+        self.assertAlmostEqual(reorder_point[0], 8 + 8)
+
+    def test_seasonal_factor_from_last_year(self):
+        # a part that sells half again as much in the weeks after this date last year
+        usage = np.ones((2, 400))
+        usage[:, -365:-365 + 28] = 1.5
+        usage[1, :-365] = 0  # ...and one that only turned up this year
+        demand, seasonal, _, _ = forecast(usage, window=28, lead_time=7, z=0)
+        self.assertAlmostEqual(seasonal[0], 1.5 / (1 + 0.5 * 28 / 365))
+        self.assertAlmostEqual(demand[0], seasonal[0])
+        self.assertEqual(seasonal[1], 1.0)
+
+
+class ReorderSuggestionsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+
+        with self.app.app_context():
+            db.create_all()
+            customer = Customer(name="Alice", email="alice@example.com", password="x")
+            db.session.add_all([
+                customer,
+                Inventory(id=1, name="Brake Pad", price=40, quantity_on_hand=5),
+                Inventory(id=2, name="Oil Filter", price=10, quantity_on_hand=500),
+                Inventory(id=3, name="Wiper", price=15),
+            ])
+            today = datetime.utcnow().replace(hour=10, minute=0, second=0, microsecond=0)
+            tickets = [ServiceTicket(description=f"Job {i}", customer=customer, created_at=today - timedelta(days=i))
+                       for i in range(1, 61)]
+            db.session.add_all(tickets)
+            db.session.flush()
+            db.session.execute(ticket_parts.insert(), [
+                {"service_ticket_id": t.id, "inventory_id": part_id, "quantity": 2}
+                for t in tickets for part_id in (1, 2, 3)
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _suggestions(self, **params):
+        response = self.client.get("/inventory/reorder-suggestions", query_string=params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def test_only_low_tracked_parts_are_suggested(self):
+        suggestions = self._suggestions()
+        self.assertEqual(len(suggestions), 1)
+        brake = suggestions[0]
+        self.assertEqual((brake["id"], brake["daily_demand"], brake["reorder_point"]), (1, 2.0, 14))
+        self.assertEqual(brake["suggested_order"], 14 + 60 - 5)
+
+    def test_all_includes_untracked_parts_without_orders(self):
+        by_id = {s["id"]: s for s in self._suggestions(all="true")}
+        self.assertEqual(set(by_id), {1, 2, 3})
+        self.assertFalse(by_id[3]["needs_reorder"])
+        self.assertEqual(by_id[3]["suggested_order"], 0)
+
+    def test_forecast_is_cached_but_stock_is_live(self):
+        self._suggestions()
+        with self.app.app_context():
+            db.session.execute(ticket_parts.update().values(quantity=20))
+            db.session.get(Inventory, 1).quantity_on_hand = 10
+            db.session.commit()
+        brake = self._suggestions()[0]
+        self.assertEqual(brake["daily_demand"], 2.0)
+        self.assertEqual(brake["quantity_on_hand"], 10)
+
+    def test_usage_of_deleted_parts_is_ignored(self):
+        with self.app.app_context():
+            # SQLite doesn't enforce the foreign key, the rows stay behind
+            db.session.execute(Inventory.__table__.delete().where(Inventory.id == 2))
+            ticket_id = db.session.scalar(db.select(ServiceTicket.id).limit(1))
+            db.session.execute(ticket_parts.insert().values(service_ticket_id=ticket_id, inventory_id=99, quantity=50))
+            db.session.commit()
+        by_id = {s["id"]: s for s in self._suggestions(all="true")}
+        self.assertEqual(set(by_id), {1, 3})
+        self.assertEqual(by_id[3]["daily_demand"], 2.0)  # not the oil filter's usage on top
+
+    def test_requires_mechanic_token(self):
+        self.assertEqual(self.client.get("/inventory/reorder-suggestions").status_code, 401)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+# File: tests/test_idempotency.py
+
+import datetime
+import threading
+import unittest
+from unittest import mock
+from application import create_app, idempotency
+from application.extensions import db
+from application.models import Customer, IdempotencyKey, Inventory, ServiceTicket
+from application.utils import encode_token
+from config import TestingConfig
+
+
+class IdempotencyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.payload = {"name": "Retry", "email": "retry@example.com", "password": "password123"}
+
+        with self.app.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _register(self, key="abc-123", payload=None):
+        return self.client.post(
+            "/customers/register", json=payload or self.payload, headers={"Idempotency-Key": key}
+        )
+
+    def _hold_key(self, key="abc-123"):
+        # pretend another worker claimed the key and is still running
+        with self.app.test_request_context(
+            "/customers/register", method="POST", json=self.payload, headers={"Idempotency-Key": key}
+        ):
+            record_key = idempotency._record_key(key, ())
+            record, claimed_at = idempotency.claim(record_key, idempotency._fingerprint())
+            self.assertIsNone(record)
+        self.claimed_at = claimed_at
+        return record_key
+
+    def test_retry_replays_first_response(self):
+        first = self._register()
+        with mock.patch("application.blueprints.customers.routes.hash_password") as hasher:
+            second = self._register()
+        hasher.assert_not_called()
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(second.get_json(), first.get_json())
+        with self.app.app_context():
+            self.assertEqual(db.session.query(Customer).count(), 1)
+
+    def test_replay_keeps_the_headers(self):
+        with self.app.app_context():
+            db.session.add_all([Customer(id=1, name="Alice", email="alice@example.com", password="x"),
+                                Inventory(id=1, name="Brake Pad", price=20.0)])
+            db.session.add(ServiceTicket(id=1, description="brakes", customer_id=1))
+            db.session.commit()
+        headers = {"Authorization": f"Bearer {encode_token(1)}", "Idempotency-Key": "parts-1"}
+        first, second = [self.client.put("/service-tickets/1/add-part", json={"part_ids": [1]}, headers=headers)
+                         for _ in range(2)]
+        self.assertEqual(second.headers["Idempotent-Replayed"], "true")
+        self.assertEqual(second.headers["ETag"], first.headers["ETag"])
+        self.assertEqual(second.headers["Content-Length"], first.headers["Content-Length"])
+
+    def test_key_reused_for_different_request(self):
+        self._register()
+        response = self._register(payload={**self.payload, "email": "other@example.com"})
+        self.assertEqual(response.status_code, 422)
+
+    def test_concurrent_duplicate_waits_for_the_original(self):
+        record_key = self._hold_key()
+
+        def finish_original():
+            with self.app.app_context():
+                idempotency.store(record_key, self.app.response_class('{"id": 99}', status=201, mimetype="application/json"),
+                                  self.claimed_at)
+
+        timer = threading.Timer(0.2, finish_original)
+        timer.start()
+        response = self._register()
+        timer.join()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json(), {"id": 99})
+
+    def test_in_flight_duplicate_times_out_with_409(self):
+        self.app.config["IDEMPOTENCY_LOCK_TIMEOUT"] = 0.1
+        self._hold_key()
+        self.assertEqual(self._register().status_code, 409)
+
+    def test_claim_of_a_dead_worker_is_taken_over(self):
+        self.app.config["IDEMPOTENCY_LOCK_TIMEOUT"] = 0.1
+        record_key = self._hold_key()
+        self.assertEqual(self._register().status_code, 409)  # could still be running
+
+        with self.app.app_context():
+            db.session.query(IdempotencyKey).update(
+                {"created_at": datetime.datetime.utcnow() - datetime.timedelta(minutes=5)}
+            )
+            db.session.commit()
+        response = self._register()
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.headers.get("Idempotent-Replayed"))
+
+        # the original wakes up and finishes, it doesn't overwrite the retry's response
+        with self.app.app_context():
+            stale = self.claimed_at - datetime.timedelta(minutes=5)
+            idempotency.store(record_key, self.app.response_class("{}", status=201, mimetype="application/json"), stale)
+        replay = self._register()
+        self.assertEqual(replay.headers.get("Idempotent-Replayed"), "true")
+        self.assertEqual(replay.get_json(), response.get_json())
+
+    def test_purge_drops_expired_keys(self):
+        self._register()
+        with self.app.app_context():
+            db.session.query(IdempotencyKey).update(
+                {"created_at": datetime.datetime.utcnow() - datetime.timedelta(days=2)}
+            )
+            db.session.commit()
+            self.assertEqual(idempotency.purge_expired(self.app), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -71,6 +71,17 @@ class InventoryRoutesTestCase(unittest.TestCase):
 
         self.assertEqual(response.status_code, 400)
         self.assertIn(b"price", response.data)
+    def test_stock_must_be_a_non_negative_integer(self):
+        response = self.client.post("/inventory/", json={"name": "Wiper", "price": 9, "quantity_on_hand": -1},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        with self.app.app_context():
+            item = Inventory.query.first()
+        for quantity in (-2, "3", 1.5, True):
+            response = self.client.put(f"/inventory/{item.id}", json={"quantity_on_hand": quantity}, headers=self.headers)
+            self.assertEqual(response.status_code, 400, quantity)
+        response = self.client.put(f"/inventory/{item.id}", json={"quantity_on_hand": 0}, headers=self.headers)
+        self.assertEqual(response.get_json()["quantity_on_hand"], 0)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,209 @@
+# File: tests/test_jobs.py
+
+import csv
+import io
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from sqlalchemy import select, update
+from application import create_app
+from application.extensions import db
+from application.jobs import (FAILED, QUEUED, RUNNING, SUCCEEDED, claim, enqueue, job_type, requeue_expired,
+                              run_job)
+from application.models import Customer, Inventory, Job, Mechanic, ServiceTicket
+from application.utils import encode_token
+from config import TestingConfig, engine_options_for
+
+
+@job_type("tests.crash", priority=100)
+def crash(app, session):
+    os._exit(1)  # the process dies, nothing in run_job gets to record it
+
+
+class JobConfig(TestingConfig):
+    AUTO_ASSIGN_MECHANICS = False
+    JOB_CONCURRENCY = {"tickets.export": 1}
+
+
+class JobTestCase(unittest.TestCase):
+    config = JobConfig
+
+    def setUp(self):
+        self.app = create_app(self.config)
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Customer(id=1, name="Alice", email="alice@example.com", password="x"),
+                Mechanic(id=1, name="Mech 1", password="x"),
+                Inventory(id=1, name="Brake Pad", price=20.0, quantity_on_hand=5),
+            ])
+            db.session.add_all([
+                ServiceTicket(id=1, description="brakes, squeaky", customer_id=1),
+                ServiceTicket(id=2, description="oil", customer_id=1, status="Completed"),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def queue(self, job_type, params=None, **extra):
+        response = self.client.post("/jobs/", json={"type": job_type, "params": params or {}, **extra},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 202, response.get_json())
+        self.assertEqual(response.headers["Location"], f"/jobs/{response.get_json()['id']}")
+        return response.get_json()["id"]
+
+    def poll(self, job_id):
+        return self.client.get(f"/jobs/{job_id}", headers=self.headers).get_json()
+
+    def work(self, worker="w1", slots=4):
+        """claim and run inline, what a worker's pool processes would do"""
+        with self.app.app_context():
+            claimed = claim(self.app, db.session, worker, slots)
+            for job_id, _ in claimed:
+                run_job(self.app, db.session, job_id, worker)
+        return claimed
+
+
+class QueueTestCase(JobTestCase):
+    def test_rejects_unknown_types_and_params(self):
+        response = self.client.post("/jobs/", json={"type": "nope"}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("tickets.export", response.get_json()["types"])
+        response = self.client.post("/jobs/", json={"type": "tickets.export", "params": {"colour": "red"}},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.post("/jobs/", json={"type": "analytics.rebuild"}).status_code, 401)
+
+    def test_export_runs_in_the_background(self):
+        job_id = self.queue("tickets.export", {"format": "csv"})
+        self.assertEqual(self.poll(job_id)["status"], QUEUED)
+        self.assertEqual(self.client.get(f"/jobs/{job_id}/result", headers=self.headers).status_code, 409)
+
+        self.assertEqual(self.work(), [(job_id, "tickets.export")])
+        job = self.poll(job_id)
+        self.assertEqual((job["status"], job["attempts"], job["created_by"]), (SUCCEEDED, 1, 1))
+        self.assertEqual(job["result"]["count"], 2)
+
+        response = self.client.get(f"/jobs/{job_id}/result", headers=self.headers)
+        self.assertEqual(response.mimetype, "text/csv")
+        rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+        self.assertEqual([(r["id"], r["description"], r["customer"]) for r in rows],
+                         [("1", "brakes, squeaky", "Alice"), ("2", "oil", "Alice")])
+
+    def test_import_creates_and_updates_parts(self):
+        job_id = self.queue("inventory.import", {"items": [
+            {"name": "brake pad", "price": 25.0},
+            {"name": "Oil Filter", "price": 8.5, "quantity_on_hand": 12},
+        ]})
+        self.work()
+        self.assertEqual(self.poll(job_id)["result"], {"created": 1, "updated": 1})
+        with self.app.app_context():
+            parts = db.session.execute(select(Inventory.name, Inventory.price, Inventory.quantity_on_hand)
+                                       .order_by(Inventory.id)).all()
+        self.assertEqual(parts, [("brake pad", 25.0, 5), ("Oil Filter", 8.5, 12)])
+
+    def test_failures_are_recorded(self):
+        job_id = self.queue("inventory.import", {"items": [{"name": "no price"}]})
+        self.work()
+        job = self.poll(job_id)
+        self.assertEqual(job["status"], FAILED)
+        self.assertIn("needs a name and a numeric price", job["error"])
+        with self.app.app_context():
+            self.assertEqual(db.session.scalar(select(Inventory.name).where(Inventory.id == 2)), None)
+
+    def test_priority_order_and_concurrency_limits(self):
+        low = self.queue("analytics.rebuild")
+        exports = [self.queue("tickets.export"), self.queue("tickets.export", priority=20)]
+        report = self.queue("reports.reorder", priority=10)
+
+        with self.app.app_context():
+            # one export at a time (JOB_CONCURRENCY), the most urgent one first
+            self.assertEqual(claim(self.app, db.session, "w1", 2), [(exports[1], "tickets.export"), (report, "reports.reorder")])
+            self.assertEqual(claim(self.app, db.session, "w2", 4), [(low, "analytics.rebuild")])
+            self.assertEqual(claim(self.app, db.session, "w2", 4), [])
+            run_job(self.app, db.session, exports[1], "w1")
+            self.assertEqual(claim(self.app, db.session, "w2", 4), [(exports[0], "tickets.export")])
+
+        listed = self.client.get("/jobs/?status=running", headers=self.headers).get_json()
+        self.assertEqual(sorted(j["id"] for j in listed), sorted([exports[0], report, low]))
+        self.assertNotIn("result", listed[0])
+
+    def test_jobs_of_lost_workers_are_retried_then_failed(self):
+        job_id = self.queue("analytics.rebuild")
+
+        def lose_worker():
+            self.assertEqual(len(claim(self.app, db.session, "w1", 1)), 1)
+            db.session.execute(update(Job).values(lease_until=datetime.utcnow() - timedelta(seconds=1)))
+            db.session.commit()
+            return requeue_expired(self.app, db.session)
+
+        with self.app.app_context():
+            self.assertEqual(lose_worker(), (1, 0))
+            self.assertEqual(lose_worker(), (1, 0))
+            self.assertEqual(lose_worker(), (0, 1))  # JOB_MAX_ATTEMPTS
+        job = self.poll(job_id)
+        self.assertEqual((job["status"], job["attempts"]), (FAILED, 3))
+
+    def test_requeued_job_is_not_finished_by_its_old_worker(self):
+        job_id = self.queue("analytics.rebuild")
+        with self.app.app_context():
+            claim(self.app, db.session, "w1", 1)
+            db.session.execute(update(Job).values(status=QUEUED, worker=None))
+            claim(self.app, db.session, "w2", 1)
+            self.assertIsNone(run_job(self.app, db.session, job_id, "w1"))
+            self.assertEqual(db.session.get(Job, job_id).status, RUNNING)
+            self.assertEqual(run_job(self.app, db.session, job_id, "w2"), SUCCEEDED)
+
+    def test_enqueue_joins_the_callers_transaction(self):
+        with self.app.app_context():
+            enqueue(db.session, "archive.run", {"days": 30})
+            db.session.rollback()
+            self.assertEqual(db.session.scalars(select(Job)).all(), [])
+
+
+class WorkerTestCase(JobTestCase):
+    # the pool's processes need a database they can open themselves
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        uri = f"sqlite:///{os.path.join(self.tmpdir.name, 'jobs.db')}"
+
+        class FileConfig(JobConfig):
+            SQLALCHEMY_DATABASE_URI = uri
+            SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(uri)
+            JOB_POLL_INTERVAL = 0.05
+
+        self.config = FileConfig
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        with self.app.app_context():
+            db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_worker_drains_the_queue(self):
+        ids = [self.queue("tickets.export"), self.queue("tickets.export", {"format": "xml"}),
+               self.queue("inventory.import", {"items": [{"name": "Wiper", "price": 9}]})]
+        result = self.app.test_cli_runner().invoke(args=["worker", "--burst", "--processes", "2"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.output.count("succeeded"), 2, result.output)
+        self.assertEqual([self.poll(job_id)["status"] for job_id in ids], [SUCCEEDED, FAILED, SUCCEEDED])
+        self.assertIn("format must be json or csv", self.poll(ids[1])["error"])
+
+    def test_a_dead_process_fails_its_job_and_the_pool_restarts(self):
+        ids = [self.queue("tests.crash"), self.queue("tickets.export")]
+        result = self.app.test_cli_runner().invoke(args=["worker", "--burst", "--processes", "1"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("restarting the pool", result.output)
+        self.assertEqual([self.poll(job_id)["status"] for job_id in ids], [FAILED, SUCCEEDED])
+        self.assertIn("BrokenProcessPool", self.poll(ids[0])["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
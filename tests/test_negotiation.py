@@ -0,0 +1,57 @@
+# File: tests/test_negotiation.py
+
+import unittest
+from application import create_app, negotiation
+from application.extensions import db
+from application.models import Customer, Mechanic, ServiceTicket, Inventory
+from application.utils import hash_password
+from config import TestingConfig
+
+
+class NegotiationTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            customer = Customer(name="Tablet", email="tablet@example.com", password=hash_password("pass123"))
+            mechanic = Mechanic(name="Binary Bob", password=hash_password("mechpass"))
+            parts = [Inventory(name="Spark Plug", price=15.99), Inventory(name="Alternator", price=199.99)]
+            db.session.add_all([customer, mechanic, *parts])
+            db.session.add(ServiceTicket(description="Rough idle", customer=customer, mechanics=[mechanic], parts=parts))
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def assertRoundTrip(self, path, mimetype, loads):
+        expected = self.client.get(path).get_json()
+        response = self.client.get(path, headers={"Accept": mimetype})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, mimetype)
+        self.assertIn("Accept", response.headers["Vary"])
+        self.assertEqual(loads(response.data), expected)
+
+    @unittest.skipIf(negotiation.msgpack is None, "msgpack not installed")
+    def test_msgpack_round_trip(self):
+        loads = lambda data: negotiation.msgpack.unpackb(data, raw=False)
+        for path in ("/service-tickets/", "/customers/", "/mechanics/", "/inventory/"):
+            self.assertRoundTrip(path, "application/msgpack", loads)
+
+    @unittest.skipIf(negotiation.cbor2 is None, "cbor2 not installed")
+    def test_cbor_round_trip(self):
+        for path in ("/service-tickets/", "/inventory/"):
+            self.assertRoundTrip(path, "application/cbor", negotiation.cbor2.loads)
+
+    def test_json_stays_default(self):
+        for accept in (None, "*/*", "text/html"):
+            headers = {"Accept": accept} if accept else {}
+            response = self.client.get("/inventory/", headers=headers)
+            self.assertEqual(response.mimetype, "application/json")
+
+
+if __name__ == "__main__":
+    unittest.main()
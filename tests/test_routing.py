@@ -0,0 +1,100 @@
+# File: tests/test_routing.py
+
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from sqlalchemy import select
+from application import create_app
+from application.extensions import db
+from application.models import Customer
+from application.utils import hash_password
+from config import TestingConfig, engine_options_for, replica_binds
+
+
+class ReplicaRoutingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        primary = f"sqlite:///{os.path.join(self.tmpdir.name, 'primary.db')}"
+        replicas = [f"sqlite:///{os.path.join(self.tmpdir.name, f'replica{i}.db')}" for i in range(2)]
+
+        class ReplicaConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = primary
+            SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(primary)
+            SQLALCHEMY_BINDS = replica_binds(",".join(replicas))
+
+        self.app = create_app(ReplicaConfig)
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            # nothing replicates between sqlite files, so a row only on the replicas
+            # tells us which database a request read from
+            for key in ("replica_0", "replica_1"):
+                db.metadata.create_all(db.engines[key])
+                with db.engines[key].begin() as conn:
+                    conn.execute(Customer.__table__.insert(), {
+                        "name": "ReplicaOnly", "email": "replica@example.com", "password": hash_password("x")
+                    })
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+        # flask-sqlalchemy keeps a (here empty) metadata per bind key on the shared db object,
+        # drop it so apps in other tests without replicas don't go looking for the bind
+        for key in ("replica_0", "replica_1"):
+            db.metadatas.pop(key, None)
+        self.tmpdir.cleanup()
+
+    def _names(self, response):
+        return [c["name"] for c in response.get_json()["customers"]]
+
+    def test_get_reads_from_replica(self):
+        response = self.client.get("/customers/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self._names(response), ["ReplicaOnly"])
+
+    def test_writes_go_to_primary_and_pin_reads(self):
+        response = self.client.post("/customers/register", json={
+            "name": "Writer", "email": "writer@example.com", "password": "password123"
+        })
+        self.assertEqual(response.status_code, 201)
+        with self.app.app_context():
+            self.assertIsNotNone(Customer.query.filter_by(name="Writer").first())
+
+        # the pin cookie from the POST keeps this client's reads on the primary
+        self.assertEqual(self._names(self.client.get("/customers/")), ["Writer"])
+
+        # a different client without the cookie still reads the replica
+        self.assertEqual(self._names(self.app.test_client().get("/customers/")), ["ReplicaOnly"])
+
+    def test_unhealthy_replica_falls_back_to_primary(self):
+        router = self.app.extensions["replica_router"]
+        for engine in router.engines:
+            router.mark_down(engine)
+        self.assertEqual(self._names(self.client.get("/customers/")), [])
+
+    def test_a_session_reads_from_one_replica_per_transaction(self):
+        router = self.app.extensions["replica_router"]
+        with self.app.test_request_context("/customers/"):
+            db.session.execute(select(Customer.name)).all()
+            first = db.session.get_bind()
+            self.assertIn(first, router.engines)
+            db.session.execute(select(Customer.email)).all()
+            self.assertIs(db.session.get_bind(), first)
+            db.session.commit()
+            self.assertIsNot(db.session.get_bind(), first)  # the next transaction moves on
+
+    def test_health_checks_run_off_the_request_path(self):
+        router = self.app.extensions["replica_router"]
+        with mock.patch.object(router, "check") as check:
+            self.client.get("/customers/")
+        check.assert_not_called()
+        self.assertIn("replica-health", [t.name for t in threading.enumerate()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,81 @@
+# File: tests/test_search.py
+
+import unittest
+from application import create_app
+from application.extensions import db
+from application.fulltext import pg_tsquery, rebuild_index, search_terms
+from application.models import Customer, ServiceTicket
+from config import TestingConfig
+
+
+class TicketSearchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+
+        with self.app.app_context():
+            db.create_all()
+            customer = Customer(name="Searcher", email="search@example.com", password="x")
+            db.session.add(customer)
+            db.session.add_all([
+                ServiceTicket(description="Grinding noise from the front brake", customer=customer),
+                ServiceTicket(description="Brake pedal soft, grinding brake pads, grinding rotors", customer=customer),
+                ServiceTicket(description="Oil change and tire rotation", customer=customer),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _search(self, q, **params):
+        return self.client.get("/service-tickets/search", query_string={"q": q, **params})
+
+    def test_ranked_matches(self):
+        data = self._search("grinding brake").get_json()
+        self.assertEqual(data["total"], 2)
+        self.assertTrue(data["ranked"])
+        # more hits in a shorter text ranks higher under bm25
+        self.assertTrue(data["tickets"][0]["description"].startswith("Brake pedal"))
+
+    def test_broad_queries_fall_back_to_newest_first(self):
+        self.app.config["SEARCH_RANK_LIMIT"] = 1
+        data = self._search("grinding brake").get_json()
+        self.assertFalse(data["ranked"])
+        self.assertEqual([t["id"] for t in data["tickets"]], [2, 1])
+
+    def test_prefix_and_stemming(self):
+        self.assertEqual(self._search("rot").get_json()["total"], 2)  # rotation, rotors
+        self.assertEqual(self._search("brakes").get_json()["total"], 2)
+
+    def test_postgres_query_is_quoted_with_a_prefix(self):
+        self.assertEqual(pg_tsquery(search_terms("Grinding & ROT:*")), "'grinding' & 'rot':*")
+        self.assertEqual(pg_tsquery(["it's", "a\\b"]), "'it''s' & 'a\\\\b':*")
+
+    def test_index_follows_updates_and_deletes(self):
+        with self.app.app_context():
+            ticket = db.session.get(ServiceTicket, 3)
+            ticket.description = "Grinding brake on rear axle"
+            db.session.delete(db.session.get(ServiceTicket, 1))
+            db.session.commit()
+        self.assertEqual(self._search("grinding brake").get_json()["total"], 2)
+        self.assertEqual(self._search("oil").get_json()["total"], 0)
+
+    def test_pagination_and_validation(self):
+        data = self._search("brake", per_page=1, page=2).get_json()
+        self.assertEqual((data["pages"], data["current_page"], len(data["tickets"])), (2, 2, 1))
+        self.assertEqual(self._search("   ").status_code, 400)
+        # FTS5 syntax in the query is treated as plain words
+        self.assertEqual(self._search('brake" OR "oil').status_code, 200)
+
+    def test_rebuild_indexes_existing_rows(self):
+        with self.app.app_context():
+            db.session.execute(db.text("DELETE FROM service_ticket_fts"))
+            db.session.commit()
+            rebuild_index(db.engine)
+        self.assertEqual(self._search("grinding").get_json()["total"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# File: tests/test_similarity.py
+
+import unittest
+from application import create_app
+from application.extensions import db
+from application.models import Customer, CustomerTrigram
+from application.similarity import rebuild_trigrams, similarity, trigrams
+from application.utils import encode_token
+from config import TestingConfig
+
+
+class CustomerSimilarityTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Customer(name="John Smith", email="jsmith@example.com", password="x"),
+                Customer(name="Maria Garcia", email="maria.garcia@example.com", password="x"),
+                Customer(name="Wei Chen", email="wchen@example.com", password="x"),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _similar(self, **params):
+        response = self.client.get("/customers/similar", query_string=params, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        return [(c["name"], c["score"]) for c in response.get_json()]
+
+    def test_trigram_similarity(self):
+        self.assertGreater(similarity(trigrams("Jon Smith"), trigrams("John Smith")), 0.6)
+        self.assertLess(similarity(trigrams("Jon Smith"), trigrams("Wei Chen")), 0.1)
+
+    def test_finds_near_duplicates_by_name_or_email(self):
+        self.assertEqual([name for name, _ in self._similar(name="Jon Smith")], ["John Smith"])
+        self.assertEqual([name for name, _ in self._similar(email="maria_garcia@gmail.com")], ["Maria Garcia"])
+        self.assertEqual(self._similar(name="Totally Different"), [])
+        no_params = self.client.get("/customers/similar", headers=self.headers)
+        self.assertEqual(no_params.status_code, 400)
+
+    def test_registration_warns_about_duplicates(self):
+        response = self.client.post("/customers/register", json={
+            "name": "Jon Smith", "email": "jon.smith@example.com", "password": "password123"
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.headers["X-Possible-Duplicates"], "1")
+
+        unique = self.client.post("/customers/register", json={
+            "name": "Priya Patel", "email": "ppatel@example.com", "password": "password123"
+        })
+        self.assertNotIn("X-Possible-Duplicates", unique.headers)
+
+    def test_index_follows_updates_and_deletes(self):
+        with self.app.app_context():
+            customer = db.session.get(Customer, 1)
+            customer.name = "Johanna Schmidt"
+            db.session.delete(db.session.get(Customer, 3))
+            db.session.commit()
+            self.assertEqual(db.session.query(CustomerTrigram).filter_by(customer_id=3).count(), 0)
+        self.assertEqual([name for name, _ in self._similar(name="Johana Schmidt")], ["Johanna Schmidt"])
+        self.assertEqual(self._similar(name="Wei Chen"), [])
+
+    def test_rebuild(self):
+        with self.app.app_context():
+            db.session.query(CustomerTrigram).delete()
+            db.session.commit()
+            self.assertGreater(rebuild_trigrams(db.session), 0)
+        self.assertEqual(len(self._similar(name="Jon Smith")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+# File: tests/test_stock.py
+
+import os
+import tempfile
+import threading
+import unittest
+from sqlalchemy import select
+from application import create_app
+from application.extensions import db
+from application.models import Customer, Inventory, ServiceTicket, ticket_parts
+from application.utils import encode_token
+from config import TestingConfig, engine_options_for
+
+
+class StockReservationTestCase(unittest.TestCase):
+    def setUp(self):
+        # a file database so the concurrency test gets real separate connections
+        self.tmpdir = tempfile.TemporaryDirectory()
+        uri = f"sqlite:///{os.path.join(self.tmpdir.name, 'stock.db')}"
+
+        class StockConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = uri
+            SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(uri)
+
+        self.app = create_app(StockConfig)
+        self.client = self.app.test_client()
+        self.mechanic = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+        self.customer = {"Authorization": f"Bearer {encode_token(1)}"}
+
+        with self.app.app_context():
+            db.create_all()
+            customer = Customer(name="Stocky", email="stock@example.com", password="x")
+            db.session.add_all([
+                customer,
+                Inventory(name="Alternator", price=250, quantity_on_hand=1),
+                Inventory(name="Brake Pad", price=35, quantity_on_hand=10),
+                Inventory(name="Shop Rag", price=1),  # not stock-tracked
+            ])
+            db.session.add_all([ServiceTicket(description=f"Ticket {i}", customer=customer) for i in range(10)])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def _on_hand(self, part_id):
+        with self.app.app_context():
+            return db.session.get(Inventory, part_id).quantity_on_hand
+
+    def _booked(self, ticket_id, part_id):
+        with self.app.app_context():
+            return db.session.scalar(select(ticket_parts.c.quantity).where(
+                ticket_parts.c.service_ticket_id == ticket_id, ticket_parts.c.inventory_id == part_id
+            ))
+
+    def _add(self, ticket_id, part_id, quantity=1):
+        return self.client.post(f"/inventory/add-part/{ticket_id}", json={"part_id": part_id, "quantity": quantity},
+                                headers=self.mechanic)
+
+    def test_reservation_moves_stock_onto_ticket(self):
+        self.assertEqual(self._add(1, 2, 3).status_code, 200)
+        self.assertEqual(self._add(1, 2, 2).status_code, 200)
+        self.assertEqual(self._on_hand(2), 5)
+        self.assertEqual(self._booked(1, 2), 5)
+
+    def test_insufficient_stock_is_409_and_changes_nothing(self):
+        self.assertEqual(self._add(1, 2, 11).status_code, 409)
+        self.assertEqual(self._on_hand(2), 10)
+        self.assertIsNone(self._booked(1, 2))
+        self.assertEqual(self._add(1, 99).status_code, 404)
+        self.assertEqual(self._add(1, 2, 0).status_code, 400)
+
+    def test_untracked_parts_always_reserve(self):
+        self.assertEqual(self._add(1, 3, 500).status_code, 200)
+        self.assertIsNone(self._on_hand(3))
+
+    def test_multi_part_add_is_all_or_nothing(self):
+        response = self.client.put("/service-tickets/1/add-part", headers=self.customer, json={
+            "part_ids": [{"part_id": 2, "quantity": 4}, {"part_id": 1, "quantity": 2}]
+        })
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual((self._on_hand(1), self._on_hand(2)), (1, 10))
+
+        response = self.client.put("/service-tickets/1/add-part", headers=self.customer, json={"part_ids": [1, 2, 2]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((self._on_hand(1), self._on_hand(2), self._booked(1, 2)), (0, 8, 2))
+
+    def test_last_unit_goes_to_exactly_one_mechanic(self):
+        statuses = []
+
+        def grab(ticket_id):
+            statuses.append(self._add(ticket_id, 1).status_code)
+
+        threads = [threading.Thread(target=grab, args=(i,)) for i in range(1, 11)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(statuses), [200] + [409] * 9)
+        self.assertEqual(self._on_hand(1), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
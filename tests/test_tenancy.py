@@ -0,0 +1,131 @@
+# File: tests/test_tenancy.py
+
+import os
+import tempfile
+import unittest
+from jose import jwt
+from sqlalchemy import func, select, text
+from application import create_app
+from application.extensions import db
+from application.models import Customer, Mechanic, ServiceTicket
+from application.tenancy import tenant_context, upgrade_shards
+from application.utils import ALGORITHM, SECRET_KEY, encode_token
+from config import TestingConfig, engine_options_for, tenant_binds
+
+
+class TenantBindsTestCase(unittest.TestCase):
+    def test_parses_shards(self):
+        binds = tenant_binds(" north=sqlite:///north.db, south=postgresql://db/shops#south ,")
+        self.assertEqual(sorted(binds), ["tenant_north", "tenant_south"])
+        self.assertEqual(binds["tenant_north"]["url"], "sqlite:///north.db")
+        self.assertEqual(binds["tenant_south"]["url"], "postgresql://db/shops")
+        self.assertTrue(binds["tenant_south"]["connect_args"]["options"].endswith("-c search_path=south"))
+        self.assertIn("statement_timeout", binds["tenant_south"]["connect_args"]["options"])
+
+
+class TenancyTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        primary = f"sqlite:///{os.path.join(self.tmpdir.name, 'primary.db')}"
+        shards = ",".join(f"{name}=sqlite:///{os.path.join(self.tmpdir.name, name + '.db')}" for name in ("north", "south"))
+
+        class TenantConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = primary
+            SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(primary)
+            SQLALCHEMY_BINDS = tenant_binds(shards)
+            TENANT_HOSTS = {"shop-two.example.com": "south"}
+
+        self.app = create_app(TenantConfig)
+        self.client = self.app.test_client()
+        with self.app.app_context():
+            upgrade_shards(self.app)
+            for tenant, mechanic_id in (("north", 7), ("south", 9)):
+                with tenant_context(tenant):
+                    db.session.add(Mechanic(id=mechanic_id, name=f"{tenant} mechanic", password="x"))
+                    db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+        # same as the replica bind in test_routing.py
+        for key in ("tenant_north", "tenant_south"):
+            db.metadatas.pop(key, None)
+        self.tmpdir.cleanup()
+
+    def count(self, tenant, model):
+        with self.app.app_context(), tenant_context(tenant):
+            return db.session.scalar(select(func.count()).select_from(model))
+
+    def register_and_login(self, host):
+        body = {"name": "Alice", "email": "alice@example.com", "password": "secret"}
+        self.assertEqual(self.client.post("/customers/register", json=body, base_url=f"http://{host}").status_code, 201)
+        response = self.client.post("/customers/login", json={"email": body["email"], "password": body["password"]},
+                                    base_url=f"http://{host}")
+        return response.get_json()["token"]
+
+    def test_host_picks_the_shard_and_the_token_remembers_it(self):
+        token = self.register_and_login("north.example.com")
+        self.assertEqual(jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["tenant"], "north")
+
+        # no shop in the host, the token's claim routes it
+        response = self.client.post("/service-tickets/", json={"description": "brakes"},
+                                    headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()["assigned_mechanic_id"], 7)  # north's own heap
+
+        self.assertEqual((self.count("north", ServiceTicket), self.count("south", ServiceTicket)), (1, 0))
+        self.assertEqual((self.count("north", Customer), self.count("south", Customer)), (1, 0))
+        self.assertEqual(self.count(None, Customer), 0)
+
+    def test_same_ids_in_different_shops(self):
+        north = self.register_and_login("north.example.com")
+        south = self.register_and_login("shop-two.example.com")
+        for token, mechanic_id in ((north, 7), (south, 9)):
+            response = self.client.post("/service-tickets/", json={"description": "oil"},
+                                        headers={"Authorization": f"Bearer {token}"})
+            self.assertEqual(response.get_json(), {"message": "Ticket created", "ticket_id": 1,
+                                                   "assigned_mechanic_id": mechanic_id})
+        listed = self.client.get("/service-tickets/", base_url="http://south.example.com").get_json()
+        self.assertEqual([t["mechanics"][0]["name"] for t in listed], ["south mechanic"])
+
+    def test_token_only_works_for_its_shop(self):
+        token = self.register_and_login("north.example.com")
+        response = self.client.get("/service-tickets/my-tickets", base_url="http://south.example.com",
+                                   headers={"Authorization": f"Bearer {token}"})
+        self.assertEqual(response.status_code, 403)
+
+        stray = encode_token(1, tenant="west")
+        response = self.client.get("/service-tickets/my-tickets", headers={"Authorization": f"Bearer {stray}"})
+        self.assertEqual(response.status_code, 403)
+
+    def test_requests_without_a_shop_use_the_primary(self):
+        self.register_and_login("localhost")
+        self.assertEqual((self.count(None, Customer), self.count("north", Customer)), (1, 0))
+
+    def test_cli_runs_per_shop(self):
+        self.register_and_login("north.example.com")
+        result = self.app.test_cli_runner().invoke(args=["tenants", "run", "--tenant", "north", "analytics", "rebuild"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("north", result.output)
+        self.assertIn("rebuilt", result.output)
+
+        # the search index of the shop, not the primary's
+        with self.app.app_context(), tenant_context("north"):
+            db.session.add(ServiceTicket(description="squeaky brakes", customer_id=1))
+            db.session.flush()
+            db.session.execute(text("INSERT INTO service_ticket_fts(service_ticket_fts) VALUES ('delete-all')"))
+            db.session.commit()
+        result = self.app.test_cli_runner().invoke(args=["tenants", "run", "--tenant", "north", "search", "rebuild"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with self.app.app_context(), tenant_context("north"):
+            self.assertEqual(db.session.scalar(text("SELECT count(*) FROM service_ticket_fts WHERE service_ticket_fts MATCH 'squeaky'")), 1)
+
+        result = self.app.test_cli_runner().invoke(args=["tenants", "upgrade"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.output.count("up to date"), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
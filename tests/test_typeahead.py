@@ -0,0 +1,94 @@
+# File: tests/test_typeahead.py
+
+import unittest
+from application import create_app
+from application.extensions import db
+from application.models import Inventory
+from application.typeahead import EXTENSION_KEY
+from application.utils import encode_token
+from config import TestingConfig
+
+
+class InventoryTypeaheadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(TestingConfig)
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Inventory(name="Front Brake Pad", price=40),
+                Inventory(name="Brake Pad", price=35),
+                Inventory(name="Brake Fluid DOT4", price=12),
+                Inventory(name="Oil Filter", price=8),
+            ])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+
+    def _search(self, prefix, **params):
+        response = self.client.get("/inventory/search", query_string={"prefix": prefix, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.get_json()
+
+    def _names(self, prefix, **params):
+        return [part["name"] for part in self._search(prefix, **params)]
+
+    def test_ranks_name_prefix_before_word_prefix(self):
+        self.assertEqual(self._names("brake"), ["Brake Pad", "Brake Fluid DOT4", "Front Brake Pad"])
+        self.assertEqual(self._names("BRAKE p"), ["Brake Pad", "Front Brake Pad"])
+        self.assertEqual(self._names("brake", limit=1), ["Brake Pad"])
+        self.assertEqual(self._names("xyz"), [])
+
+    def test_index_follows_writes(self):
+        self._names("brake")  # builds the index
+        self.client.post("/inventory/", json={"name": "Brake Rotor", "price": 60}, headers=self.headers)
+        self.client.put("/inventory/4", json={"name": "Cabin Filter"}, headers=self.headers)
+        self.client.delete("/inventory/2", headers=self.headers)
+
+        self.assertEqual(self._names("brake"), ["Brake Rotor", "Brake Fluid DOT4", "Front Brake Pad"])
+        self.assertEqual(self._names("filter"), ["Cabin Filter"])
+        self.assertEqual(self._names("oil"), [])
+
+    def test_part_from_a_rolled_back_batch_is_forgotten(self):
+        self._names("brake")
+        response = self.client.post("/batch", headers=self.headers, json={"atomic": True, "requests": [
+            {"method": "POST", "path": "/inventory/", "body": {"name": "Brake Rotor", "price": 60}},
+            {"method": "DELETE", "path": "/inventory/999"},
+        ]})
+        self.assertFalse(response.get_json()["committed"])
+        self.assertEqual(self._names("brake rotor"), [])
+
+    def test_stock_is_always_current(self):
+        with self.app.app_context():
+            db.session.execute(Inventory.__table__.update().where(Inventory.id == 2).values(quantity_on_hand=5))
+            db.session.commit()
+        self.assertEqual(self._search("brake pad")[0]["quantity_on_hand"], 5)
+        with self.app.app_context():
+            # Core, like a stock reservation
+            db.session.execute(Inventory.__table__.update().where(Inventory.id == 2).values(quantity_on_hand=4))
+            db.session.commit()
+        self.assertEqual(self._search("brake pad")[0]["quantity_on_hand"], 4)
+
+    def test_stale_index_reloads(self):
+        self._names("oil")
+        with self.app.app_context():
+            # a write the ORM events never see, like another worker's
+            db.session.execute(Inventory.__table__.insert().values(name="Oil Drain Plug", price=3))
+            db.session.commit()
+        self.assertEqual(self._names("oil"), ["Oil Filter"])
+        self.app.extensions[EXTENSION_KEY].loaded_at = float("-inf")
+        self.assertEqual(self._names("oil"), ["Oil Filter", "Oil Drain Plug"])
+
+    def test_database_fallback(self):
+        self.app.config["INVENTORY_SEARCH_INDEX"] = False
+        self.assertEqual(self._names("brake"), ["Brake Pad", "Brake Fluid DOT4"])
+        self.assertEqual(self.client.get("/inventory/search").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,276 @@
+# File: tests/test_webhooks.py
+
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from sqlalchemy import select, update
+from application import create_app
+from application.extensions import db
+from application.models import Customer, Mechanic, OutboxEvent, ServiceTicket, WebhookEndpoint
+from application.utils import encode_token
+from application.webhooks import SIGNATURE_HEADER, dispatch_once, verify_signature
+from config import TestingConfig, engine_options_for
+
+
+class StubReceiver:
+    """Local HTTP server that records every POST and answers with self.status."""
+
+    def __init__(self):
+        self.requests = []
+        self.status = 200
+        self.delay = 0
+        receiver = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                receiver.requests.append((self.path, dict(self.headers), body))
+                time.sleep(receiver.delay)
+                self.send_response(receiver.status)
+                if 300 <= receiver.status < 400:
+                    self.send_header("Location", receiver.url("/redirected"))
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def events(self, path):
+        return [e for p, _, body in self.requests if p == path for e in json.loads(body)["events"]]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class WebhookConfig(TestingConfig):
+    WEBHOOK_ALLOW_PRIVATE_URLS = True
+    WEBHOOK_BATCH_SIZE = 2
+    WEBHOOK_MAX_ATTEMPTS = 2
+    AUTO_ASSIGN_MECHANICS = False
+
+
+class WebhookTestCase(unittest.TestCase):
+    config = WebhookConfig
+
+    def setUp(self):
+        self.receiver = StubReceiver()
+        self.app = create_app(self.config)
+        self.client = self.app.test_client()
+        self.customer_headers = {"Authorization": f"Bearer {encode_token(1)}"}
+        self.mechanic_headers = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+        with self.app.app_context():
+            db.create_all()
+            db.session.add_all([
+                Customer(id=1, name="Alice", email="alice@example.com", password="x"),
+                Customer(id=2, name="Bob", email="bob@example.com", password="x"),
+                Mechanic(id=1, name="Mech 1", password="x"),
+            ])
+            db.session.add_all([ServiceTicket(id=i, description="job", customer_id=1 if i < 4 else 2) for i in range(1, 5)])
+            db.session.commit()
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+        self.receiver.close()
+
+    def register(self, path, headers=None):
+        response = self.client.post("/webhooks/", json={"url": self.receiver.url(path)},
+                                    headers=headers or self.customer_headers)
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()
+
+    def set_status(self, ticket_id, status):
+        response = self.client.put(f"/service-tickets/{ticket_id}/update-status", json={"status": status},
+                                   headers=self.mechanic_headers)
+        self.assertEqual(response.status_code, 200)
+
+    def dispatch(self):
+        with self.app.app_context():
+            return dispatch_once(self.app, db.session)
+
+
+class DeliveryTestCase(WebhookTestCase):
+    def test_status_change_is_queued_and_delivered_signed(self):
+        hook = self.register("/alice")
+        self.set_status(1, "In Progress")
+        self.assertEqual(self.receiver.requests, [])  # nothing goes out from the request
+
+        self.assertEqual(self.dispatch(), (1, 0))
+        path, headers, body = self.receiver.requests[0]
+        self.assertTrue(verify_signature(hook["secret"], headers[SIGNATURE_HEADER], body))
+        self.assertFalse(verify_signature("wrong", headers[SIGNATURE_HEADER], body))
+        event = json.loads(body)["events"][0]
+        self.assertEqual(event["type"], "ticket.status_changed")
+        self.assertEqual(event["data"]["ticket_id"], 1)
+        self.assertEqual((event["data"]["from"], event["data"]["to"], event["data"]["version"]),
+                         ("Pending", "In Progress", 2))
+        self.assertEqual(self.dispatch(), (0, 0))
+
+    def test_batches_per_endpoint_in_order(self):
+        self.register("/alice")
+        self.register("/bob", {"Authorization": f"Bearer {encode_token(2)}"})
+        self.set_status(1, "In Progress")
+        self.set_status(2, "Cancelled")
+        self.set_status(1, "Completed")
+        self.set_status(4, "In Progress")
+
+        self.assertEqual(self.dispatch(), (3, 0))  # alice's third event waits for the next batch
+        self.assertEqual(self.dispatch(), (1, 0))
+        alice = [(e["data"]["ticket_id"], e["data"]["to"]) for e in self.receiver.events("/alice")]
+        self.assertEqual(alice, [(1, "In Progress"), (2, "Cancelled"), (1, "Completed")])
+        self.assertEqual([e["data"]["ticket_id"] for e in self.receiver.events("/bob")], [4])
+        self.assertEqual(len([r for r in self.receiver.requests if r[0] == "/alice"]), 2)
+
+    def test_bulk_status_changes_are_queued_too(self):
+        self.register("/alice")
+        response = self.client.put("/service-tickets/status", headers=self.mechanic_headers, json={
+            "updates": [{"ticket_id": 1, "status": "In Progress"}, {"ticket_id": 2, "status": "Completed"}],
+        })
+        self.assertEqual(response.status_code, 200, response.get_json())
+        self.assertEqual(self.dispatch(), (2, 0))
+        self.assertEqual(sorted(e["data"]["ticket_id"] for e in self.receiver.events("/alice")), [1, 2])
+
+    def test_rolled_back_change_sends_nothing(self):
+        self.register("/alice")
+        with self.app.app_context():
+            db.session.get(ServiceTicket, 1).status = "In Progress"
+            db.session.flush()
+            db.session.rollback()
+            self.assertEqual(db.session.scalars(select(OutboxEvent)).all(), [])
+
+    def test_failures_back_off_and_give_up(self):
+        self.register("/alice")
+        self.set_status(1, "In Progress")
+        self.receiver.status = 500
+
+        self.assertEqual(self.dispatch(), (0, 0))
+        with self.app.app_context():
+            endpoint = db.session.get(WebhookEndpoint, 1)
+            self.assertEqual(endpoint.failures, 1)
+            self.assertGreater(endpoint.retry_at, datetime.utcnow())
+            self.assertEqual(db.session.get(OutboxEvent, 1).last_error, "HTTP 500")
+        self.assertEqual(self.dispatch(), (0, 0))  # still backing off
+        self.assertEqual(len(self.receiver.requests), 1)
+
+        def due_now():
+            with self.app.app_context():
+                db.session.execute(update(WebhookEndpoint).values(retry_at=datetime.utcnow() - timedelta(seconds=1)))
+                db.session.commit()
+
+        due_now()
+        self.assertEqual(self.dispatch(), (0, 1))  # second failure, WEBHOOK_MAX_ATTEMPTS reached
+        with self.app.app_context():
+            self.assertIsNotNone(db.session.get(OutboxEvent, 1).failed_at)
+
+        # a new event goes out once the endpoint is up again
+        self.receiver.status = 204
+        self.set_status(1, "Completed")
+        due_now()
+        self.assertEqual(self.dispatch(), (1, 0))
+        with self.app.app_context():
+            self.assertEqual(db.session.get(WebhookEndpoint, 1).failures, 0)
+
+    def test_leased_endpoint_is_skipped(self):
+        self.register("/alice")
+        self.set_status(1, "In Progress")
+        with self.app.app_context():
+            db.session.execute(update(WebhookEndpoint).values(lease_until=datetime.utcnow() + timedelta(minutes=1)))
+            db.session.commit()
+        self.assertEqual(self.dispatch(), (0, 0))
+        self.assertEqual(self.receiver.requests, [])
+
+    def test_delivery_rechecks_the_address(self):
+        # registered while private addresses were allowed, or DNS changed since: refused at send time
+        self.register("/alice")
+        self.set_status(1, "In Progress")
+        self.app.config["WEBHOOK_ALLOW_PRIVATE_URLS"] = False
+        self.assertEqual(self.dispatch(), (0, 0))
+        self.assertEqual(self.receiver.requests, [])
+        with self.app.app_context():
+            self.assertEqual(db.session.get(OutboxEvent, 1).last_error, "url must point at a public address.")
+
+    def test_redirects_are_not_followed(self):
+        self.register("/alice")
+        self.set_status(1, "In Progress")
+        self.receiver.status = 302
+        self.assertEqual(self.dispatch(), (0, 0))
+        self.assertEqual([path for path, _, _ in self.receiver.requests], ["/alice"])
+        with self.app.app_context():
+            self.assertEqual(db.session.get(OutboxEvent, 1).last_error, "HTTP 302")
+
+    def test_registration(self):
+        self.assertEqual(self.client.post("/webhooks/", json={"url": "ftp://example.com"},
+                                          headers=self.customer_headers).status_code, 400)
+        hook = self.register("/alice")
+        listed = self.client.get("/webhooks/", headers=self.customer_headers).get_json()
+        self.assertEqual([(h["id"], h["pending_events"]) for h in listed], [(hook["id"], 0)])
+        self.assertNotIn("secret", listed[0])
+
+        other = {"Authorization": f"Bearer {encode_token(2)}"}
+        self.assertEqual(self.client.delete(f"/webhooks/{hook['id']}", headers=other).status_code, 404)
+        self.set_status(1, "In Progress")
+        self.assertEqual(self.client.delete(f"/webhooks/{hook['id']}", headers=self.customer_headers).status_code, 200)
+        with self.app.app_context():
+            self.assertEqual(db.session.scalars(select(OutboxEvent)).all(), [])
+
+        self.app.config["WEBHOOK_ALLOW_PRIVATE_URLS"] = False
+        response = self.client.post("/webhooks/", json={"url": "http://127.0.0.1:8080/"}, headers=self.customer_headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class OverlappingDispatchersTestCase(WebhookTestCase):
+    # two dispatchers need a database they can both open
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        uri = f"sqlite:///{os.path.join(self.tmpdir.name, 'webhooks.db')}"
+
+        class FileConfig(WebhookConfig):
+            SQLALCHEMY_DATABASE_URI = uri
+            SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(uri)
+            WEBHOOK_MAX_PER_CUSTOMER = 10
+            WEBHOOK_CONCURRENCY = 1
+            WEBHOOK_TIMEOUT = 1
+
+        self.config = FileConfig
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        with self.app.app_context():
+            db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def test_second_dispatcher_never_resends_a_leased_batch(self):
+        paths = [f"/hook{i}" for i in range(6)]
+        for path in paths:
+            self.register(path)
+        self.set_status(1, "In Progress")
+        # one slow endpoint after the other, the round takes longer than three timeouts
+        self.receiver.delay = 0.6
+
+        first = threading.Thread(target=self.dispatch)
+        first.start()
+        while not self.receiver.requests:
+            time.sleep(0.01)
+        while first.is_alive():
+            self.assertEqual(self.dispatch(), (0, 0))
+            time.sleep(0.2)
+        first.join()
+        self.assertEqual(sorted(path for path, _, _ in self.receiver.requests), paths)
+
+
+if __name__ == "__main__":
+    unittest.main()
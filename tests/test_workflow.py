@@ -0,0 +1,150 @@
+# File: tests/test_workflow.py
+
+import os
+import tempfile
+import unittest
+from datetime import datetime
+from sqlalchemy import event, update
+from application import create_app
+from application.analytics import daily_stats
+from application.assignment import workload_heap
+from application.extensions import db
+from application.models import Customer, Mechanic, ServiceTicket
+from application.utils import encode_token
+from application.workflow import InvalidTransition, check_transition
+from config import TestingConfig, engine_options_for
+
+
+class TransitionTestCase(unittest.TestCase):
+    def test_transitions(self):
+        check_transition("Pending", "In Progress")
+        check_transition("Completed", "Completed")
+        check_transition(None, "Completed")  # pre-workflow rows count as Pending
+        with self.assertRaises(InvalidTransition) as raised:
+            check_transition("Completed", "Pending")
+        self.assertEqual(raised.exception.allowed, ["In Progress"])
+        with self.assertRaises(InvalidTransition):
+            check_transition("Pending", "Done-ish")
+
+
+class BulkStatusTestCase(unittest.TestCase):
+    def setUp(self):
+        # a file database so the race test can write from a second connection
+        self.tmpdir = tempfile.TemporaryDirectory()
+        uri = f"sqlite:///{os.path.join(self.tmpdir.name, 'workflow.db')}"
+
+        class WorkflowConfig(TestingConfig):
+            SQLALCHEMY_DATABASE_URI = uri
+            SQLALCHEMY_ENGINE_OPTIONS = engine_options_for(uri)
+
+        self.app = create_app(WorkflowConfig)
+        self.client = self.app.test_client()
+        self.headers = {"Authorization": f"Bearer {encode_token(1, role='mechanic')}"}
+
+        with self.app.app_context():
+            db.create_all()
+            mechanic = Mechanic(id=1, name="Mech 1", password="x")
+            db.session.add_all([Customer(id=1, name="Alice", email="alice@example.com", password="x"), mechanic])
+            created = datetime.utcnow().replace(microsecond=0)
+            for ticket_id, status in [(1, "Pending"), (2, "In Progress"), (3, "Completed"), (4, "Cancelled"), (5, "On Hold")]:
+                db.session.add(ServiceTicket(id=ticket_id, description="job", customer_id=1, status=status,
+                                             created_at=created, mechanics=[mechanic]))
+            db.session.commit()
+            self.engine = db.engine
+
+    def tearDown(self):
+        with self.app.app_context():
+            db.session.remove()
+            db.drop_all()
+            db.engine.dispose()
+        self.tmpdir.cleanup()
+
+    def _bulk(self, body):
+        return self.client.put("/service-tickets/status", json=body, headers=self.headers)
+
+    def _ticket(self, ticket_id):
+        with self.app.app_context():
+            ticket = db.session.get(ServiceTicket, ticket_id)
+            return ticket.status, ticket.version, ticket.completed_at
+
+    def _statements(self):
+        seen = []
+        event.listen(self.engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args: seen.append(statement.split()[0]) if "service_ticket " in statement + " " else None)
+        return seen
+
+    def test_closing_a_shift_in_one_request(self):
+        statements = self._statements()
+        response = self._bulk({"ticket_ids": [1, 2, 3, 4, 99], "status": "Completed"})
+        self.assertEqual(response.status_code, 200)
+        body = response.get_json()
+        self.assertEqual(body["updated"], 2)
+        self.assertEqual([(r["ticket_id"], r["result"]) for r in body["results"]],
+                         [(1, "updated"), (2, "updated"), (3, "unchanged"), (4, "invalid_transition"), (99, "not_found")])
+        self.assertEqual(body["results"][3]["allowed"], ["Pending"])
+        self.assertEqual(statements, ["SELECT", "UPDATE"])
+
+        status, version, completed_at = self._ticket(2)
+        self.assertEqual((status, version), ("Completed", 2))
+        self.assertIsNotNone(completed_at)
+        self.assertEqual(self._ticket(4)[:2], ("Cancelled", 1))
+        with self.app.app_context():
+            today = datetime.utcnow().date()
+            # the two just closed plus ticket 3, which was created completed
+            self.assertEqual(daily_stats(db.session, today, today)[0]["tickets_completed"], 3)
+
+    def test_mixed_targets_and_expected_versions(self):
+        response = self._bulk({"updates": [
+            {"ticket_id": 1, "status": "In Progress", "version": 1},
+            {"ticket_id": 2, "status": "On Hold", "version": 7},
+            {"ticket_id": 3, "status": "In Progress"},
+            {"ticket_id": 5, "status": "In Progress"},
+        ]})
+        results = {r["ticket_id"]: r for r in response.get_json()["results"]}
+        self.assertEqual({i: r["result"] for i, r in results.items()},
+                         {1: "updated", 2: "conflict", 3: "updated", 5: "updated"})
+        self.assertEqual(results[1]["version"], 2)
+        # reopening clears the completion stamp
+        self.assertEqual(self._ticket(3)[0], "In Progress")
+        self.assertIsNone(self._ticket(3)[2])
+
+    def test_ticket_changed_between_select_and_update(self):
+        raced = []
+
+        def someone_else_first(conn, cursor, statement, parameters, context, executemany):
+            if statement.startswith("UPDATE service_ticket") and not raced:
+                raced.append(True)
+                with self.engine.connect() as other:
+                    other.execute(update(ServiceTicket.__table__).where(ServiceTicket.id == 2)
+                                  .values(status="On Hold", version=2))
+                    other.commit()
+
+        event.listen(self.engine, "before_cursor_execute", someone_else_first)
+        results = self._bulk({"ticket_ids": [1, 2], "status": "Completed"}).get_json()["results"]
+        self.assertEqual([r["result"] for r in results], ["updated", "conflict"])
+        self.assertEqual(self._ticket(2)[:2], ("On Hold", 2))
+
+    def test_workload_heap_sees_bulk_changes(self):
+        with self.app.app_context():
+            self.assertEqual(workload_heap(self.app, db.session).workload(1), 3)  # the cancelled one is closed
+        self._bulk({"ticket_ids": [1, 2], "status": "Completed"})
+        with self.app.app_context():
+            self.assertEqual(workload_heap(self.app, db.session).workload(1), 1)
+
+    def test_validation(self):
+        self.assertEqual(self._bulk({"ticket_ids": [1], "status": "Done"}).status_code, 400)
+        self.assertEqual(self._bulk({"ticket_ids": [1]}).status_code, 400)
+        self.assertEqual(self._bulk({}).status_code, 400)
+        self.app.config["BULK_STATUS_MAX_TICKETS"] = 2
+        self.assertEqual(self._bulk({"ticket_ids": [1, 2, 3], "status": "Completed"}).status_code, 400)
+
+    def test_single_update_follows_the_workflow(self):
+        unknown = self.client.put("/service-tickets/1/update-status", json={"status": "Done"}, headers=self.headers)
+        self.assertEqual(unknown.status_code, 400)
+        refused = self.client.put("/service-tickets/3/update-status", json={"status": "Pending"}, headers=self.headers)
+        self.assertEqual(refused.status_code, 409)
+        self.assertEqual(refused.get_json()["allowed"], ["In Progress"])
+
+
+if __name__ == "__main__":
+    unittest.main()